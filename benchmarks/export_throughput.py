@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# export_throughput.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Throughput benchmark of the history export. It writes a synthetic
+# history log and exports all of it in every format to /dev/null:
+#
+#     python3 benchmarks/export_throughput.py --records 2000000 --min 50000
+#
+# It exits with 1 when a format exports fewer than --min records per
+# second or when the memory used grows with the size of the log.
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from pomodoro_indicator.engine import State  # noqa: E402
+from pomodoro_indicator.export import FORMATS  # noqa: E402
+from pomodoro_indicator.export import export  # noqa: E402
+from pomodoro_indicator.history import Event  # noqa: E402
+from pomodoro_indicator.history import HEADER  # noqa: E402
+from pomodoro_indicator.history import History  # noqa: E402
+from pomodoro_indicator.history import MAGIC  # noqa: E402
+from pomodoro_indicator.history import RECORD  # noqa: E402
+from pomodoro_indicator.history import VERSION  # noqa: E402
+
+# A day of work: start, four sessions with their breaks and a stop
+DAY = ((Event.START, State.SESSION, 0),
+       (Event.SESSION_END, State.SESSION, 1500),
+       (Event.BREAK_END, State.BREAK, 300),
+       (Event.SESSION_END, State.SESSION, 1500),
+       (Event.BREAK_END, State.BREAK, 300),
+       (Event.SESSION_END, State.SESSION, 1500),
+       (Event.BREAK_END, State.BREAK, 300),
+       (Event.SESSION_END, State.SESSION, 1500),
+       (Event.BREAK_END, State.LONG_BREAK, 900),
+       (Event.STOP, State.SESSION, 600))
+CHUNK = 65536
+
+
+def write_log(filename, records):
+    '''
+    Write a history log with records written straight to the file, a
+    day of DAY records every 24 hours
+    '''
+    timestamp = 1.0e9
+    with open(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        for first in range(0, records, CHUNK):
+            chunk = []
+            for n in range(first, min(records, first + CHUNK)):
+                event, state, duration = DAY[n % len(DAY)]
+                if n % len(DAY) == 0:
+                    timestamp = 1.0e9 + n // len(DAY) * 86400
+                timestamp += duration
+                chunk.append(RECORD.pack(timestamp, event.value,
+                                         state.value, n % 4, duration))
+            f.write(b''.join(chunk))
+
+
+def get_maxrss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Throughput benchmark of the history export')
+    parser.add_argument('--records', type=int, default=2000000)
+    parser.add_argument('--format', choices=FORMATS, action='append',
+                        help='format to export, all of them by default')
+    parser.add_argument('--min', type=float, default=None,
+                        metavar='RECORDS',
+                        help='fail if a format exports fewer records per '
+                        'second than this')
+    args = parser.parse_args()
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'history')
+        write_log(filename, args.records)
+        history = History(filename)
+        with open(os.devnull, 'w') as output:
+            # Warm up with a small export, then the memory used must not
+            # grow with the number of records exported
+            export(history, output, 'csv', None, 1.0e9 + 86400 * 10)
+            maxrss = get_maxrss()
+            for file_format in args.format or FORMATS:
+                start = time.perf_counter()
+                count = export(history, output, file_format)
+                elapsed = time.perf_counter() - start
+                rate = count / elapsed
+                print('%s: %d records in %.2f s, %.0f records/s' % (
+                    file_format, count, elapsed, rate))
+                if args.min is not None and rate < args.min:
+                    print('%s under %.0f records/s' % (file_format, args.min))
+                    failed = True
+        history.close()
+    # ru_maxrss is in kilobytes
+    growth = get_maxrss() - maxrss
+    print('Peak memory growth: %d kB' % growth)
+    if growth > 10 * 1024:
+        print('Memory grows with the size of the history')
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
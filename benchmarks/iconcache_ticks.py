@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# iconcache_ticks.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Per-tick cost of the progress icon before and after the icon cache.
+# Before, every tick built the path of a themed SVG and the indicator
+# host rendered it. Now the tick takes a ready-made PNG path from a
+# precomputed table and the host only decodes it:
+#
+#     python3 benchmarks/iconcache_ticks.py --ticks 1000 --size 22
+#
+# Both sides of a tick are measured, the lookup in the indicator and
+# the load of the icon as the host does it. It is skipped when gi or
+# GdkPixbuf are not available.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+try:
+    import gi
+    gi.require_version('GdkPixbuf', '2.0')
+    from gi.repository import GdkPixbuf
+except (ImportError, ValueError) as e:
+    GdkPixbuf = None
+    REASON = str(e)
+
+from pomodoro_indicator import comun  # noqa: E402
+
+
+def run(ticks, get_icon, size):
+    '''
+    Get the seconds per tick of the lookup and of the host load
+    '''
+    lookup = 0.0
+    load = 0.0
+    for tick in range(ticks):
+        start = time.perf_counter()
+        icon = get_icon(tick % 61)
+        middle = time.perf_counter()
+        GdkPixbuf.Pixbuf.new_from_file_at_size(icon, size, size)
+        lookup += middle - start
+        load += time.perf_counter() - middle
+    return lookup / ticks, load / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Per-tick cost of the progress icon')
+    parser.add_argument('--ticks', type=int, default=1000)
+    parser.add_argument('--size', type=int, default=22)
+    parser.add_argument('--theme', default='light')
+    args = parser.parse_args()
+    if GdkPixbuf is None:
+        print('Skipped: %s' % REASON)
+        return 0
+    from pomodoro_indicator.iconcache import IconCache
+    theme = args.theme
+
+    def get_svg(frame):
+        # What every tick did before the cache
+        return os.path.join(comun.ICONDIR,
+                            'pomodoro-indicator-%s-%02d.svg' % (theme, frame))
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        cache = IconCache(theme, args.size, cachedir=directory)
+        print('Rasterizing once: %.0f ms' % (
+            (time.perf_counter() - start) * 1000))
+        for name, get_icon in (('SVG per tick', get_svg),
+                               ('cached PNG', cache.get_frame)):
+            lookup, load = run(args.ticks, get_icon, args.size)
+            print('%s: %.2f us lookup, %.0f us host load per tick' % (
+                name, lookup * 1e6, load * 1e6))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# player_latency.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Trigger-to-first-sample latency of the alarms. The player plays into a
+# fakesink and the time from play() to the first buffer rendered is
+# measured, with the pre-rolled pipeline pool and with a pipeline built
+# when the alarm fires, as the indicator used to do:
+#
+#     python3 benchmarks/player_latency.py --runs 20 --max-ms 50
+#
+# The memory held by the decoded sounds of the pool is reported too. It
+# exits with 1 when the median latency of the pool is over --max-ms.
+# It is skipped when gi or GStreamer are not available.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+try:
+    import gi
+    gi.require_version('Gst', '1.0')
+    gi.require_version('GstController', '1.0')
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('GLib', '2.0')
+    from gi.repository import Gst
+    from gi.repository import GLib
+except (ImportError, ValueError) as e:
+    Gst = None
+    REASON = str(e)
+
+SINK = 'fakesink name=sink signal-handoffs=true'
+# What the indicator built for every alarm before the pool
+COLD_PIPELINE = 'uridecodebin name=urisrc ! audioconvert ! audioresample !\
+ queue ! removesilence ! audioconvert ! audioresample ! queue ! scaletempo !\
+ audioconvert ! audioresample ! volume ! equalizer-10bands ! ' + SINK
+TIMEOUT = 10.0
+
+
+def wait(condition, timeout=TIMEOUT):
+    '''
+    Run the default main context until condition() is true
+    '''
+    context = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise RuntimeError('Timed out')
+        if not context.iteration(False):
+            time.sleep(0.0005)
+
+
+def write_sound(filename, seconds=0.2):
+    '''
+    Write a short tone to filename with audiotestsrc
+    '''
+    pipeline = Gst.parse_launch(
+        'audiotestsrc num-buffers=%d samplesperbuffer=4800 ! '
+        'audio/x-raw,rate=48000,channels=2 ! wavenc ! '
+        'filesink location="%s"' % (int(seconds * 10), filename))
+    pipeline.set_state(Gst.State.PLAYING)
+    pipeline.get_bus().timed_pop_filtered(
+        int(TIMEOUT * Gst.SECOND),
+        Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    pipeline.set_state(Gst.State.NULL)
+
+
+def get_latency(pipeline, play):
+    '''
+    Get the seconds from play() to the first sample rendered
+    '''
+    rendered = []
+    sink = pipeline.get_by_name('sink')
+    handler_id = sink.connect(
+        'handoff', lambda *args: rendered.append(time.monotonic()))
+    start = time.monotonic()
+    play()
+    wait(lambda: rendered)
+    sink.disconnect(handler_id)
+    return rendered[0] - start
+
+
+def measure_cold(filename, runs):
+    latencies = []
+    for run in range(runs):
+        rendered = []
+        start = time.monotonic()
+        pipeline = Gst.parse_launch(COLD_PIPELINE)
+        pipeline.get_by_name('urisrc').set_property(
+            'uri', Gst.filename_to_uri(filename))
+        pipeline.get_by_name('sink').connect(
+            'handoff', lambda *args: rendered.append(time.monotonic()))
+        pipeline.set_state(Gst.State.PLAYING)
+        wait(lambda: rendered)
+        latencies.append(rendered[0] - start)
+        pipeline.set_state(Gst.State.NULL)
+    return latencies
+
+
+def measure_pool(player, filename, runs):
+    player.preload([filename])
+    # The decoded sound replaces the pipeline that decodes the file
+    wait(lambda: player.get_pipeline(filename).get_by_name('src')
+         is not None)
+    latencies = []
+    for run in range(runs):
+        player.set_filename(filename)
+        wait(player.is_prerolled)
+        stopped = []
+        handler_id = player.connect('stopped',
+                                    lambda *args: stopped.append(True))
+        latencies.append(get_latency(player.player, player.play))
+        wait(lambda: stopped)
+        player.disconnect(handler_id)
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    median = latencies[len(latencies) // 2]
+    print('%s: median %.1f ms, slowest %.1f ms' % (
+        name, median * 1000, latencies[-1] * 1000))
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Trigger-to-first-sample latency of the alarms')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--sound', default=None,
+                        help='sound file to play, a short tone by default')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail if the median latency of the pool is '
+                        'over this')
+    args = parser.parse_args()
+    if Gst is None:
+        print('Skipped: %s' % REASON)
+        return 0
+    from pomodoro_indicator.player import Player
+    Gst.init(None)
+    with tempfile.TemporaryDirectory() as directory:
+        if args.sound is None:
+            filename = os.path.join(directory, 'alarm.wav')
+            write_sound(filename)
+        else:
+            filename = os.path.abspath(args.sound)
+        report('Pipeline built on play', measure_cold(filename, args.runs))
+        player = Player(SINK, os.path.join(directory, 'cache'))
+        median = report('Pre-rolled pool',
+                        measure_pool(player, filename, args.runs))
+        stats = player.sound_cache.get_stats()
+        print('Decoded sounds in memory: %d, %d kB' % (
+            stats['sounds'], stats['bytes'] // 1024))
+        player.close()
+    if args.max_ms is not None and median * 1000 > args.max_ms:
+        print('Median over %.1f ms' % args.max_ms)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# player_properties.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Micro-benchmark of the player property updates. A looping tone plays
+# into a fakesink while the volume, an equalizer band, a batch of
+# properties or the speed change as fast as possible:
+#
+#     python3 benchmarks/player_properties.py --seconds 2
+#
+# It prints the updates per second of every kind. It is skipped when gi
+# or GStreamer are not available.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+try:
+    import gi
+    gi.require_version('Gst', '1.0')
+    gi.require_version('GstController', '1.0')
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('GLib', '2.0')
+    from gi.repository import Gst
+    from gi.repository import GLib
+except (ImportError, ValueError) as e:
+    Gst = None
+    REASON = str(e)
+
+SINK = 'fakesink sync=true'
+
+
+def wait(condition, timeout=10.0):
+    '''
+    Run the default main context until condition() is true
+    '''
+    context = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise RuntimeError('Timed out')
+        if not context.iteration(False):
+            time.sleep(0.0005)
+
+
+def write_sound(filename, seconds):
+    pipeline = Gst.parse_launch(
+        'audiotestsrc num-buffers=%d samplesperbuffer=4800 ! '
+        'audio/x-raw,rate=48000,channels=2 ! wavenc ! '
+        'filesink location="%s"' % (int(seconds * 10), filename))
+    pipeline.set_state(Gst.State.PLAYING)
+    pipeline.get_bus().timed_pop_filtered(
+        10 * Gst.SECOND, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    pipeline.set_state(Gst.State.NULL)
+
+
+def measure(update, seconds):
+    '''
+    Get the calls per second of update(n)
+    '''
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for n in range(100):
+            update(count + n)
+        count += 100
+        # Let the bus messages through, as the main loop would
+        GLib.MainContext.default().iteration(False)
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmark of the player property updates')
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+    if Gst is None:
+        print('Skipped: %s' % REASON)
+        return 0
+    from pomodoro_indicator.player import Player
+    Gst.init(None)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'tone.wav')
+        # Long enough to play during every measure
+        write_sound(filename, 5 * args.seconds + 5)
+        player = Player(SINK, os.path.join(directory, 'cache'))
+        player.set_filename(filename)
+        started = []
+        player.connect('started', lambda *args: started.append(True))
+        player.play()
+        wait(lambda: started)
+        updates = (
+            ('volume', lambda n: player.set_volume(0.5 + n % 2 * 0.5)),
+            ('equalizer band', lambda n: player.set_equalizer_by_band(
+                n % 10, n % 2 * 6)),
+            ('batch of 12 properties', lambda n: player.set_properties(
+                volume=0.5 + n % 2 * 0.5, removesilence=bool(n % 2),
+                equalizer=dict(('band%d' % band, n % 2 * 6)
+                               for band in range(10)))),
+            ('speed, with a seek', lambda n: player.set_speed(
+                1.0 + n % 2 * 0.5)))
+        for name, update in updates:
+            print('%s: %.0f updates/s' % (
+                name, measure(update, args.seconds)))
+        player.stop()
+        player.preload([])
+        player.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
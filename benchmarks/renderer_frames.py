@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# renderer_frames.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Memory and CPU per frame of the cairo icon renderer. Every frame of a
+# phase is drawn once, then looked up again from the LRU cache:
+#
+#     python3 benchmarks/renderer_frames.py --frames 60 600 3600
+#
+# It prints the CPU time of a drawn frame and of a cached one, the PNG
+# bytes per frame and the memory held by the cache. It is skipped when
+# cairo is not available.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+try:
+    from pomodoro_indicator.renderer import IconRenderer
+except ImportError as e:
+    IconRenderer = None
+    REASON = str(e)
+
+FRAMES = (60, 600, 3600)
+SIZES = (22, 48)
+# As the indicator builds it
+MAX_BYTES = 2 * 1024 * 1024
+
+
+def measure(directory, size, frames):
+    renderer = IconRenderer(size, frames, MAX_BYTES, directory)
+    start = time.process_time()
+    for frame in range(frames + 1):
+        renderer.get_icon(frame / float(frames), 'light')
+    drawn = (time.process_time() - start) / (frames + 1)
+    stats = renderer.get_stats()
+    # The last frames are still in the cache
+    cached_frames = range(frames + 1 - stats['entries'], frames + 1)
+    start = time.process_time()
+    for repeat in range(10):
+        for frame in cached_frames:
+            renderer.get_icon(frame / float(frames), 'light')
+    cached = (time.process_time() - start) / (10 * len(cached_frames))
+    print('%d px, %d frames: %.0f us drawn, %.1f us cached, %.0f bytes '
+          'per frame, %d frames in %d kB of cache' % (
+              size, frames, drawn * 1e6, cached * 1e6,
+              stats['bytes'] / float(stats['entries']), stats['entries'],
+              stats['bytes'] // 1024))
+    renderer.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Memory and CPU per frame of the icon renderer')
+    parser.add_argument('--frames', type=int, nargs='+', default=FRAMES)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+    if IconRenderer is None:
+        print('Skipped: %s' % REASON)
+        return 0
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            for frames in args.frames:
+                measure(directory, size, frames)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
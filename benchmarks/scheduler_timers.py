@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# scheduler_timers.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Benchmark of the timer scheduler. It runs 100, 1000 and 10000 timers
+# with staggered starts on a simulated clock, jumps from one deadline to
+# the next and measures the cost of every wakeup and of every
+# start/stop update:
+#
+#     python3 benchmarks/scheduler_timers.py --max-ratio 3
+#
+# It exits with 1 when the cost per wakeup with the most timers is more
+# than --max-ratio times the cost with the fewest.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from conftest import Clock  # noqa: E402
+from pomodoro_indicator.engine import PomodoroEngine  # noqa: E402
+from pomodoro_indicator.scheduler import Scheduler  # noqa: E402
+
+TIMERS = (100, 1000, 10000)
+
+
+def get_scheduler(timers):
+    clock = Clock(0.0)
+    scheduler = Scheduler(clock)
+    random.seed(timers)
+    for n in range(timers):
+        engine = PomodoroEngine(session_length=random.randint(15, 50),
+                                break_length=random.randint(3, 10),
+                                long_break_length=random.randint(15, 30),
+                                clock=clock)
+        engine.start(random.uniform(0, 3600))
+        scheduler.add(str(n), engine)
+    return clock, scheduler
+
+
+def run_wakeups(timers, wakeups):
+    '''
+    Get the seconds per wakeup, each one at the earliest deadline
+    '''
+    clock, scheduler = get_scheduler(timers)
+    start = time.perf_counter()
+    for wakeup in range(wakeups):
+        clock.now = scheduler.get_next_deadline()
+        scheduler.run()
+    return (time.perf_counter() - start) / wakeups
+
+
+def run_updates(timers, updates):
+    '''
+    Get the seconds per restart or stop of a random timer
+    '''
+    clock, scheduler = get_scheduler(timers)
+    names = [str(random.randrange(timers)) for update in range(updates)]
+    start = time.perf_counter()
+    for n, name in enumerate(names):
+        engine = scheduler.get(name)
+        if n % 2:
+            engine.stop()
+        else:
+            engine.restart()
+        scheduler.update(name)
+    return (time.perf_counter() - start) / updates
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of the timer scheduler')
+    parser.add_argument('--timers', type=int, nargs='+', default=TIMERS)
+    parser.add_argument('--wakeups', type=int, default=100000)
+    parser.add_argument('--max-ratio', type=float, default=None,
+                        help='fail if a wakeup with the most timers costs '
+                        'more than this times a wakeup with the fewest')
+    args = parser.parse_args()
+    costs = []
+    for timers in sorted(args.timers):
+        wakeup = run_wakeups(timers, args.wakeups)
+        update = run_updates(timers, args.wakeups)
+        costs.append(wakeup)
+        print('%d timers: %.2f us per wakeup, %.2f us per update' % (
+            timers, wakeup * 1e6, update * 1e6))
+    if args.max_ratio is not None and costs[-1] > args.max_ratio * costs[0]:
+        print('A wakeup with %d timers costs %.1f times one with %d' % (
+            max(args.timers), costs[-1] / costs[0], min(args.timers)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# startup_importtime.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Startup benchmark. It imports the indicator with python3 -X importtime
+# several times and takes the best cumulative time:
+#
+#     python3 benchmarks/startup_importtime.py --max-ms 400
+#
+# It exits with 1 when the import takes longer than --max-ms or when a
+# module that must wait until first use is imported at startup.
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = 'pomodoro_indicator.pomodoro_indicator'
+# Most of it is Gtk, AppIndicator3 and GdkPixbuf
+MAX_MS = 400
+# Loaded on first use or after the indicator is shown, never on import
+DEFERRED = ('gi.repository.Gst', 'gi.repository.GstPbutils',
+            'gi.repository.Notify', 'cairo', 'dbus', 'webbrowser',
+            'pomodoro_indicator.player',
+            'pomodoro_indicator.soundcache',
+            'pomodoro_indicator.soundlibrary',
+            'pomodoro_indicator.renderer',
+            'pomodoro_indicator.preferences_dialog',
+            'pomodoro_indicator.statistics',
+            'pomodoro_indicator.service',
+            'pomodoro_indicator.control_server',
+            'pomodoro_indicator.statusmap',
+            'pomodoro_indicator.sleep_monitor',
+            'pomodoro_indicator.checkpoint',
+            'pomodoro_indicator.team_client')
+
+
+def measure(module):
+    '''
+    Get the cumulative microseconds of module and every module imported
+    '''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.join(ROOT, 'src')
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        try:
+            own, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            # The header line
+            continue
+    return times[module], set(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Startup import time of the indicator')
+    parser.add_argument('--module', default=MODULE)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=MAX_MS,
+                        help='fail if the import takes longer than this')
+    args = parser.parse_args()
+    try:
+        results = [measure(args.module) for run in range(args.runs)]
+    except RuntimeError as e:
+        print('Can not import %s: %s' % (args.module, e))
+        return 2
+    best = min(cumulative for cumulative, modules in results) / 1000.0
+    print('%s: %.1f ms (best of %d)' % (args.module, best, args.runs))
+    failed = False
+    deferred = sorted(results[0][1].intersection(DEFERRED))
+    if deferred:
+        print('Imported at startup: %s' % ', '.join(deferred))
+        failed = True
+    if best > args.max_ms:
+        print('Over %.1f ms' % args.max_ms)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
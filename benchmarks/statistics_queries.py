@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# statistics_queries.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Query latency of the statistics over ten years of synthetic history.
+# The history grows a year at a time through History, and after every
+# year the rollups are loaded and queried again:
+#
+#     python3 benchmarks/statistics_queries.py --years 10 --max-ratio 3
+#
+# It exits with 1 when a query over the whole history costs more than
+# --max-ratio times a query over the first year.
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from pomodoro_indicator.engine import State  # noqa: E402
+from pomodoro_indicator.history import Event  # noqa: E402
+from pomodoro_indicator.history import History  # noqa: E402
+from pomodoro_indicator.statistics import PERIODS  # noqa: E402
+from pomodoro_indicator.statistics import Statistics  # noqa: E402
+
+FIRST_DAY = datetime.datetime(2016, 1, 4, 9)
+QUERIES = 10000
+
+
+def append_year(history, year):
+    '''
+    Append a year of working days, eight pomodoros and an interruption
+    a day
+    '''
+    for day in range(year * 365, (year + 1) * 365):
+        timestamp = (FIRST_DAY + datetime.timedelta(days=day)).timestamp()
+        if day % 7 >= 5:
+            continue
+        history.append(Event.START, State.SESSION, 0, 0, timestamp)
+        for pomodoro in range(8):
+            timestamp += 1500
+            history.append(Event.SESSION_END, State.SESSION, pomodoro % 4,
+                           1500, timestamp)
+            timestamp += 300
+            history.append(Event.BREAK_END, State.BREAK, pomodoro % 4, 300,
+                           timestamp)
+        history.append(Event.STOP, State.SESSION, 0, 600, timestamp + 600)
+    history.flush()
+
+
+def measure_queries(statistics, years):
+    days = years * 365
+    timestamps = [(FIRST_DAY + datetime.timedelta(
+        days=n * 7919 % days)).timestamp() for n in range(QUERIES)]
+    start = time.perf_counter()
+    for n, timestamp in enumerate(timestamps):
+        statistics.get(PERIODS[n % 3], timestamp)
+    return (time.perf_counter() - start) / QUERIES
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Query latency of the statistics')
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--max-ratio', type=float, default=None,
+                        help='fail if a query over the whole history costs '
+                        'more than this times one over the first year')
+    args = parser.parse_args()
+    costs = []
+    with tempfile.TemporaryDirectory() as directory:
+        log = os.path.join(directory, 'history')
+        rollups = os.path.join(directory, 'statistics')
+        for year in range(args.years):
+            history = History(log)
+            append_year(history, year)
+            # Applies only the records of the new year
+            start = time.perf_counter()
+            Statistics(history, rollups)
+            update = time.perf_counter() - start
+            start = time.perf_counter()
+            statistics = Statistics(history, rollups)
+            load = time.perf_counter() - start
+            query = measure_queries(statistics, year + 1)
+            costs.append(query)
+            print('%2d years, %d records: %.1f ms update, %.1f ms load, '
+                  '%.2f us per query' % (
+                      year + 1, history.get_count(), update * 1000,
+                      load * 1000, query * 1e6))
+            history.close()
+        history = History(log)
+        start = time.perf_counter()
+        Statistics(history, rollups).rebuild()
+        print('Rebuild from the log: %.0f ms' % (
+            (time.perf_counter() - start) * 1000))
+        history.close()
+    if args.max_ratio is not None and costs[-1] > args.max_ratio * costs[0]:
+        print('A query over %d years costs %.1f times one over a year' % (
+            args.years, costs[-1] / costs[0]))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
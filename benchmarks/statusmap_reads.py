@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# statusmap_reads.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Benchmark of the status file readers. A writer process updates the
+# status as fast as it can, or --writes times per second, while the
+# readers read consistent snapshots in a loop:
+#
+#     python3 benchmarks/statusmap_reads.py --readers 4 --min 100000
+#
+# It exits with 1 when a reader gets fewer than --min reads per second.
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from pomodoro_indicator.statusmap import StatusReader  # noqa: E402
+from pomodoro_indicator.statusmap import StatusWriter  # noqa: E402
+
+
+def write(filename, writes, stop):
+    writer = StatusWriter(filename)
+    ready = filename + '.ready'
+    open(ready, 'w').close()
+    n = 0
+    while not stop.is_set():
+        n = (n + 1) % 65536
+        writer.write(1, n % 4, 4, n, n, 1500.0, time.monotonic() + 1500)
+        if writes:
+            time.sleep(1.0 / writes)
+    writer.close()
+
+
+def read(filename, seconds, results):
+    reader = StatusReader(filename)
+    count = 0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for n in range(1000):
+            status = reader.read()
+            if status.frame != status.frames:
+                print('Inconsistent snapshot %s' % (status,))
+                results.put(0.0)
+                return
+        count += 1000
+    reader.close()
+    results.put(count / seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark of the status file readers')
+    parser.add_argument('--readers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--writes', type=float, default=0,
+                        help='status updates per second, 0 for as many as '
+                        'possible')
+    parser.add_argument('--min', type=float, default=None,
+                        metavar='READS',
+                        help='fail if a reader gets fewer reads per second '
+                        'than this')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'status')
+        stop = multiprocessing.Event()
+        writer = multiprocessing.Process(target=write,
+                                         args=(filename, args.writes, stop))
+        writer.start()
+        while not os.path.exists(filename + '.ready'):
+            time.sleep(0.01)
+        results = multiprocessing.Queue()
+        readers = [multiprocessing.Process(
+            target=read, args=(filename, args.seconds, results))
+            for n in range(args.readers)]
+        for reader in readers:
+            reader.start()
+        rates = [results.get() for reader in readers]
+        for reader in readers:
+            reader.join()
+        stop.set()
+        writer.join()
+    print('%d readers: %.0f reads/s each, slowest %.0f reads/s' % (
+        args.readers, sum(rates) / len(rates), min(rates)))
+    if args.min is not None and min(rates) < args.min:
+        print('A reader is under %.0f reads/s' % args.min)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
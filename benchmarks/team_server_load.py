@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# team_server_load.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Load test of the team server. It runs bin/pomodoro-indicator server on
+# a Unix socket, joins many members to one room, starts the room and
+# measures how long the status takes to reach every member:
+#
+#     python3 benchmarks/team_server_load.py --clients 10000 --max 1.0
+#
+# It exits with 1 when the slowest member waits more than --max seconds.
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIN = os.path.join(ROOT, 'bin', 'pomodoro-indicator')
+
+
+async def join(path, room):
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write((json.dumps({'command': 'join', 'room': room}) +
+                  '\n').encode('utf-8'))
+    await reader.readline()
+    return reader, writer
+
+
+async def wait_status(reader, state):
+    while True:
+        message = json.loads(await reader.readline())
+        if message.get('state') == state:
+            return time.monotonic()
+
+
+async def run(path, clients):
+    members = []
+    # Connect in batches, as the listen backlog is bounded
+    for first in range(0, clients, 500):
+        members.extend(await asyncio.gather(*[
+            join(path, 'load') for n in range(first,
+                                              min(clients, first + 500))]))
+    waiters = [asyncio.ensure_future(wait_status(reader, 'session'))
+               for reader, writer in members]
+    start = time.monotonic()
+    members[0][1].write(b'{"command": "start"}\n')
+    times = sorted(await asyncio.gather(*waiters))
+    for reader, writer in members:
+        writer.close()
+    return [received - start for received in times]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load test of the team server')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--max', type=float, default=None, metavar='SECONDS',
+                        help='fail if a member waits longer than this')
+    args = parser.parse_args()
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE,
+                       (min(hard, max(soft, args.clients + 100)), hard))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'team.sock')
+        server = subprocess.Popen([sys.executable, BIN, 'server',
+                                   '--socket', path])
+        try:
+            while not os.path.exists(path):
+                time.sleep(0.05)
+            latencies = asyncio.run(run(path, args.clients))
+        finally:
+            server.terminate()
+            server.wait()
+    median = latencies[len(latencies) // 2]
+    print('%d members: median %.1f ms, slowest %.1f ms' % (
+        args.clients, median * 1000, latencies[-1] * 1000))
+    if args.max is not None and latencies[-1] > args.max:
+        print('slowest member over %.3f s' % args.max)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# checkpoint.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import time
+from . import comun
+from .engine import State
+
+MAGIC = b'POMOCHKP'
+VERSION = 1
+# magic, version, state, pomodoros, wall clock start and end of the phase
+RECORD = struct.Struct('<8sIBxHdd')
+
+
+class Checkpoint(object):
+    '''
+    The running phase of a PomodoroEngine in a fixed-size record
+
+    The record is written in place when a phase starts or the engine
+    stops, never on frames, and it holds the wall clock end of the phase
+    so the remaining time survives a restart of the process. It is not
+    synced to disk, a crash of the process keeps it in the page cache.
+    '''
+    def __init__(self, filename=comun.CHECKPOINT_FILE):
+        self.filename = filename
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o600)
+        self.engine = None
+        self.handlers = []
+
+    def close(self):
+        if self.engine is not None:
+            for handler_id in self.handlers:
+                self.engine.disconnect(handler_id)
+            self.handlers = []
+            self.engine = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def read(self):
+        '''
+        Get (state, pomodoros, start, end), with wall clock times, or None
+        if there is no valid checkpoint
+        '''
+        data = os.pread(self.fd, RECORD.size, 0)
+        if len(data) != RECORD.size:
+            return None
+        magic, version, state, pomodoros, start, end = RECORD.unpack(data)
+        if magic != MAGIC or version != VERSION:
+            return None
+        try:
+            return State(state), pomodoros, start, end
+        except ValueError:
+            return None
+
+    def save(self, engine):
+        countdown = engine.countdown
+        if countdown is None:
+            start = end = 0.0
+        else:
+            # Monotonic times mean nothing to the next process
+            offset = time.time() - engine.clock()
+            start = countdown.start_time + offset
+            end = countdown.get_end() + offset
+        os.pwrite(self.fd, RECORD.pack(MAGIC, VERSION, engine.state.value,
+                                       engine.pomodoros, start, end), 0)
+
+    def restore(self, engine):
+        '''
+        Resume the saved phase on an idle engine, it returns whether
+        there was one. A phase that ended while the process was not
+        running is forgotten, its end was never seen by the user.
+        '''
+        checkpoint = self.read()
+        if checkpoint is None or engine.is_running():
+            return False
+        state, pomodoros, start, end = checkpoint
+        if state == State.IDLE:
+            return False
+        if end <= time.time():
+            # Leave the engine idle, without any phase end
+            self.save(engine)
+            return False
+        now = engine.clock()
+        engine.pomodoros = pomodoros
+        engine.set_state(state, now)
+        # Keep the saved end, even if the lengths have changed since
+        engine.postpone(now + end - time.time() - engine.countdown.get_end())
+        self.save(engine)
+        return True
+
+    def watch(self, engine):
+        '''
+        Save engine on every phase start and stop
+        '''
+        self.engine = engine
+        self.handlers = [
+            engine.connect('status-changed', self.on_status_changed)]
+
+    def on_status_changed(self, engine, frame):
+        if frame == 0:
+            self.save(engine)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# cli.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import datetime
+import os
+import sys
+
+
+def close_stdout():
+    '''
+    The reader of the pipe has gone away, do not fail again when the
+    standard output is flushed at exit
+    '''
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+
+def statistics(args):
+    from .history import History
+    from .statistics import Statistics
+    from .statistics import PERIODS
+    history = History()
+    statistics = Statistics(history)
+    if args.rebuild:
+        statistics.rebuild()
+    for period in PERIODS:
+        values = statistics.get(period)
+        print('%s: %s pomodoros, %d focus minutes, %s interruptions' % (
+            period, values['pomodoros'], values['focus_minutes'],
+            values['interruptions']))
+    history.close()
+    return 0
+
+
+def get_date(text):
+    '''
+    Parse a YYYY-MM-DD date as the timestamp of its local midnight
+    '''
+    try:
+        return datetime.datetime.strptime(text, '%Y-%m-%d').timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError('%s is not a YYYY-MM-DD date' % text)
+
+
+def export(args):
+    from .export import export
+    from .history import History
+    history = History()
+    end_time = args.until
+    if end_time is not None:
+        # The until day is included
+        end_time += 86400
+    try:
+        if args.output == '-':
+            export(history, sys.stdout, args.format, args.since, end_time)
+            sys.stdout.flush()
+        else:
+            with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                export(history, f, args.format, args.since, end_time)
+    except BrokenPipeError:
+        close_stdout()
+    finally:
+        history.close()
+    return 0
+
+
+def ctl(args):
+    from .control import run
+    return run(args.command, args.json)
+
+
+def server(args):
+    from .team_server import serve
+    serve(args.host, args.port, args.socket)
+    return 0
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='pomodoro-indicator')
+    subparsers = parser.add_subparsers(dest='subcommand')
+    subparsers.required = True
+    parser_statistics = subparsers.add_parser(
+        'statistics', help='show the statistics of today, this week and\
+ this month')
+    parser_statistics.add_argument(
+        '--rebuild', action='store_true',
+        help='compute the statistics again from the session history')
+    parser_statistics.set_defaults(function=statistics)
+    parser_export = subparsers.add_parser(
+        'export', help='export the session history')
+    parser_export.add_argument(
+        '-f', '--format', choices=('csv', 'jsonl', 'ics'), default='csv',
+        help='output format (default: csv)')
+    parser_export.add_argument(
+        '-o', '--output', default='-',
+        help='output file, - for the standard output (default)')
+    parser_export.add_argument(
+        '--since', type=get_date, metavar='YYYY-MM-DD',
+        help='export the records from this day on')
+    parser_export.add_argument(
+        '--until', type=get_date, metavar='YYYY-MM-DD',
+        help='export the records up to this day, included')
+    parser_export.set_defaults(function=export)
+    parser_ctl = subparsers.add_parser(
+        'ctl', help='control the running indicator')
+    parser_ctl.add_argument(
+        'command', choices=('start', 'stop', 'restart', 'skip', 'status',
+                            'watch'),
+        help='watch prints the status on every change')
+    parser_ctl.add_argument('--json', action='store_true',
+                            help='print the status as JSON')
+    parser_ctl.set_defaults(function=ctl)
+    parser_server = subparsers.add_parser(
+        'server', help='run a headless server of shared pomodoros')
+    parser_server.add_argument('--host', default=None,
+                               help='address to listen on (default: all)')
+    parser_server.add_argument('--port', type=int, default=7724,
+                               help='TCP port (default: 7724)')
+    parser_server.add_argument('--socket', default=None, metavar='PATH',
+                               help='listen on this Unix socket instead')
+    parser_server.set_defaults(function=server)
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    sys.exit(args.function(args))
@@ -49,7 +49,14 @@ PARAMS = {
             'number_of_pomodoros': 4,
             'play_sounds': True,
             'session_sound_file': 'default',
-            'break_sound_file': 'default'
+            'break_sound_file': 'default',
+            'icon_size': 22,
+            'frames': 60,
+            'fade_in_length': 0,
+            'timers': [],
+            'team_server': '',
+            'team_room': '',
+            'sleep_policy': 'continue'
             }
 
 
@@ -61,14 +68,19 @@ CONFIG_DIR = os.path.join(os.path.expanduser('~'), '.config')
 CONFIG_APP_DIR = os.path.join(CONFIG_DIR, APP)
 CONFIG_FILE = os.path.join(CONFIG_APP_DIR, APPCONF)
 DATA_FILE = os.path.join(CONFIG_APP_DIR, APPDATA)
+CHECKPOINT_FILE = os.path.join(CONFIG_APP_DIR, APP + '.checkpoint')
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                         os.path.join(os.path.expanduser('~'), '.cache'), APP)
+ICON_CACHE_DIR = os.path.join(CACHE_DIR, 'icons')
+SOUND_CACHE_DIR = os.path.join(CACHE_DIR, 'sounds')
+STATISTICS_FILE = os.path.join(CACHE_DIR, 'statistics.json')
+SOUND_INDEX_FILE = os.path.join(CACHE_DIR, 'sound-index.json')
+PERSONAL_SOUNDS_DIR = os.path.join(CONFIG_APP_DIR, 'sounds')
+RUNTIME_DIR = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or CACHE_DIR,
+                           APP)
 AUTOSTART_DIR = os.path.join(CONFIG_DIR, 'autostart')
 FILE_AUTO_START = os.path.join(AUTOSTART_DIR,
                                'pomodoro-indicator-autostart.desktop')
-if not os.path.exists(CONFIG_APP_DIR):
-    os.makedirs(CONFIG_APP_DIR)
-
-print(os.path.dirname(os.path.abspath(__file__)))
-
 if is_package():
     ROOTDIR = '/usr/share/'
     if 'SNAP' in os.environ:
@@ -101,14 +113,29 @@ STATUS_ICON['light'] = (os.path.join(ICONDIR, 'pomodoro-start-light.svg'),
 STATUS_ICON['dark'] = (os.path.join(ICONDIR, 'pomodoro-start-dark.svg'),
                        os.path.join(ICONDIR, 'pomodoro-stop-dark.svg'))
 
-f = open(CHANGELOG, 'r')
-line = f.readline()
-f.close()
-pos = line.find('(')
-posf = line.find(')', pos)
-VERSION = line[pos+1:posf].strip()
-if not is_package():
-    VERSION = VERSION + '-src'
+
+def read_version():
+    f = open(CHANGELOG, 'r')
+    line = f.readline()
+    f.close()
+    pos = line.find('(')
+    posf = line.find(')', pos)
+    version = line[pos+1:posf].strip()
+    if not is_package():
+        version = version + '-src'
+    return version
+
+
+# The version is written to version.py when the package is built, the
+# changelog is only read, on first use, when running from the sources
+try:
+    from .version import VERSION
+except ImportError:
+    def __getattr__(name):
+        if name == 'VERSION':
+            globals()['VERSION'] = read_version()
+            return globals()['VERSION']
+        raise AttributeError(name)
 try:
     current_locale, encoding = locale.getdefaultlocale()
     language = gettext.translation(APP, LANGDIR, [current_locale])
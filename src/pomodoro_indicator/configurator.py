@@ -22,36 +22,121 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import codecs
+import copy
 import os
 import json
+import tempfile
 from . import comun
 
+# Milliseconds set() waits for more changes before writing the file
+SAVE_DELAY = 500
+
+
+def write_all(fd, data):
+    '''
+    Write every byte of data, os.write may write only part of it
+    '''
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def fsync_directory(directory):
+    '''
+    Sync a directory so a rename in it survives a crash
+    '''
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def get_typed(key, value):
+    '''
+    Coerce value to the type of the default for key. Integral floats, as
+    saved by spinbuttons, are returned as ints.
+    '''
+    default = comun.PARAMS.get(key)
+    if isinstance(default, bool):
+        return bool(value)
+    if isinstance(default, int) and isinstance(value, float) and\
+            value.is_integer():
+        return int(value)
+    return value
+
 
 class Configuration(object):
+    '''
+    Process-wide configuration store
+
+    Every Configuration() is the same object, the file is parsed once
+    and read again only when it changes on disk. Subscribers are called
+    as callback(configuration, key, value, *args) for every key that
+    changes.
+    '''
+    instance = None
+
+    def __new__(cls):
+        if cls.instance is None:
+            cls.instance = object.__new__(cls)
+            cls.instance.initialized = False
+        return cls.instance
+
     def __init__(self):
-        self.params = comun.PARAMS
+        if self.initialized:
+            return
+        self.initialized = True
+        self.params = copy.deepcopy(comun.PARAMS)
+        self.callbacks = {}
+        self.handler_id = 0
+        self.monitor = None
+        self.content = None
+        self.pending_save = 0
         self.read()
 
+    def connect(self, key, callback, *args):
+        self.handler_id += 1
+        self.callbacks.setdefault(key, []).append(
+            (self.handler_id, callback, args))
+        return self.handler_id
+
+    def disconnect(self, handler_id):
+        for key, handlers in self.callbacks.items():
+            self.callbacks[key] = [handler for handler in handlers
+                                   if handler[0] != handler_id]
+
+    def notify(self, old_params):
+        for key, value in list(self.params.items()):
+            if key not in old_params or old_params[key] != value:
+                for handler_id, callback, args in list(
+                        self.callbacks.get(key, ())):
+                    callback(self, key, self.get(key), *args)
+
     def get(self, key):
         try:
-            return self.params[key]
+            return get_typed(key, self.params[key])
         except KeyError as e:
             print(e)
-            self.params[key] = comun.PARAMS[key]
-            return self.params[key]
+            # The defaults are never handed out, they could be changed
+            self.params[key] = copy.deepcopy(comun.PARAMS[key])
+            return get_typed(key, self.params[key])
 
     def set(self, key, value):
+        old_params = copy.deepcopy(self.params)
         self.params[key] = value
+        self.schedule_save()
+        self.notify(old_params)
 
     def reset(self):
-        if os.path.exists(comun.CONFIG_FILE):
-            os.remove(comun.CONFIG_FILE)
-        self.params = comun.PARAMS
-        self.save()
+        # The file is replaced atomically, there is no need to remove it
+        self.set_defaults()
 
     def set_defaults(self):
-        self.params = comun.PARAMS
+        old_params = self.params
+        self.params = copy.deepcopy(comun.PARAMS)
         self.save()
+        self.notify(old_params)
 
     def read(self):
         try:
@@ -59,17 +144,101 @@ class Configuration(object):
         except IOError as e:
             print(e)
             self.save()
-            f = codecs.open(comun.CONFIG_FILE, 'r', 'utf-8')
+            return
+        content = f.read()
+        f.close()
+        if content == self.content:
+            return
         try:
-            self.params = json.loads(f.read())
+            self.params = json.loads(content)
+            self.content = content
         except ValueError as e:
             print(e)
+            # Keep the broken file for inspection instead of losing it
+            os.replace(comun.CONFIG_FILE, comun.CONFIG_FILE + '.corrupt')
             self.save()
-        f.close()
+
+    def reload(self):
+        '''
+        Read the file again and notify the keys that changed
+        '''
+        if self.pending_save > 0:
+            # Our own changes are about to be written
+            return
+        old_params = self.params
+        self.read()
+        if self.params != old_params:
+            self.notify(old_params)
+
+    def watch(self):
+        '''
+        Reload the configuration whenever the file changes on disk
+        '''
+        if self.monitor is not None:
+            return
+        import gi
+        gi.require_version('Gio', '2.0')
+        from gi.repository import Gio
+        self.monitor = Gio.File.new_for_path(comun.CONFIG_FILE).monitor_file(
+            Gio.FileMonitorFlags.NONE, None)
+        self.monitor.connect('changed', self.on_file_changed)
+
+    def on_file_changed(self, monitor, afile, other_file, event_type):
+        from gi.repository import Gio
+        if event_type in (Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                          Gio.FileMonitorEvent.CREATED):
+            self.reload()
+
+    def schedule_save(self):
+        '''
+        Write the file once set() calls stop coming in
+        '''
+        try:
+            import gi
+            gi.require_version('GLib', '2.0')
+            from gi.repository import GLib
+        except (ImportError, ValueError):
+            # No main loop to debounce with, callers save() explicitly
+            return
+        if self.pending_save > 0:
+            GLib.source_remove(self.pending_save)
+        self.pending_save = GLib.timeout_add(SAVE_DELAY, self.on_save_delay)
+
+    def on_save_delay(self):
+        self.pending_save = 0
+        self.save()
+        return False
 
     def save(self):
+        '''
+        Write the file now if its content changed. It is written to a
+        temporary file of its own that is synced and renamed over the old
+        one, and the directory is synced, so a crash leaves either the old
+        or the new file, never a mix.
+        '''
+        if self.pending_save > 0:
+            from gi.repository import GLib
+            GLib.source_remove(self.pending_save)
+            self.pending_save = 0
+        content = json.dumps(self.params)
+        if content == self.content and os.path.exists(comun.CONFIG_FILE):
+            return
         if not os.path.exists(comun.CONFIG_APP_DIR):
             os.makedirs(comun.CONFIG_APP_DIR)
-        f = codecs.open(comun.CONFIG_FILE, 'w', 'utf-8')
-        f.write(json.dumps(self.params))
-        f.close()
+        # A unique name, other processes may be saving at the same time
+        fd, temp_file = tempfile.mkstemp(
+            prefix='.' + os.path.basename(comun.CONFIG_FILE) + '.',
+            suffix='.tmp', dir=comun.CONFIG_APP_DIR)
+        try:
+            try:
+                write_all(fd, content.encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(temp_file, comun.CONFIG_FILE)
+        except OSError:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        fsync_directory(comun.CONFIG_APP_DIR)
+        self.content = content
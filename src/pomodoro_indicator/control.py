@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# control.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Client of the control socket of a running indicator. It must only
+# import the standard library so it starts fast.
+
+import json
+import os
+import socket
+import sys
+from . import comun
+
+SOCKET_FILE = os.path.join(comun.RUNTIME_DIR, 'control.sock')
+COMMANDS = ('start', 'stop', 'restart', 'skip', 'status', 'watch')
+CONNECT_TIMEOUT = 2
+
+
+class ControlError(Exception):
+    pass
+
+
+class ControlClient(object):
+    '''
+    Sends one JSON object per line and reads one JSON object per line,
+    a reply for every request and then, after watch, one status for
+    every change
+    '''
+    def __init__(self, filename=SOCKET_FILE):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(CONNECT_TIMEOUT)
+        try:
+            self.socket.connect(filename)
+        except OSError as e:
+            self.socket.close()
+            raise ControlError('pomodoro-indicator is not running (%s)' % e)
+        self.reader = self.socket.makefile('r', encoding='utf-8')
+
+    def close(self):
+        self.reader.close()
+        self.socket.close()
+
+    def request(self, command):
+        self.socket.sendall((json.dumps({'command': command}) +
+                             '\n').encode('utf-8'))
+        return self.read()
+
+    def read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ControlError('pomodoro-indicator closed the connection')
+        reply = json.loads(line)
+        if 'error' in reply:
+            raise ControlError(reply['error'])
+        return reply
+
+    def watch(self):
+        '''
+        Yield the status now and after every change
+        '''
+        yield self.request('watch')
+        self.socket.settimeout(None)
+        while True:
+            yield self.read()
+
+
+def is_running(filename=SOCKET_FILE):
+    try:
+        ControlClient(filename).close()
+    except ControlError:
+        return False
+    return True
+
+
+def format_status(status):
+    remaining = int(round(status['remaining']))
+    if status['state'] == 'idle':
+        return 'idle'
+    return '%s %02d:%02d %s/%s' % (status['state'], remaining // 60,
+                                   remaining % 60, status['pomodoros'] + 1,
+                                   status['number_of_pomodoros'])
+
+
+def run(command, as_json=False):
+    '''
+    Send command to the running indicator and print the status, for
+    watch on every change until the indicator exits
+    '''
+    def show(status):
+        if as_json:
+            print(json.dumps(status), flush=True)
+        else:
+            print(format_status(status), flush=True)
+    try:
+        client = ControlClient()
+        try:
+            if command == 'watch':
+                for status in client.watch():
+                    show(status)
+            else:
+                show(client.request(command))
+        finally:
+            client.close()
+    except ControlError as e:
+        print(e, file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # The reader of the pipe has gone away, do not fail again when
+        # the standard output is flushed at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    '''
+    pomodoro-indicator ctl COMMAND [--json], parsed by hand as argparse
+    costs more than the whole request
+    '''
+    if argv is None:
+        argv = sys.argv[2:]
+    as_json = '--json' in argv
+    arguments = [argument for argument in argv if argument != '--json']
+    if len(arguments) != 1 or arguments[0] not in COMMANDS:
+        # Let argparse report the error and print the help
+        from .cli import main
+        main(['ctl'] + list(argv))
+    sys.exit(run(arguments[0], as_json))
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# control_server.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('GLib', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import GLib
+import json
+import os
+import socket
+from .control import SOCKET_FILE
+
+# A client that does not read is dropped when this much output is queued
+MAX_PENDING = 64 * 1024
+MAX_LINE = 4096
+
+
+class Client(object):
+    def __init__(self, connection):
+        self.socket = connection
+        self.input = b''
+        self.output = b''
+        self.watching = False
+        self.read_id = 0
+        self.write_id = 0
+
+
+class ControlServer(object):
+    '''
+    Serves the control socket from the GLib main loop
+
+    controller must have an engine attribute and start, stop, restart
+    and skip methods, like for DBusService.
+    '''
+    def __init__(self, controller, filename=SOCKET_FILE):
+        self.controller = controller
+        self.engine = controller.engine
+        self.filename = filename
+        self.clients = []
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory, 0o700)
+        # Only one instance runs, a socket file left here is stale
+        if os.path.exists(filename):
+            os.remove(filename)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.bind(filename)
+        os.chmod(filename, 0o600)
+        self.socket.listen(8)
+        self.socket.setblocking(False)
+        self.accept_id = GLib.io_add_watch(self.socket.fileno(),
+                                           GLib.PRIORITY_DEFAULT,
+                                           GLib.IO_IN, self.on_accept)
+        self.handlers = [
+            self.engine.connect('status-changed', self.on_status_changed)]
+
+    def close(self):
+        for handler_id in self.handlers:
+            self.engine.disconnect(handler_id)
+        self.handlers = []
+        for client in list(self.clients):
+            self.drop(client)
+        if self.accept_id:
+            GLib.source_remove(self.accept_id)
+            self.accept_id = 0
+            self.socket.close()
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+
+    def get_status(self):
+        return {'state': self.engine.state.name.lower(),
+                'remaining': self.engine.get_remaining(),
+                'pomodoros': self.engine.pomodoros,
+                'number_of_pomodoros': self.engine.number_of_pomodoros,
+                'frame': self.engine.frame}
+
+    def on_accept(self, fd, condition):
+        try:
+            connection, address = self.socket.accept()
+        except BlockingIOError:
+            return True
+        connection.setblocking(False)
+        client = Client(connection)
+        client.read_id = GLib.io_add_watch(
+            connection.fileno(), GLib.PRIORITY_DEFAULT,
+            GLib.IO_IN | GLib.IO_HUP | GLib.IO_ERR, self.on_read, client)
+        self.clients.append(client)
+        return True
+
+    def drop(self, client):
+        if client.read_id:
+            GLib.source_remove(client.read_id)
+            client.read_id = 0
+        if client.write_id:
+            GLib.source_remove(client.write_id)
+            client.write_id = 0
+        client.socket.close()
+        self.clients.remove(client)
+
+    def on_read(self, fd, condition, client):
+        try:
+            data = client.socket.recv(MAX_LINE)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b''
+        if not data:
+            client.read_id = 0
+            self.drop(client)
+            return False
+        client.input += data
+        while b'\n' in client.input:
+            line, client.input = client.input.split(b'\n', 1)
+            self.send(client, self.handle(client, line))
+            if client not in self.clients:
+                return False
+        if len(client.input) > MAX_LINE:
+            client.read_id = 0
+            self.drop(client)
+            return False
+        return True
+
+    def handle(self, client, line):
+        try:
+            command = json.loads(line.decode('utf-8'))['command']
+        except (ValueError, KeyError, TypeError):
+            return {'error': 'Bad request'}
+        if command == 'start':
+            if not self.engine.is_running():
+                self.controller.start()
+        elif command == 'stop':
+            self.controller.stop()
+        elif command == 'restart':
+            self.controller.restart()
+        elif command == 'skip':
+            self.controller.skip()
+        elif command == 'watch':
+            client.watching = True
+        elif command != 'status':
+            return {'error': 'Unknown command %s' % command}
+        return self.get_status()
+
+    def send(self, client, message):
+        client.output += (json.dumps(message) + '\n').encode('utf-8')
+        if len(client.output) > MAX_PENDING:
+            self.drop(client)
+        elif not client.write_id:
+            self.on_write(None, None, client)
+
+    def on_write(self, fd, condition, client):
+        try:
+            sent = client.socket.send(client.output)
+            client.output = client.output[sent:]
+        except BlockingIOError:
+            pass
+        except OSError:
+            client.write_id = 0
+            self.drop(client)
+            return False
+        if client.output and not client.write_id:
+            client.write_id = GLib.io_add_watch(
+                client.socket.fileno(), GLib.PRIORITY_DEFAULT, GLib.IO_OUT,
+                self.on_write, client)
+        elif not client.output and client.write_id:
+            client.write_id = 0
+            return False
+        return True
+
+    def on_status_changed(self, engine, frame):
+        self.push()
+
+    def push(self):
+        watchers = [client for client in self.clients if client.watching]
+        if watchers:
+            status = self.get_status()
+            for client in watchers:
+                self.send(client, status)
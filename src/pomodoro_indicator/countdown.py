@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# countdown.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+import time
+
+
+class Countdown(object):
+    '''
+    Deadline based countdown
+
+    Every frame has an absolute deadline computed from the start time, so
+    a late wakeup never delays the following frames and the phase always
+    ends exactly `length` seconds after it started.
+    '''
+    def __init__(self, length, frames, clock=time.monotonic):
+        self.length = float(length)
+        self.frames = int(frames)
+        self.clock = clock
+        self.start_time = None
+
+    def start(self, start_time=None):
+        '''
+        Start the countdown at start_time (now by default)
+        '''
+        if start_time is None:
+            start_time = self.clock()
+        self.start_time = start_time
+
+    def stop(self):
+        self.start_time = None
+
+    def is_running(self):
+        return self.start_time is not None
+
+    def get_deadline(self, frame):
+        '''
+        Get the absolute time at which frame begins
+        '''
+        return self.start_time + self.length * frame / self.frames
+
+    def get_end(self):
+        return self.get_deadline(self.frames)
+
+    def get_frame(self, now=None):
+        '''
+        Get the frame for now, between 0 and frames
+        '''
+        if now is None:
+            now = self.clock()
+        if self.length <= 0:
+            return self.frames
+        frame = int(math.floor(
+            (now - self.start_time) * self.frames / self.length))
+        frame = max(0, min(self.frames, frame))
+        # Compare against the deadlines themselves so rounding never
+        # reports a frame before its deadline has been reached
+        while frame > 0 and self.get_deadline(frame) > now:
+            frame -= 1
+        while frame < self.frames and self.get_deadline(frame + 1) <= now:
+            frame += 1
+        return frame
+
+    def get_elapsed(self, now=None):
+        if now is None:
+            now = self.clock()
+        return max(0.0, min(self.length, now - self.start_time))
+
+    def get_remaining(self, now=None):
+        '''
+        Get the exact remaining time in seconds
+        '''
+        if now is None:
+            now = self.clock()
+        return max(0.0, self.get_end() - now)
+
+    def is_finished(self, now=None):
+        if now is None:
+            now = self.clock()
+        return now >= self.get_end()
+
+    def get_next_deadline(self, now=None):
+        '''
+        Get the deadline of the next frame after now
+        '''
+        frame = self.get_frame(now)
+        return self.get_deadline(min(self.frames, frame + 1))
+
+    def get_next_timeout(self, now=None):
+        '''
+        Get the milliseconds to wait until the next frame deadline
+        '''
+        if now is None:
+            now = self.clock()
+        delay = self.get_next_deadline(now) - now
+        return max(0, int(math.ceil(delay * 1000)))
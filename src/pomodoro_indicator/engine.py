@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# engine.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+import time
+from enum import Enum
+from .countdown import Countdown
+
+TOTAL_FRAMES = 60
+# Finer than a frame per second of a one hour phase is never seen
+MAX_FRAMES = 3600
+LENGTHS = ('session_length', 'break_length', 'long_break_length',
+           'number_of_pomodoros')
+# Ranges of the lengths, as in the preferences dialog. Anything else
+# could keep the owner busy ending phases or dividing by zero.
+LIMITS = {'session_length': (1, 1440),
+          'break_length': (1, 1440),
+          'long_break_length': (1, 1440),
+          'number_of_pomodoros': (1, 20)}
+
+
+class State(Enum):
+    IDLE = 0
+    SESSION = 1
+    BREAK = 2
+    LONG_BREAK = 3
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and\
+        not isinstance(value, bool) and math.isfinite(value)
+
+
+def get_lengths(options):
+    '''
+    Get the lengths in options, it raises ValueError if any of them is
+    not a number within LIMITS
+    '''
+    lengths = {}
+    for key in LENGTHS:
+        if key not in options:
+            continue
+        value = options[key]
+        low, high = LIMITS[key]
+        if not is_number(value) or not low <= value <= high or\
+                (key == 'number_of_pomodoros' and
+                 not isinstance(value, int)):
+            raise ValueError('Bad %s' % key)
+        lengths[key] = value
+    return lengths
+
+
+class PomodoroEngine(object):
+    '''
+    Pomodoro state machine without any GTK dependency
+
+    The engine never schedules anything by itself. The owner calls tick()
+    when the deadline given by get_next_deadline() is reached and the
+    engine emits the events for every frame and phase transition due.
+
+    Events (callback arguments after the engine itself), stopped and
+    restarted are emitted while the interrupted phase is still current.
+    status-changed follows every frame change and every stop, a frame of
+    0 means that the phase has changed:
+        started ()
+        stopped ()
+        restarted ()
+        state-changed (old_state, new_state)
+        frame-changed (frame)
+        status-changed (frame)
+        session-end (long_break)
+        break-end (next_session)
+    '''
+    def __init__(self, session_length=25, break_length=5,
+                 long_break_length=20, number_of_pomodoros=4,
+                 frames=TOTAL_FRAMES, clock=time.monotonic):
+        self.session_length = session_length
+        self.break_length = break_length
+        self.long_break_length = long_break_length
+        self.number_of_pomodoros = number_of_pomodoros
+        self.frames = frames
+        self.clock = clock
+        self.state = State.IDLE
+        self.pomodoros = 0
+        self.frame = 0
+        self.countdown = None
+        self.transition_time = None
+        self.callbacks = {}
+        self.handler_id = 0
+
+    def connect(self, event, callback, *args):
+        self.handler_id += 1
+        self.callbacks.setdefault(event, []).append(
+            (self.handler_id, callback, args))
+        return self.handler_id
+
+    def disconnect(self, handler_id):
+        for event, handlers in self.callbacks.items():
+            self.callbacks[event] = [handler for handler in handlers
+                                     if handler[0] != handler_id]
+
+    def emit(self, event, *args):
+        for handler_id, callback, extra in self.callbacks.get(event, ()):
+            callback(self, *(args + extra))
+
+    def configure(self, session_length=None, break_length=None,
+                  long_break_length=None, number_of_pomodoros=None,
+                  frames=None):
+        '''
+        Set the lengths (minutes) used from the next phase on
+        '''
+        if session_length is not None:
+            self.session_length = session_length
+        if break_length is not None:
+            self.break_length = break_length
+        if long_break_length is not None:
+            self.long_break_length = long_break_length
+        if number_of_pomodoros is not None:
+            self.number_of_pomodoros = number_of_pomodoros
+        if frames is not None:
+            self.frames = frames
+
+    def is_running(self):
+        return self.state != State.IDLE
+
+    def get_phase_length(self, state):
+        if state == State.SESSION:
+            return self.session_length
+        elif state == State.BREAK:
+            return self.break_length
+        elif state == State.LONG_BREAK:
+            return self.long_break_length
+        return 0
+
+    def set_state(self, state, start_time=None):
+        old_state = self.state
+        self.state = state
+        self.frame = 0
+        if state == State.IDLE:
+            self.countdown = None
+        else:
+            self.countdown = Countdown(self.get_phase_length(state) * 60,
+                                       self.frames, self.clock)
+            self.countdown.start(start_time)
+        if old_state != state:
+            self.emit('state-changed', old_state, state)
+        if state != State.IDLE:
+            self.emit('frame-changed', self.frame)
+        if state != State.IDLE or old_state != state:
+            self.emit('status-changed', self.frame)
+
+    def start(self, now=None):
+        if self.state != State.IDLE:
+            return
+        self.pomodoros = 0
+        self.emit('started')
+        self.set_state(State.SESSION, now)
+
+    def stop(self):
+        if self.state == State.IDLE:
+            return
+        self.emit('stopped')
+        self.pomodoros = 0
+        self.set_state(State.IDLE)
+
+    def restart(self, now=None):
+        self.emit('restarted')
+        self.pomodoros = 0
+        self.set_state(State.SESSION, now)
+
+    def skip(self, now=None):
+        '''
+        End the current phase right now
+        '''
+        if self.state == State.IDLE:
+            return
+        if now is None:
+            now = self.clock()
+        self.end_phase(now)
+        self.tick(now)
+
+    def postpone(self, seconds):
+        '''
+        Move the current phase seconds later, or earlier if negative. The
+        owner calls tick() afterwards.
+        '''
+        if self.countdown is not None:
+            self.countdown.start_time += seconds
+
+    def resume(self, slept, policy='continue', now=None):
+        '''
+        Bring the engine up to date after its clock stopped for slept
+        seconds while the system was suspended. With continue the phase
+        goes on as if awake, with pause it keeps the time it had left
+        and with end it ends now. Phases are never replayed: if the
+        phase would have ended while asleep, the engine goes idle
+        without any phase end, nobody was there to see it.
+        '''
+        if self.state == State.IDLE:
+            return
+        if now is None:
+            now = self.clock()
+        if policy == 'end':
+            self.skip(now)
+        elif policy != 'pause':
+            self.postpone(-slept)
+            if self.countdown.is_finished(now):
+                self.pomodoros = 0
+                self.set_state(State.IDLE)
+            else:
+                self.tick(now)
+
+    def end_phase(self, end_time):
+        self.transition_time = end_time
+        if self.state == State.SESSION:
+            long_break = self.pomodoros == self.number_of_pomodoros - 1
+            self.emit('session-end', long_break)
+            if long_break:
+                self.set_state(State.LONG_BREAK, end_time)
+            else:
+                self.set_state(State.BREAK, end_time)
+        else:
+            self.pomodoros += 1
+            next_session = self.pomodoros < self.number_of_pomodoros
+            self.emit('break-end', next_session)
+            if next_session:
+                self.set_state(State.SESSION, end_time)
+            else:
+                self.pomodoros = 0
+                self.set_state(State.IDLE)
+
+    def tick(self, now=None):
+        '''
+        Process every frame and phase transition due at now
+        '''
+        if now is None:
+            now = self.clock()
+        # Consecutive phases start at the exact end of the previous one,
+        # so a late tick never stretches the following phases
+        while self.countdown is not None and self.countdown.is_finished(now):
+            self.end_phase(self.countdown.get_end())
+        if self.countdown is not None:
+            frame = self.countdown.get_frame(now)
+            if frame != self.frame:
+                self.frame = frame
+                self.emit('frame-changed', frame)
+                self.emit('status-changed', frame)
+
+    def get_next_deadline(self):
+        if self.countdown is None:
+            return None
+        return self.countdown.get_deadline(
+            min(self.countdown.frames, self.frame + 1))
+
+    def get_next_timeout(self, now=None):
+        '''
+        Get the milliseconds to wait until the next deadline
+        '''
+        if self.countdown is None:
+            return None
+        return self.countdown.get_next_timeout(now)
+
+    def get_remaining(self, now=None):
+        if self.countdown is None:
+            return 0
+        return self.countdown.get_remaining(now)
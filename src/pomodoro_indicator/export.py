@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# export.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import datetime
+import io
+import json
+from . import comun
+
+FIELDS = ('timestamp', 'date', 'event', 'state', 'pomodoros', 'duration')
+FORMATS = ('csv', 'jsonl', 'ics')
+
+
+def get_row(record):
+    return (record.timestamp,
+            datetime.datetime.fromtimestamp(record.timestamp).isoformat(),
+            record.event.name.lower(),
+            record.state.name.lower(),
+            record.pomodoros,
+            round(record.duration, 3))
+
+
+def to_csv(records):
+    '''
+    Yield the records as CSV lines, header first
+    '''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(FIELDS)
+    for record in records:
+        writer.writerow(get_row(record))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def to_jsonl(records):
+    '''
+    Yield the records as JSON lines
+    '''
+    for record in records:
+        yield json.dumps(dict(zip(FIELDS, get_row(record)))) + '\n'
+
+
+def get_ics_date(timestamp):
+    return datetime.datetime.fromtimestamp(
+        timestamp, datetime.timezone.utc).strftime(
+        '%Y%m%dT%H%M%SZ')
+
+
+def to_ics(records):
+    '''
+    Yield an iCalendar with an event for every record that spans time:
+    completed phases and interrupted sessions
+    '''
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//atareao//%s//EN\r\n' % comun.APPNAME
+    for record in records:
+        if record.duration <= 0:
+            continue
+        summary = '%s (%s)' % (record.state.name.capitalize().replace(
+            '_', ' '), record.event.name.lower().replace('_', ' '))
+        yield ('BEGIN:VEVENT\r\n'
+               'UID:%s-%s@%s\r\n'
+               'DTSTAMP:%s\r\n'
+               'DTSTART:%s\r\n'
+               'DTEND:%s\r\n'
+               'SUMMARY:%s\r\n'
+               'END:VEVENT\r\n') % (
+            repr(record.timestamp), record.event.value, comun.APP,
+            get_ics_date(record.timestamp),
+            get_ics_date(record.timestamp - record.duration),
+            get_ics_date(record.timestamp),
+            summary)
+    yield 'END:VCALENDAR\r\n'
+
+
+def export(history, output, file_format='csv', start_time=None,
+           end_time=None):
+    '''
+    Write the records between start_time and end_time to the file object
+    output, one record in memory at a time. It returns the number of
+    records read.
+    '''
+    if file_format == 'csv':
+        formatter = to_csv
+    elif file_format == 'jsonl':
+        formatter = to_jsonl
+    elif file_format == 'ics':
+        formatter = to_ics
+    else:
+        raise ValueError('Unknown format %s' % file_format)
+    counter = [0]
+
+    def records():
+        for record in history.read_range(start_time, end_time):
+            counter[0] += 1
+            yield record
+
+    for line in formatter(records()):
+        output.write(line)
+    return counter[0]
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# history.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import queue
+import struct
+import threading
+import time
+from collections import namedtuple
+from enum import Enum
+from . import comun
+from .engine import State
+
+MAGIC = b'POMODORO'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+# timestamp, event, state, pomodoros, duration
+RECORD = struct.Struct('<dBBHf')
+
+Record = namedtuple('Record', 'timestamp event state pomodoros duration')
+
+
+class Event(Enum):
+    START = 1
+    STOP = 2
+    RESTART = 3
+    SESSION_END = 4
+    BREAK_END = 5
+
+
+class History(object):
+    '''
+    Append-only log of fixed-width binary records
+
+    The file is a header followed by RECORD.size records in time order,
+    so the number of records comes from the file size and a timestamp is
+    found with a binary search. Appends are written by a worker thread.
+    '''
+    def __init__(self, filename=comun.DATA_FILE):
+        self.filename = filename
+        self.queue = None
+        self.thread = None
+        self.fd = None
+        self.listeners = []
+        self.open()
+
+    def open(self):
+        directory = os.path.dirname(self.filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.fd = os.open(self.filename,
+                          os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        header = os.pread(self.fd, HEADER.size, 0)
+        expected = HEADER.pack(MAGIC, VERSION, RECORD.size)
+        if len(header) < HEADER.size and expected.startswith(header):
+            # New file, or the header was cut short
+            os.ftruncate(self.fd, 0)
+            os.write(self.fd, expected)
+        elif header != expected:
+            os.close(self.fd)
+            self.fd = None
+            raise ValueError('%s is not a history file' % self.filename)
+        # A record cut short by a crash or a full disk would misalign
+        # every record appended after it
+        torn = (os.fstat(self.fd).st_size - HEADER.size) % RECORD.size
+        if torn:
+            print('Dropping an incomplete record of %s' % self.filename)
+            os.ftruncate(self.fd, os.fstat(self.fd).st_size - torn)
+
+    def close(self):
+        self.flush()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def append(self, event, state, pomodoros, duration=0, timestamp=None):
+        '''
+        Queue a record, it returns without touching the disk
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+        if self.thread is None:
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self.writer, daemon=True)
+            self.thread.start()
+        self.queue.put(RECORD.pack(timestamp, event.value, state.value,
+                                   pomodoros, duration))
+        record = Record(timestamp, event, state, pomodoros, duration)
+        for listener in self.listeners:
+            listener(record)
+
+    def add_listener(self, callback):
+        '''
+        Call callback(record) for every record appended from now on
+        '''
+        self.listeners.append(callback)
+
+    def writer(self):
+        while True:
+            data = self.queue.get()
+            try:
+                if data is None:
+                    return
+                written = os.write(self.fd, data)
+                if written != len(data):
+                    # Do not leave a partial record behind
+                    os.ftruncate(self.fd,
+                                 os.fstat(self.fd).st_size - written)
+                    print('Short write to %s' % self.filename)
+            except OSError as e:
+                print(e)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        '''
+        Wait until every queued record is written
+        '''
+        if self.queue is not None:
+            self.queue.join()
+
+    def get_count(self):
+        size = os.fstat(self.fd).st_size
+        return max(0, (size - HEADER.size) // RECORD.size)
+
+    def get_record(self, index):
+        data = os.pread(self.fd, RECORD.size,
+                        HEADER.size + index * RECORD.size)
+        timestamp, event, state, pomodoros, duration =\
+            RECORD.unpack(data)
+        return Record(timestamp, Event(event), State(state), pomodoros,
+                      duration)
+
+    def find(self, timestamp):
+        '''
+        Get the index of the first record at or after timestamp
+        '''
+        low, high = 0, self.get_count()
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_record(middle).timestamp < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def read(self, start=0, stop=None, chunk=4096):
+        '''
+        Iterate over the records from index start to stop
+        '''
+        if stop is None:
+            stop = self.get_count()
+        index = start
+        while index < stop:
+            count = min(chunk, stop - index)
+            data = os.pread(self.fd, count * RECORD.size,
+                            HEADER.size + index * RECORD.size)
+            for timestamp, event, state, pomodoros, duration in\
+                    RECORD.iter_unpack(data[:len(data) -
+                                            len(data) % RECORD.size]):
+                yield Record(timestamp, Event(event), State(state),
+                             pomodoros, duration)
+            if len(data) < count * RECORD.size:
+                return
+            index += count
+
+    def read_range(self, start_time=None, end_time=None):
+        '''
+        Iterate over the records between two timestamps
+        '''
+        start = 0 if start_time is None else self.find(start_time)
+        stop = None if end_time is None else self.find(end_time)
+        return self.read(start, stop)
+
+    def watch(self, engine):
+        '''
+        Record the events of a PomodoroEngine
+        '''
+        engine.connect('started', self.on_engine_event, Event.START)
+        engine.connect('stopped', self.on_engine_event, Event.STOP)
+        engine.connect('restarted', self.on_engine_event, Event.RESTART)
+        engine.connect('session-end', self.on_engine_event,
+                       Event.SESSION_END)
+        engine.connect('break-end', self.on_engine_event, Event.BREAK_END)
+
+    def on_engine_event(self, engine, *args):
+        event = args[-1]
+        now = engine.clock()
+        timestamp = time.time()
+        duration = 0
+        if event in (Event.SESSION_END, Event.BREAK_END):
+            # Phases may be ended by a late tick, date them when they
+            # really ended
+            timestamp -= now - engine.transition_time
+            duration = engine.transition_time - engine.countdown.start_time
+        elif engine.countdown is not None:
+            duration = engine.countdown.get_elapsed(now)
+        state = engine.state
+        if event == Event.START:
+            state = State.SESSION
+        self.append(event, state, engine.pomodoros, duration, timestamp)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# iconcache.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('GdkPixbuf', '2.0')
+except Exception as e:
+    print(e)
+    exit(1)
+from gi.repository import GdkPixbuf
+from gi.repository import GLib
+import codecs
+import json
+import os
+from . import comun
+
+MANIFEST_VERSION = 1
+LAST_FRAME = 61
+
+
+def get_asset_names(theme):
+    names = ['pomodoro-indicator-%s-%02d.svg' % (theme, frame)
+             for frame in range(LAST_FRAME + 1)]
+    names.append('pomodoro-start-%s.svg' % theme)
+    names.append('pomodoro-stop-%s.svg' % theme)
+    return names
+
+
+class IconCache(object):
+    '''
+    Rasterizes the themed frames once per (theme, size) into the cache
+    directory so the indicator host never has to render SVG per tick
+
+    With rasterize=False a missing or stale cache is not rasterized, the
+    SVG files are used until the owner calls update()
+    '''
+    def __init__(self, theme, size=22, icondir=comun.ICONDIR,
+                 cachedir=comun.ICON_CACHE_DIR, rasterize=True):
+        self.theme = theme
+        self.size = size
+        self.icondir = icondir
+        self.directory = os.path.join(cachedir, '%s-%s' % (theme, size))
+        self.manifest_file = os.path.join(self.directory, 'manifest.json')
+        self.frames = []
+        self.start_icon = None
+        self.stop_icon = None
+        self.ready = False
+        self.load(rasterize)
+
+    def get_fingerprint(self):
+        fingerprint = {}
+        for name in get_asset_names(self.theme):
+            try:
+                stat = os.stat(os.path.join(self.icondir, name))
+                fingerprint[name] = [stat.st_mtime_ns, stat.st_size]
+            except OSError:
+                fingerprint[name] = None
+        return {'version': MANIFEST_VERSION,
+                'theme': self.theme,
+                'size': self.size,
+                'assets': fingerprint}
+
+    def read_manifest(self):
+        try:
+            with codecs.open(self.manifest_file, 'r', 'utf-8') as f:
+                return json.loads(f.read())
+        except (IOError, ValueError):
+            return None
+
+    def get_cached_name(self, name):
+        return os.path.join(self.directory,
+                            os.path.splitext(name)[0] + '.png')
+
+    def rasterize(self, fingerprint):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        if os.path.exists(self.manifest_file):
+            os.remove(self.manifest_file)
+        for name in get_asset_names(self.theme):
+            if fingerprint['assets'][name] is None:
+                continue
+            pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(
+                os.path.join(self.icondir, name), self.size, self.size)
+            pixbuf.savev(self.get_cached_name(name), 'png', [], [])
+        # The manifest is written last so an interrupted run is redone
+        with codecs.open(self.manifest_file, 'w', 'utf-8') as f:
+            f.write(json.dumps(fingerprint))
+
+    def load(self, rasterize=True):
+        fingerprint = self.get_fingerprint()
+        get_path = self.get_cached_name
+        self.ready = True
+        if self.read_manifest() != fingerprint:
+            get_path = (lambda name: os.path.join(self.icondir, name))
+            if not rasterize:
+                self.ready = False
+            else:
+                try:
+                    self.rasterize(fingerprint)
+                    get_path = self.get_cached_name
+                except (GLib.Error, IOError, OSError) as e:
+                    print(e)
+        names = get_asset_names(self.theme)
+        self.frames = [get_path(name) for name in names[:LAST_FRAME + 1]]
+        self.start_icon = get_path(names[LAST_FRAME + 1])
+        self.stop_icon = get_path(names[LAST_FRAME + 2])
+
+    def update(self):
+        '''
+        Rasterize the cache if it was not
+        '''
+        if not self.ready:
+            self.load()
+
+    def get_frame(self, frame):
+        return self.frames[frame]
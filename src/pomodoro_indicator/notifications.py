@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# notifications.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('Gio', '2.0')
+    gi.require_version('GLib', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import Gio
+from gi.repository import GLib
+
+NOTIFICATIONS_NAME = 'org.freedesktop.Notifications'
+NOTIFICATIONS_PATH = '/org/freedesktop/Notifications'
+# Milliseconds notifications wait to be merged with the following ones
+COALESCE_DELAY = 150
+# Milliseconds the notification daemon has to answer
+CALL_TIMEOUT = 2000
+# Seconds without trying again after the daemon failed
+RETRY_DELAY = 60
+
+
+class Notifier(object):
+    '''
+    Sends notifications to org.freedesktop.Notifications asynchronously
+
+    Messages sent within COALESCE_DELAY are shown together, and every
+    notification replaces the previous one. Only one call is in flight,
+    so a slow daemon delays and merges the notifications but never the
+    main loop. When there is no daemon the messages are printed.
+    '''
+    def __init__(self, app_name, summary, connection=None):
+        self.app_name = app_name
+        self.summary = summary
+        self.connection = connection
+        self.messages = []
+        self.icon = ''
+        self.replaces_id = 0
+        self.flush_id = 0
+        self.calling = False
+        self.disabled_until = 0
+
+    def notify(self, message, icon=None):
+        self.messages.append(message)
+        if icon:
+            self.icon = icon
+        if not self.flush_id and not self.calling:
+            self.flush_id = GLib.timeout_add(COALESCE_DELAY, self.on_flush)
+
+    def close(self):
+        if self.flush_id:
+            GLib.source_remove(self.flush_id)
+            self.flush_id = 0
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        return self.connection
+
+    def on_flush(self):
+        self.flush_id = 0
+        self.send()
+        return False
+
+    def send(self):
+        if not self.messages:
+            return
+        body = '\n'.join(self.messages)
+        self.messages = []
+        if GLib.get_monotonic_time() < self.disabled_until:
+            print(body)
+            return
+        try:
+            connection = self.get_connection()
+        except GLib.Error as e:
+            print(e)
+            self.disable(body)
+            return
+        self.calling = True
+        connection.call(NOTIFICATIONS_NAME, NOTIFICATIONS_PATH,
+                        NOTIFICATIONS_NAME, 'Notify',
+                        GLib.Variant('(susssasa{sv}i)', (
+                            self.app_name, self.replaces_id, self.icon,
+                            self.summary, body, [], {}, -1)),
+                        GLib.VariantType.new('(u)'),
+                        Gio.DBusCallFlags.NONE, CALL_TIMEOUT, None,
+                        self.on_reply, body)
+
+    def disable(self, body):
+        self.disabled_until = GLib.get_monotonic_time() +\
+            RETRY_DELAY * 1000000
+        print(body)
+
+    def on_reply(self, connection, result, body):
+        self.calling = False
+        try:
+            self.replaces_id = connection.call_finish(result).unpack()[0]
+        except GLib.Error as e:
+            # Missing, broken or hung daemon
+            print(e)
+            self.disable(body)
+        # Messages that came during the call are merged in the next one
+        if self.messages and not self.flush_id:
+            self.send()
@@ -25,6 +25,7 @@
 import gi
 try:
     gi.require_version('Gst', '1.0')
+    gi.require_version('GstController', '1.0')
     gi.require_version('Gtk', '3.0')
     gi.require_version('GLib', '2.0')
     gi.require_version('GObject', '2.0')
@@ -32,9 +33,19 @@ except Exception as e:
     print(e)
     exit(-1)
 from gi.repository import Gst
+from gi.repository import GstController
 from gi.repository import GLib
 from gi.repository import GObject
 from enum import Enum
+from . import comun
+from . import soundcache
+from .soundcache import SoundCache
+
+# Milliseconds a state change may take before the pipeline is dropped
+STATE_TIMEOUT = 3000
+URI_SOURCE = 'uridecodebin name=urisrc'
+APP_SOURCE = 'appsrc name=src format=time stream-type=seekable'
+SINK = 'autoaudiosink'
 
 
 class Status(Enum):
@@ -50,130 +61,400 @@ class Player(GObject.GObject):
         'paused': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, (int,)),
     }
 
-    def __init__(self):
+    def __init__(self, sink=SINK, cache_directory=comun.SOUND_CACHE_DIR):
         GObject.GObject.__init__(self)
         Gst.init_check(None)
+        self.sink = sink
         self.status = Status.STOPPED
         self.player = None
         self.speed = 1.0
         self.volume = 1.0
+        self.gains = {}
+        self.filename = None
         self.removesilence = False
         self.equalizer = {'band0': 0, 'band1': 0, 'band2': 0, 'band3': 0,
                           'band4': 0, 'band5': 0, 'band6': 0, 'band7': 0,
                           'band8': 0, 'band9': 0}
         self.lastpos = 0
+        self.pipelines = {}
+        self.elements = {}
+        self.applied = {}
+        self.ramps = {}
+        self.fade_in_length = 0
+        self.sound_cache = SoundCache(cache_directory,
+                                      callback=self.on_sound_loaded)
+        self.seek_pending = False
+        self.seek_position = None
+        self.state_watch = 0
 
     def get_status(self):
         '''
         Get the status of the player
         '''
         if self.player is not None:
-            if self.player.get_state(Gst.CLOCK_TIME_NONE)[1] ==\
-                    Gst.State.PLAYING:
-                return Status.PLAYING
-            elif self.player.get_state(Gst.CLOCK_TIME_NONE)[1] ==\
-                    Gst.State.PAUSED:
-                return Status.PAUSED
+            return self.status
         return Status.STOPPED
 
-    def get_player(self):
-        player = Gst.parse_launch('uridecodebin name=urisrc !\
+    def get_player(self, source=URI_SOURCE):
+        player = Gst.parse_launch(source + ' !\
  audioconvert ! audioresample ! queue ! removesilence name=removesilence !\
  audioconvert ! audioresample ! queue ! scaletempo !\
  audioconvert ! audioresample ! volume name=volume !\
- equalizer-10bands name=equalizer ! autoaudiosink')
+ equalizer-10bands name=equalizer ! ' + self.sink)
         bus = player.get_bus()
         bus.add_signal_watch()
-        bus.connect('message::state-changed', self.on_state_changed)
-        bus.connect('message', self.on_player_message)
+        bus.connect('message::state-changed', self.on_state_changed, player)
+        bus.connect('message', self.on_player_message, player)
         return player
 
+    def create_pipeline(self, filename):
+        '''
+        Create a pipeline for filename and pre-roll it, it decodes the
+        file itself until the decoded sound is ready
+        '''
+        sound = self.sound_cache.get(filename)
+        if sound is None:
+            pipeline = self.get_player()
+            pipeline.get_by_name('urisrc').set_property('uri',
+                                                        'file://' + filename)
+        else:
+            # Already decoded, no disk access nor decoding when it plays
+            pipeline = self.get_player(APP_SOURCE)
+            src = pipeline.get_by_name('src')
+            src.set_property('caps', Gst.Caps.from_string(soundcache.CAPS))
+            offset = [0]
+            src.connect('need-data', self.on_need_data, sound, offset)
+            src.connect('seek-data', self.on_seek_data, sound, offset)
+        self.elements[pipeline] = dict(
+            (name, pipeline.get_by_name(name))
+            for name in ('removesilence', 'volume', 'equalizer'))
+        self.applied[pipeline] = {'speed': 1.0}
+        pipeline.set_state(Gst.State.PAUSED)
+        return pipeline
+
+    def get_properties(self):
+        properties = {('removesilence', 'remove'): self.removesilence,
+                      ('volume', 'volume'): self.get_gain(self.volume)}
+        for band, gain in self.equalizer.items():
+            properties[('equalizer', band)] = gain
+        return properties
+
+    def set_gain(self, filename, gain):
+        '''
+        Set the volume factor that normalizes the loudness of filename,
+        it is applied on top of the volume
+        '''
+        self.gains[filename] = gain
+        if filename == self.filename:
+            self.apply()
+
+    def get_gain(self, volume):
+        '''
+        Get the volume of the element for volume with the current sound
+        '''
+        return volume * self.gains.get(self.filename, 1.0)
+
+    def apply(self):
+        '''
+        Apply to the current pipeline only the properties that changed
+        since they were last applied to it. Only a speed change needs a
+        seek.
+        '''
+        if self.player is None:
+            return
+        elements = self.elements[self.player]
+        applied = self.applied[self.player]
+        for key, value in self.get_properties().items():
+            if applied.get(key) != value:
+                elements[key[0]].set_property(key[1], value)
+                applied[key] = value
+        if applied['speed'] != self.speed:
+            applied['speed'] = self.speed
+            self.seek()
+
+    def set_properties(self, volume=None, speed=None, removesilence=None,
+                       equalizer=None):
+        '''
+        Update several properties at once and apply them in one go
+        '''
+        if volume is not None:
+            self.volume = volume
+        if speed is not None:
+            self.speed = speed
+        if removesilence is not None:
+            self.removesilence = removesilence
+        if equalizer is not None:
+            self.equalizer.update(equalizer)
+        self.apply()
+
+    def forget(self, pipeline):
+        self.elements.pop(pipeline, None)
+        self.applied.pop(pipeline, None)
+        self.ramps.pop(pipeline, None)
+
+    def set_volume_ramp(self, points):
+        '''
+        Automate the volume of the current pipeline
+
+        points is a list of (seconds, volume) in stream time, the volume
+        is linearly interpolated between them by the pipeline itself
+        '''
+        if self.player is None:
+            return
+        self.clear_volume_ramp()
+        element = self.elements[self.player]['volume']
+        source = GstController.InterpolationControlSource.new()
+        source.set_property('mode', GstController.InterpolationMode.LINEAR)
+        for seconds, volume in points:
+            source.set(int(seconds * Gst.SECOND), volume)
+        binding = GstController.DirectControlBinding.new_absolute(
+            element, 'volume', source)
+        element.add_control_binding(binding)
+        self.ramps[self.player] = binding
+
+    def clear_volume_ramp(self):
+        if self.player is None or self.player not in self.ramps:
+            return
+        element = self.elements[self.player]['volume']
+        element.remove_control_binding(self.ramps.pop(self.player))
+        # The volume has to be set again once the ramp is gone
+        self.applied[self.player].pop(('volume', 'volume'), None)
+        self.apply()
+
+    def fade(self, volume, duration, start=None):
+        '''
+        Fade from the current volume to volume in duration seconds
+        starting at start (the current position by default). The ramp
+        lasts until the next sound is set.
+        '''
+        if start is None:
+            start = self.get_position()
+        self.set_volume_ramp([(start, self.get_gain(self.volume)),
+                              (start + duration, self.get_gain(volume))])
+
+    def fade_in(self, duration):
+        '''
+        Fade in from silence at the start of the sound
+        '''
+        self.set_volume_ramp([(0, 0.0),
+                              (duration, self.get_gain(self.volume))])
+
+    def fade_out(self, duration):
+        self.fade(0.0, duration)
+
+    def on_need_data(self, src, length, sound, offset):
+        if offset[0] >= sound.size:
+            src.emit('end-of-stream')
+            return
+        buffer = sound.get_buffer(offset[0])
+        offset[0] += buffer.get_size()
+        src.emit('push-buffer', buffer)
+
+    def on_seek_data(self, src, nanosecs, sound, offset):
+        offset[0] = sound.get_offset(nanosecs)
+        return True
+
+    def preload(self, filenames):
+        '''
+        Keep one pre-rolled pipeline for every filename and release the
+        pipelines of the sounds no longer used
+        '''
+        filenames = set(filenames)
+        for filename in list(self.pipelines.keys()):
+            if filename not in filenames:
+                self.remove_pipeline(filename)
+                self.sound_cache.release(filename)
+                self.gains.pop(filename, None)
+        for filename in filenames:
+            self.get_pipeline(filename)
+
+    def get_pipeline(self, filename):
+        '''
+        Get the pooled pipeline for filename, a pipeline that decodes the
+        file is replaced once the decoded sound is ready
+        '''
+        pipeline = self.pipelines.get(filename)
+        if pipeline is not None and\
+                pipeline.get_by_name('urisrc') is not None and\
+                self.sound_cache.get(filename) is not None:
+            self.remove_pipeline(filename)
+            pipeline = None
+        if pipeline is None:
+            pipeline = self.create_pipeline(filename)
+            self.pipelines[filename] = pipeline
+        return pipeline
+
+    def remove_pipeline(self, filename):
+        pipeline = self.pipelines.pop(filename)
+        self.forget(pipeline)
+        if pipeline is self.player:
+            self.player = None
+            self.status = Status.STOPPED
+        pipeline.set_state(Gst.State.NULL)
+
+    def on_sound_loaded(self, filename):
+        # The pipeline in use is swapped the next time it is set
+        pipeline = self.pipelines.get(filename)
+        if pipeline is not None and pipeline is not self.player:
+            self.get_pipeline(filename)
+
+    def close(self):
+        self.sound_cache.close()
+
+    def rewind(self, pipeline):
+        pipeline.seek_simple(Gst.Format.TIME, Gst.SeekFlags.FLUSH, 0)
+        # A simple seek plays at normal speed, the next apply() seeks
+        # again at the speed set
+        if pipeline in self.applied:
+            self.applied[pipeline]['speed'] = 1.0
+
+    def drop(self, pipeline):
+        '''
+        Release a failed pipeline so it is built again on next use
+        '''
+        pipeline.set_state(Gst.State.NULL)
+        for filename, pooled in list(self.pipelines.items()):
+            if pooled is pipeline:
+                del self.pipelines[filename]
+        self.forget(pipeline)
+        if pipeline is self.player:
+            self.player = None
+            self.status = Status.STOPPED
+            self.emit('stopped', 0)
+
+    def is_prerolled(self):
+        ret, state, pending = self.player.get_state(0)
+        return ret != Gst.StateChangeReturn.ASYNC and\
+            state in (Gst.State.PAUSED, Gst.State.PLAYING)
+
+    def seek(self, position=None):
+        '''
+        Seek to position (seconds, the current one by default) at the
+        current speed. It is deferred until the pipeline is pre-rolled.
+        '''
+        if self.player is None:
+            return
+        if not self.is_prerolled():
+            self.seek_pending = True
+            self.seek_position = position
+            return
+        self.seek_pending = False
+        if position is None:
+            ok, nanosecs = self.player.query_position(Gst.Format.TIME)
+            if not ok:
+                nanosecs = 0
+        else:
+            nanosecs = int(position * Gst.SECOND)
+        self.player.seek(self.speed, Gst.Format.TIME, Gst.SeekFlags.FLUSH,
+                         Gst.SeekType.SET, nanosecs, Gst.SeekType.NONE, -1)
+
+    def watch_state(self, state):
+        '''
+        Give up on the pipeline if it does not reach state in time
+        '''
+        self.cancel_watch()
+        self.state_watch = GLib.timeout_add(STATE_TIMEOUT,
+                                            self.on_state_timeout,
+                                            self.player, state)
+
+    def cancel_watch(self):
+        if self.state_watch > 0:
+            GLib.source_remove(self.state_watch)
+            self.state_watch = 0
+
+    def on_state_timeout(self, pipeline, state):
+        self.state_watch = 0
+        if pipeline.get_state(0)[1] != state:
+            print('Error: pipeline did not reach %s' % state.value_nick)
+            self.drop(pipeline)
+        return False
+
     def emit(self, *args):
         GLib.idle_add(GObject.GObject.emit, self, *args)
 
-    def on_player_message(self, bus, message):
+    def on_player_message(self, bus, message, pipeline):
         t = message.type
         # print('---', t, '---')
         if t == Gst.MessageType.EOS:
-            self.player.set_state(Gst.State.NULL)
+            # Stay pre-rolled at the start, ready for the next time
+            pipeline.set_state(Gst.State.PAUSED)
+            self.rewind(pipeline)
+            if pipeline is self.player:
+                self.status = Status.STOPPED
+                self.emit('stopped', 0)
         elif t == Gst.MessageType.ERROR:
-            self.player.set_state(Gst.State.NULL)
             err, debug = message.parse_error()
             print('Error: %s' % err, debug)
+            self.drop(pipeline)
 
-    def on_state_changed(self, bus, msg):
+    def on_state_changed(self, bus, msg, pipeline):
+        if msg.src is not pipeline or pipeline is not self.player:
+            return
         old, new, pending = msg.parse_state_changed()
         # print('---', old, new, pending, '---')
+        if pending != Gst.State.VOID_PENDING:
+            return
+        if self.seek_pending and new in (Gst.State.PAUSED,
+                                         Gst.State.PLAYING):
+            self.seek(self.seek_position)
+        if new == Gst.State.PLAYING and self.status == Status.PLAYING:
+            self.cancel_watch()
+            self.emit('started', self.get_position())
+        elif new == Gst.State.PAUSED and self.status == Status.PAUSED:
+            self.cancel_watch()
+            self.emit('paused', self.get_position())
 
     def set_filename(self, filename):
-        if self.player is not None:
-            self.player.set_state(Gst.State.NULL)
-        self.player = self.get_player()
-        self.player.get_by_name('urisrc').set_property('uri',
-                                                       'file://' + filename)
+        pipeline = self.get_pipeline(filename)
+        if self.player is not None and self.player is not pipeline:
+            self.player.set_state(Gst.State.PAUSED)
+            self.rewind(self.player)
+        self.player = pipeline
+        self.filename = filename
+        self.rewind(self.player)
+        if self.fade_in_length > 0:
+            self.fade_in(self.fade_in_length)
+        else:
+            self.clear_volume_ramp()
 
     def play(self):
         '''
         Play the player
+
+        It returns at once, the started signal is emitted when the
+        pipeline is actually playing
         '''
         if self.player is not None:
-            self.player.set_state(Gst.State.PLAYING)
-            self.player.get_state(Gst.CLOCK_TIME_NONE)
-            self.player.get_by_name('removesilence').set_property(
-                'remove', self.removesilence)
-            self.player.get_by_name('volume').set_property('volume',
-                                                           self.volume)
-            self.player.get_by_name('equalizer').set_property(
-                'band0', self.equalizer['band0'])
-            self.player.get_by_name('equalizer').set_property(
-                'band1', self.equalizer['band1'])
-            self.player.get_by_name('equalizer').set_property(
-                'band2', self.equalizer['band2'])
-            self.player.get_by_name('equalizer').set_property(
-                'band3', self.equalizer['band3'])
-            self.player.get_by_name('equalizer').set_property(
-                'band4', self.equalizer['band4'])
-            self.player.get_by_name('equalizer').set_property(
-                'band5', self.equalizer['band5'])
-            self.player.get_by_name('equalizer').set_property(
-                'band6', self.equalizer['band6'])
-            self.player.get_by_name('equalizer').set_property(
-                'band7', self.equalizer['band7'])
-            self.player.get_by_name('equalizer').set_property(
-                'band8', self.equalizer['band8'])
-            self.player.get_by_name('equalizer').set_property(
-                'band9', self.equalizer['band9'])
-            pos = self.player.query_position(Gst.Format.TIME)[1]
-            self.player.seek(self.speed, Gst.Format.TIME, Gst.SeekFlags.FLUSH,
-                             Gst.SeekType.SET, pos, Gst.SeekType.NONE, -1)
+            self.apply()
             self.status = Status.PLAYING
-            self.emit('started', self.get_position())
+            self.player.set_state(Gst.State.PLAYING)
+            self.watch_state(Gst.State.PLAYING)
 
     def pause(self):
         '''
         Pause the player
         '''
         if self.player is not None:
-            self.player.set_state(Gst.State.PAUSED)
             self.status = Status.PAUSED
-            self.emit('paused', self.get_position())
+            self.player.set_state(Gst.State.PAUSED)
+            self.watch_state(Gst.State.PAUSED)
 
     def stop(self):
         '''
         Stop the player
         '''
         if self.player is not None:
+            self.cancel_watch()
             self.player.set_state(Gst.State.READY)
             self.status = Status.STOPPED
-            self.emit('stopped', self.get_position())
+            self.emit('stopped', 0)
 
     def set_volume(self, volume):
         '''
         Set player volume
         '''
         self.volume = volume
-        if self.get_status() == Status.PLAYING:
-            self.play()
+        self.apply()
 
     def get_volume(self):
         '''
@@ -186,8 +467,7 @@ class Player(GObject.GObject):
         Set if player removes silences
         '''
         self.removesilence = removesilence
-        if self.get_status() == Status.PLAYING:
-            self.play()
+        self.apply()
 
     def get_removesilence(self):
         '''
@@ -196,9 +476,8 @@ class Player(GObject.GObject):
         return self.removesilence
 
     def set_equalizaer(self, equalizer):
-        self.equalizer = equalizer
-        if self.get_status() == Status.PLAYING:
-            self.play()
+        self.equalizer = dict(equalizer)
+        self.apply()
 
     def set_equalizer_by_band(self, band, gain):
         '''
@@ -218,8 +497,7 @@ class Player(GObject.GObject):
         if band >= 0 and band <= 9 and gain >= -24 and gain <= 12:
             band = 'band{0}'.format(band)
             self.equalizer[band] = gain
-        if self.get_status() == Status.PLAYING:
-            self.play()
+        self.apply()
 
     def get_equalizer(self):
         '''
@@ -232,8 +510,7 @@ class Player(GObject.GObject):
         Set player speed
         '''
         self.speed = speed
-        if self.get_status() == Status.PLAYING:
-            self.play()
+        self.apply()
 
     def get_speed(self):
         '''
@@ -243,35 +520,21 @@ class Player(GObject.GObject):
 
     def set_position(self, position):
         if self.player is not None:
-            self.player.get_state(Gst.CLOCK_TIME_NONE)
-            self.player.set_state(Gst.State.PAUSED)
-            try:
-                assert self.player.seek_simple(Gst.Format.TIME,
-                                               Gst.SeekFlags.FLUSH,
-                                               position * Gst.SECOND)
-                self.player.get_state(Gst.CLOCK_TIME_NONE)
-                pos = self.player.query_position(Gst.Format.TIME)[1]
-                self.player.seek(self.speed, Gst.Format.TIME,
-                                 Gst.SeekFlags.FLUSH, Gst.SeekType.SET, pos,
-                                 Gst.SeekType.NONE, -1)
-            except AssertionError as e:
-                print(e)
-            self.player.set_state(Gst.State.PLAYING)
+            self.seek(position)
 
     def get_position(self):
         if self.player is not None:
-            self.player.get_state(Gst.CLOCK_TIME_NONE)
-            nanosecs = self.player.query_position(Gst.Format.TIME)[1]
-            position = float(nanosecs) / Gst.SECOND
-            return position
+            ok, nanosecs = self.player.query_position(Gst.Format.TIME)
+            if ok:
+                return float(nanosecs) / Gst.SECOND
         return 0
 
     def get_duration(self):
         if self.player is not None:
-            self.player.get_state(Gst.CLOCK_TIME_NONE)
-            duration_nanosecs = self.player.query_duration(Gst.Format.TIME)[1]
-            duration = float(duration_nanosecs) / Gst.SECOND
-            return duration
+            ok, duration_nanosecs = self.player.query_duration(
+                Gst.Format.TIME)
+            if ok:
+                return float(duration_nanosecs) / Gst.SECOND
         return 0
 
 
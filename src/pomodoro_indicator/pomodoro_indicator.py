@@ -24,37 +24,52 @@
 import gi
 try:
     gi.require_version('Gtk', '3.0')
-    gi.require_version('Gst', '1.0')
+    gi.require_version('Gio', '2.0')
     gi.require_version('GLib', '2.0')
     gi.require_version('GdkPixbuf', '2.0')
     gi.require_version('AppIndicator3', '0.1')
-    gi.require_version('Notify', '0.7')
     gi.require_version('GObject', '2.0')
 except Exception as e:
     print(e)
     exit(1)
 
 from gi.repository import Gtk
-from gi.repository import Gst
+from gi.repository import Gio
 from gi.repository import GLib
 from gi.repository import GdkPixbuf
 from gi.repository import AppIndicator3 as appindicator
-from gi.repository import Notify
 from gi.repository import GObject
 
-import os
-import webbrowser
-import dbus
 from .configurator import Configuration
-from .preferences_dialog import PreferencesDialog
-from .player import Player
-from .player import Status
+from .engine import PomodoroEngine
+from .engine import State
+from .engine import MAX_FRAMES
+from .engine import TOTAL_FRAMES
+from .engine import get_lengths
+from .iconcache import IconCache
+from .history import History
+from .scheduler import Scheduler
+from .notifications import Notifier
 from .comun import _
 from . import comun
 
-BUS_NAME = 'es.atareao.pomodoro'
-BUS_PATH = '/es/atareao/pomodoro'
-TOTAL_FRAMES = 60
+TIMER_PREFERENCES = ('number_of_pomodoros', 'session_length', 'break_length',
+                     'long_break_length')
+SOUND_PREFERENCES = ('play_sounds', 'session_sound_file', 'break_sound_file',
+                     'fade_in_length')
+ICON_PREFERENCES = ('theme', 'icon_size', 'frames')
+TEAM_PREFERENCES = ('team_server', 'team_room')
+# Name of the main timer in the scheduler, named timers come from the
+# timers preference
+MAIN_TIMER = ''
+# Reply of RequestName when the name is ours
+DBUS_REQUEST_NAME_REPLY_PRIMARY_OWNER = 1
+DBUS_NAME_FLAG_DO_NOT_QUEUE = 4
+
+
+def open_url(url):
+    import webbrowser
+    webbrowser.open(url)
 
 
 def add2menu(menu, text=None, icon=None, conector_event=None,
@@ -79,14 +94,10 @@ def add2menu(menu, text=None, icon=None, conector_event=None,
 
 
 class Pomodoro_Indicator(GObject.GObject):
-    __gsignals__ = {
-        'session_end': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, ()),
-        'break_end': (GObject.SIGNAL_RUN_FIRST, GObject.TYPE_NONE, ()),
-    }
-
     def __init__(self):
         GObject.GObject.__init__(self)
         self.pw = 0
+        self.wakeup_deadline = None
         # self.player = Gst.ElementFactory.make("playbin", "player")
         # self.player.connect("about-to-finish",  self.on_player_finished)
         # bus = self.player.get_bus()
@@ -94,13 +105,41 @@ class Pomodoro_Indicator(GObject.GObject):
         self.icon = comun.ICON
         self.active_icon = None
         self.about_dialog = None
-        self.active = False
-        self.animate = False
-        self.frame = 0
-        self.pomodoros = 0
-        self.player = Player()
-        self.notification = Notify.Notification.new('', '', None)
+        self.icon_cache = None
+        self.renderer = None
+        self.indicator = None
+        self.player = None
+        self.notifier = Notifier(comun.APP, comun.APPNAME)
+        self.statistics = None
+        self.statistics_items = {}
+        self.menu_statistics = None
+        self.service = None
+        self.control_server = None
+        self.sleep_monitor = None
+        self.status_writer = None
+        self.timers = {}
+        self.timers_menu = None
+        self.team_client = None
+        self.checkpoint = None
+        self.sound_library = None
+        self.menu_timers = None
+        self.scheduler = Scheduler()
+        self.engine = PomodoroEngine()
+        self.scheduler.add(MAIN_TIMER, self.engine)
+        self.engine.connect('started', self.on_engine_started)
+        self.engine.connect('stopped', self.on_engine_stopped)
+        self.engine.connect('restarted', self.on_engine_started)
+        self.engine.connect('frame-changed', self.on_frame_changed)
+        self.engine.connect('session-end', self.on_session_end)
+        self.engine.connect('break-end', self.on_break_end)
+        try:
+            self.history = History()
+            self.history.watch(self.engine)
+        except (ValueError, OSError) as e:
+            print(e)
+            self.history = None
         self.read_preferences()
+        self.watch_preferences()
         #
         self.indicator = appindicator.Indicator.new('Pomodoro-Indicator',
                                                     self.active_icon,
@@ -113,22 +152,119 @@ class Pomodoro_Indicator(GObject.GObject):
 
         menu = self.get_menu()
         self.indicator.set_menu(menu)
-        self.connect('session_end', self.on_session_end)
-        self.connect('break_end', self.on_break_end)
+        # Everything else waits until the indicator is shown
+        GLib.idle_add(self.start_services)
+        GLib.idle_add(self.start_sound_library, priority=GLib.PRIORITY_LOW)
+
+    def start_services(self):
+        '''
+        Rasterize the icons, load the statistics, resume the checkpoint
+        and publish the status on the buses and files
+        '''
+        from .control_server import ControlServer
+        from .service import DBusService
+        from .sleep_monitor import SleepMonitor
+        from .statistics import Statistics
+        from .statusmap import StatusWriter
+        if not self.icon_cache.ready:
+            self.icon_cache.update()
+            self.active_icon = self.icon_cache.start_icon
+            self.refresh_icon()
+        if self.history is not None:
+            # Queued records are in the log before it is replayed
+            self.history.flush()
+            self.statistics = Statistics(self.history)
+            self.history.add_listener(self.on_history_record)
+            self.update_statistics_menu()
+            self.menu_statistics.show()
+        self.resume_checkpoint()
+        try:
+            self.service = DBusService(self)
+        except GLib.Error as e:
+            print(e)
+        try:
+            self.control_server = ControlServer(self)
+        except OSError as e:
+            print(e)
+        try:
+            self.sleep_monitor = SleepMonitor(self.on_resume)
+        except GLib.Error as e:
+            print(e)
+        try:
+            self.status_writer = StatusWriter()
+            self.status_writer.watch(self.engine)
+        except OSError as e:
+            print(e)
+        return False
 
-    def emit(self, *args):
-        GLib.idle_add(GObject.GObject.emit, self, *args)
+    def start_sound_library(self):
+        '''
+        Bring the sound index up to date in the background, so the
+        preferences dialog opens with it ready
+        '''
+        from .soundlibrary import SoundLibrary
+        self.sound_library = SoundLibrary()
+        return False
+
+    def resume_checkpoint(self):
+        '''
+        Go on with the phase that was running when the last process
+        ended, and save every phase from now on
+        '''
+        from .checkpoint import Checkpoint
+        try:
+            self.checkpoint = Checkpoint()
+        except OSError as e:
+            print(e)
+            self.checkpoint = None
+            return
+        if self.team_client is None and self.checkpoint.restore(self.engine):
+            self.pomodoro_start.set_label(_('Stop'))
+            if self.play_sounds:
+                self.get_player()
+            self.engine.tick()
+            self.schedule_next_frame(MAIN_TIMER)
+        self.checkpoint.watch(self.engine)
 
     def on_scroll(self, widget, steps, direcction):
         self.on_pomodoro_start(None)
 
+    def get_player(self):
+        '''
+        Get the player, GStreamer is only loaded the first time it is
+        needed
+        '''
+        if self.player is None:
+            from .player import Player
+            self.player = Player()
+            self.update_player()
+        return self.player
+
+    def update_player(self):
+        self.player.fade_in_length = self.fade_in_length
+        if self.play_sounds:
+            # The named timers are pre-rolled too, or their alarms would
+            # build and decode their pipelines when they fire
+            filenames = [self.session_sound_file, self.break_sound_file]
+            for timer in self.timers.values():
+                filenames.append(timer['session_sound_file'])
+                filenames.append(timer['break_sound_file'])
+            self.player.preload(filenames)
+        else:
+            self.player.preload([])
+
     def play(self, afile):
         # self.player.set_property('uri', 'file://'+afile)
         # self.player.set_state(Gst.State.PLAYING)
-        if self.player.status == Status.PLAYING:
-            self.player.pause()
-        self.player.set_filename(afile)
-        self.player.play()
+        from .player import Status
+        player = self.get_player()
+        if player.status == Status.PLAYING:
+            player.pause()
+        if self.sound_library is not None:
+            # Read from the index, sounds are never analysed here
+            player.set_gain(afile, self.sound_library.get_gain(afile))
+        player.set_filename(afile)
+        player.play()
         '''
         song = pyglet.media.load(afile)
         song.play()
@@ -159,32 +295,228 @@ class Pomodoro_Indicator(GObject.GObject):
         configuration = Configuration()
         self.first_time = configuration.get('first-time')
         self.version = configuration.get('version')
-        self.theme = configuration.get('theme')
+        self.read_timer_preferences(configuration)
+        self.read_sound_preferences(configuration)
+        self.read_icon_preferences(configuration)
+        self.read_timers_preferences(configuration)
+        self.read_team_preferences(configuration)
+        self.sleep_policy = configuration.get('sleep_policy')
+
+    def watch_preferences(self):
+        '''
+        Apply every preference as soon as it changes
+        '''
+        configuration = Configuration()
+        for key in TIMER_PREFERENCES:
+            configuration.connect(key, self.read_timer_preferences)
+        for key in SOUND_PREFERENCES:
+            configuration.connect(key, self.read_sound_preferences)
+        for key in ICON_PREFERENCES:
+            configuration.connect(key, self.read_icon_preferences)
+        # Named timers fall back to the main timer preferences
+        for key in ('timers',) + TIMER_PREFERENCES + SOUND_PREFERENCES:
+            configuration.connect(key, self.read_timers_preferences)
+        for key in TEAM_PREFERENCES:
+            configuration.connect(key, self.read_team_preferences)
+        configuration.connect('sleep_policy', self.on_sleep_policy_changed)
+        configuration.watch()
+
+    def read_timer_preferences(self, configuration, *args):
         self.max_pomodoros = configuration.get('number_of_pomodoros')
         self.session_length = configuration.get('session_length')
         self.break_length = configuration.get('break_length')
         self.long_break_length = configuration.get('long_break_length')
+        self.engine.configure(session_length=self.session_length,
+                              break_length=self.break_length,
+                              long_break_length=self.long_break_length,
+                              number_of_pomodoros=self.max_pomodoros)
+
+    def read_sound_preferences(self, configuration, *args):
         self.play_sounds = configuration.get('play_sounds')
         self.session_sound_file = configuration.get('session_sound_file')
+        if self.session_sound_file == 'default':
+            self.session_sound_file = comun.DEFAULT_SESSION_SOUND_FILE
         self.break_sound_file = configuration.get('break_sound_file')
-        self.active_icon = comun.STATUS_ICON[configuration.get('theme')][0]
+        if self.break_sound_file == 'default':
+            self.break_sound_file = comun.DEFAULT_BREAK_SOUND_FILE
+        self.fade_in_length = configuration.get('fade_in_length')
+        if self.player is not None:
+            self.update_player()
+
+    def read_icon_preferences(self, configuration, *args):
+        self.theme = configuration.get('theme')
+        icon_size = configuration.get('icon_size')
+        if self.icon_cache is None or self.icon_cache.theme != self.theme or\
+                self.icon_cache.size != icon_size:
+            # At startup the SVG files are shown until it is rasterized
+            self.icon_cache = IconCache(self.theme, icon_size,
+                                        rasterize=self.indicator is not None)
+        self.active_icon = self.icon_cache.start_icon
+        # The shipped artwork only has TOTAL_FRAMES frames, any other
+        # resolution is drawn on demand
+        try:
+            frames = max(1, min(MAX_FRAMES, int(configuration.get('frames'))))
+        except (TypeError, ValueError) as e:
+            print(e)
+            frames = TOTAL_FRAMES
+        IconRenderer = None
+        if frames != TOTAL_FRAMES:
+            try:
+                from .renderer import IconRenderer
+            except ImportError as e:
+                print(e)
+        if IconRenderer is not None:
+            if self.renderer is None or self.renderer.size != icon_size:
+                self.renderer = IconRenderer(icon_size, frames)
+            else:
+                self.renderer.set_steps(frames)
+        else:
+            frames = TOTAL_FRAMES
+            self.renderer = None
+        self.engine.configure(frames=frames)
+        self.refresh_icon()
+
+    def read_timers_preferences(self, configuration, *args):
+        '''
+        Create, configure or remove the named timers, every one is a
+        dictionary with a name and, optionally, its own lengths and
+        sound files
+        '''
+        entries = configuration.get('timers') or []
+        if not isinstance(entries, list):
+            print('Ignoring the timers, they are not a list')
+            entries = []
+        timers = {}
+        for options in entries:
+            # The list is edited by hand, bad entries are left out
+            if not isinstance(options, dict):
+                print('Ignoring the timer %r, it is not a dictionary' % (
+                    options,))
+                continue
+            name = options.get('name')
+            if not name or not isinstance(name, str) or name in timers:
+                print('Ignoring a timer without a name of its own')
+                continue
+            try:
+                lengths = get_lengths(options)
+            except ValueError as e:
+                print('Ignoring the timer %s: %s' % (name, e))
+                continue
+            timer = self.timers.get(name)
+            if timer is None:
+                engine = PomodoroEngine()
+                engine.connect('started', self.on_timer_started)
+                engine.connect('state-changed', self.on_timer_changed, name)
+                engine.connect('frame-changed', self.on_timer_changed, name)
+                engine.connect('session-end', self.on_timer_session_end,
+                               name)
+                engine.connect('break-end', self.on_timer_break_end, name)
+                self.scheduler.add(name, engine)
+                timer = {'engine': engine}
+            timer['engine'].configure(
+                session_length=lengths.get('session_length',
+                                           self.session_length),
+                break_length=lengths.get('break_length', self.break_length),
+                long_break_length=lengths.get('long_break_length',
+                                              self.long_break_length),
+                number_of_pomodoros=lengths.get('number_of_pomodoros',
+                                                self.max_pomodoros))
+            for key in ('session_sound_file', 'break_sound_file'):
+                timer[key] = options.get(key)
+                if not isinstance(timer[key], str):
+                    timer[key] = getattr(self, key)
+            timers[name] = timer
+        for name in self.timers:
+            if name not in timers:
+                self.scheduler.remove(name)
+        self.timers = timers
+        if self.player is not None:
+            self.update_player()
+        self.schedule_next_frame()
+        if self.timers_menu is not None:
+            self.populate_timers_menu()
+
+    def read_team_preferences(self, configuration, *args):
+        '''
+        Join the room of a team server, the main timer follows it
+        '''
+        address = configuration.get('team_server')
+        room = configuration.get('team_room')
+        if self.team_client is not None:
+            if (self.team_client.address, self.team_client.room) ==\
+                    (address, room):
+                return
+            self.team_client.close()
+            self.team_client = None
+        if address and room:
+            from .team_client import TeamClient
+            self.team_client = TeamClient(address, room,
+                                          self.on_team_status)
+
+    def on_team_status(self, status):
+        from .team_server import sync_engine
+        try:
+            sync_engine(self.engine, status)
+        except ValueError as e:
+            print(e)
+        self.schedule_next_frame(MAIN_TIMER)
+
+    def on_sleep_policy_changed(self, configuration, key, value):
+        self.sleep_policy = value
+
+    def on_resume(self, slept):
+        '''
+        The monotonic clock of the timers stopped while suspended, every
+        timer is brought up to date with the sleep policy in a single
+        step. A phase that ended while asleep leaves its timer idle.
+        '''
+        if self.team_client is not None and self.team_client.send('status'):
+            # The room decides, its answer brings the main timer in sync
+            names = [name for name in self.scheduler.get_names()
+                     if name != MAIN_TIMER]
+        else:
+            names = self.scheduler.get_names()
+        now = self.engine.clock()
+        for name in names:
+            engine = self.scheduler.get(name)
+            if not engine.is_running():
+                continue
+            engine.resume(slept, self.sleep_policy, now)
+            self.scheduler.update(name)
+        self.schedule_next_frame()
+        if not self.engine.is_running():
+            self.pomodoro_start.set_label(_('Start'))
+        self.refresh_icon()
+        if self.checkpoint is not None:
+            self.checkpoint.save(self.engine)
+
+    def refresh_icon(self):
+        if self.indicator is None:
+            return
+        if self.engine.is_running():
+            self.indicator.set_icon(self.get_progress_icon(
+                self.engine.state, self.engine.frame,
+                self.engine.countdown.frames))
+        else:
+            self.indicator.set_icon(self.active_icon)
 
     # ################## menu creation ######################
 
-    def get_help_menu(self):
-        help_menu = Gtk.Menu()
-        #
+    def populate_help_menu(self, help_menu):
+        '''
+        Fill the help submenu, it is called once the indicator is shown
+        '''
         homepage_item = Gtk.MenuItem(label=_(
             'Homepage'))
         homepage_item.connect(
-            'activate', lambda x: webbrowser.open('http://www.atareao.es/'))
+            'activate', lambda x: open_url('http://www.atareao.es/'))
         homepage_item.show()
         help_menu.append(homepage_item)
         #
         help_item = Gtk.MenuItem(label=_(
             'Get help online...'))
         help_item.connect(
-            'activate', lambda x: webbrowser.open(
+            'activate', lambda x: open_url(
                 'http://www.atareao.es/apps/la-tecnica-pomodoro-en\
 -ubuntu-con-pomodoro-indicator/'))
         help_item.show()
@@ -193,7 +525,7 @@ class Pomodoro_Indicator(GObject.GObject):
         translate_item = Gtk.MenuItem(label=_(
             'Translate this application...'))
         translate_item.connect(
-            'activate', lambda x: webbrowser.open(
+            'activate', lambda x: open_url(
                 'http://www.atareao.es/apps/la-tecnica-\
 pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         translate_item.show()
@@ -202,7 +534,7 @@ pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         bug_item = Gtk.MenuItem(label=_(
             'Report a bug...'))
         bug_item.connect(
-            'activate', lambda x: webbrowser.open(
+            'activate', lambda x: open_url(
                 'https://github.com/atareao/pomodoro-indicator/issues'))
         bug_item.show()
         help_menu.append(bug_item)
@@ -214,7 +546,7 @@ pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         twitter_item = Gtk.MenuItem(label=_(
             'Follow me in Twitter'))
         twitter_item.connect(
-            'activate', lambda x: webbrowser.open(
+            'activate', lambda x: open_url(
                 'https://twitter.com/atareao'))
         twitter_item.show()
         help_menu.append(twitter_item)
@@ -222,7 +554,7 @@ pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         googleplus_item = Gtk.MenuItem(label=_(
             'Follow me in Google+'))
         googleplus_item.connect(
-            'activate', lambda x: webbrowser.open(
+            'activate', lambda x: open_url(
                 'https://plus.google.com/118214486317320563625/posts'))
         googleplus_item.show()
         help_menu.append(googleplus_item)
@@ -230,7 +562,7 @@ pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         facebook_item = Gtk.MenuItem(label=_(
             'Follow me in Facebook'))
         facebook_item.connect(
-            'activate', lambda x: webbrowser.open(
+            'activate', lambda x: open_url(
                 'http://www.facebook.com/elatareao'))
         facebook_item.show()
         help_menu.append(facebook_item)
@@ -242,9 +574,7 @@ pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         separator.show()
         help_menu.append(separator)
         help_menu.append(about_item)
-        #
-        help_menu.show()
-        return help_menu
+        return False
 
     def get_menu(self):
         """Create and populate the menu."""
@@ -264,14 +594,41 @@ pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         separator1.show()
         menu.append(separator1)
         #
+        if self.history is not None:
+            # Shown once the statistics are loaded
+            menu_statistics = Gtk.MenuItem.new_with_label(_('Statistics'))
+            statistics_menu = Gtk.Menu()
+            statistics_menu.show()
+            menu_statistics.set_submenu(statistics_menu)
+            # Emitted when the submenu is about to be shown, the labels
+            # would show yesterday's numbers after midnight otherwise
+            menu_statistics.connect('activate',
+                                    self.on_statistics_menu_shown)
+            for period in ('day', 'week', 'month'):
+                self.statistics_items[period] = add2menu(statistics_menu,
+                                                         text='')
+            self.menu_statistics = menu_statistics
+            menu.append(menu_statistics)
+        #
+        self.menu_timers = Gtk.MenuItem.new_with_label(_('Timers'))
+        self.timers_menu = Gtk.Menu()
+        self.timers_menu.show()
+        self.menu_timers.set_submenu(self.timers_menu)
+        self.populate_timers_menu()
+        menu.append(self.menu_timers)
+        #
         menu_preferences = Gtk.MenuItem.new_with_label(_('Preferences'))
         menu_preferences.connect('activate', self.on_preferences_item)
         menu_preferences.show()
         menu.append(menu_preferences)
 
         menu_help = Gtk.MenuItem.new_with_label(_('Help'))
-        menu_help.set_submenu(self.get_help_menu())
+        help_menu = Gtk.Menu()
+        help_menu.show()
+        menu_help.set_submenu(help_menu)
         menu_help.show()
+        GLib.idle_add(self.populate_help_menu, help_menu,
+                      priority=GLib.PRIORITY_LOW)
         menu.append(menu_help)
         #
         separator2 = Gtk.SeparatorMenuItem()
@@ -286,155 +643,220 @@ pomodoro-en-ubuntu-con-pomodoro-indicator/'))
         menu.show()
         return(menu)
 
+    def update_statistics_menu(self):
+        if self.statistics is None:
+            return
+        labels = {'day': _('Today'),
+                  'week': _('This week'),
+                  'month': _('This month')}
+        for period, item in self.statistics_items.items():
+            values = self.statistics.get(period)
+            item.set_label(
+                _('%s: %s pomodoros, %d minutes, %s interrupted') % (
+                    labels[period], values['pomodoros'],
+                    values['focus_minutes'], values['interruptions']))
+
+    def on_history_record(self, record):
+        self.update_statistics_menu()
+
+    def on_statistics_menu_shown(self, widget):
+        self.update_statistics_menu()
+
+    def populate_timers_menu(self):
+        for item in self.timers_menu.get_children():
+            self.timers_menu.remove(item)
+        for name in sorted(self.timers):
+            timer = self.timers[name]
+            timer['item'] = add2menu(self.timers_menu, text='')
+            timer['item'].connect('activate', self.on_timer_item, name)
+            self.update_timer_item(name)
+        if self.timers:
+            self.menu_timers.show()
+        else:
+            self.menu_timers.hide()
+
+    def update_timer_item(self, name):
+        timer = self.timers.get(name)
+        if timer is None or 'item' not in timer:
+            return
+        engine = timer['engine']
+        if engine.state == State.SESSION:
+            state = _('session')
+        elif engine.state == State.BREAK:
+            state = _('break')
+        elif engine.state == State.LONG_BREAK:
+            state = _('long break')
+        else:
+            timer['item'].set_label(_('%s: stopped') % name)
+            return
+        timer['item'].set_label(_('%s: %s, %d min left') % (
+            name, state, -(-engine.get_remaining() // 60)))
+
+    def on_timer_item(self, widget, name):
+        engine = self.timers[name]['engine']
+        if engine.is_running():
+            engine.stop()
+        else:
+            engine.start()
+        self.schedule_next_frame(name)
+
+    def on_timer_started(self, engine):
+        # Sounds are loaded while the session runs
+        if self.play_sounds:
+            self.get_player()
+
+    def on_timer_changed(self, engine, *args):
+        self.update_timer_item(args[-1])
+
+    def on_timer_session_end(self, engine, long_break, name):
+        if long_break:
+            message = _('%s: session ends - long break starts') % name
+        else:
+            message = _('%s: session ends - break starts') % name
+        self.notify(message, self.active_icon)
+        if self.play_sounds:
+            self.play(self.timers[name]['session_sound_file'])
+
+    def on_timer_break_end(self, engine, next_session, name):
+        if next_session:
+            self.notify(_('%s: break ends - session starts') % name,
+                        self.active_icon)
+        else:
+            self.notify(_('%s: break ends') % name, self.active_icon)
+        if self.play_sounds:
+            self.play(self.timers[name]['break_sound_file'])
+
+    def send_team_command(self, command):
+        '''
+        In a room the command goes to the team server, the main timer
+        changes when the room does
+        '''
+        return self.team_client is not None and\
+            self.team_client.send(command)
+
+    def start(self):
+        if self.send_team_command('start'):
+            return
+        self.engine.start()
+        self.schedule_next_frame(MAIN_TIMER)
+
+    def stop(self):
+        if self.send_team_command('stop'):
+            return
+        self.engine.stop()
+        self.schedule_next_frame(MAIN_TIMER)
+
+    def restart(self):
+        if self.send_team_command('restart'):
+            return
+        self.engine.restart()
+        self.schedule_next_frame(MAIN_TIMER)
+
+    def skip(self):
+        if self.send_team_command('skip'):
+            return
+        self.engine.skip()
+        self.schedule_next_frame(MAIN_TIMER)
+
     def on_pomodoro_restart(self, widget):
-        self.stop_working_process()
-        self.active = False
-        self.pomodoros = 0
-        self.frame = 0
-        self.pomodoro_start.set_label(_('Start'))
-        icon = os.path.join(comun.ICONDIR,
-                            'pomodoro-start-%s.svg' % (self.theme))
-        self.indicator.set_icon(icon)
-        self.active = True
-        self.pomodoro_start.set_label(_('Stop'))
-        self.notification.update(
-            'Pomodoro-Indicator', _('Session starts'),
-            os.path.join(comun.ICONDIR, 'pomodoro-start-%s.svg' % (
-                self.theme)))
-        self.send_notification()
-        self.countdown_session()
-        interval = int(self.session_length * 60 / TOTAL_FRAMES)
-        self.start_working_process(interval, self.countdown_session)
+        self.restart()
 
     def on_pomodoro_start(self, widget):
-        if not self.active:
-            self.active = True
-            self.pomodoro_start.set_label(_('Stop'))
-            self.notification.update(
-                'Pomodoro-Indicator', _('Session starts'),
-                os.path.join(comun.ICONDIR, 'pomodoro-start-%s.svg' % (
-                    self.theme)))
-            self.send_notification()
-            self.countdown_session()
-            interval = int(self.session_length * 60 / TOTAL_FRAMES)
-            self.start_working_process(interval, self.countdown_session)
+        if not self.engine.is_running():
+            self.start()
         else:
-            self.stop_working_process()
-            self.active = False
-            self.pomodoros = 0
-            self.frame = 0
-            self.pomodoro_start.set_label(_('Start'))
-            icon = os.path.join(comun.ICONDIR,
-                                'pomodoro-start-%s.svg' % (self.theme))
-            self.indicator.set_icon(icon)
-            self.notification.update('Pomodoro-Indicator',
-                                     _('Session stop'),
-                                     icon)
-            self.send_notification()
+            self.stop()
 
     def stop_working_process(self):
         if self.pw > 0:
             GLib.source_remove(self.pw)
             self.pw = 0
 
-    def start_working_process(self, interval, countdown):
-        if self.pw > 0:
-            GLib.source_remove(self.pw)
-        print('interval', interval)
-        print('pomodoros', self.pomodoros)
-        self.pw = GLib.timeout_add_seconds(interval, countdown)
-
-    def on_break_end(self, widget):
-        self.frame = 0
-        icon = os.path.join(comun.ICONDIR,
-                            'pomodoro-indicator-%s-%02d.svg' % (self.theme,
-                                                                self.frame))
-        self.notification.update('Pomodoro-Indicator', _('Break ends'), icon)
-        self.send_notification()
+    def schedule_next_frame(self, name=None):
+        '''
+        Wait for the earliest deadline of all the timers, after the timer
+        name has been started, stopped or skipped
+        '''
+        if name is not None:
+            self.scheduler.update(name)
+        # Every wakeup is computed from the absolute deadline of the next
+        # frame, never from the previous tick. There is a single GLib
+        # source, replaced only when the earliest deadline changes.
+        deadline = self.scheduler.get_next_deadline()
+        if self.pw > 0 and deadline == self.wakeup_deadline:
+            return
+        self.stop_working_process()
+        self.wakeup_deadline = deadline
+        timeout = self.scheduler.get_next_timeout()
+        if timeout is not None:
+            self.pw = GLib.timeout_add(timeout, self.on_frame_deadline)
+
+    def on_frame_deadline(self):
+        self.pw = 0
+        self.scheduler.run()
+        self.schedule_next_frame()
+        return False
+
+    def get_progress_icon(self, state, frame, frames):
+        '''
+        Get the icon for frame of a phase, sessions fill the dial and
+        breaks empty it
+        '''
+        if self.renderer is not None:
+            fraction = float(frame) / frames
+            if state != State.SESSION:
+                fraction = 1.0 - fraction
+            return self.renderer.get_icon(fraction, self.theme)
+        # The phase keeps the frames it started with, even if the
+        # preference has changed since and the renderer is gone
+        frame = frame * TOTAL_FRAMES // frames
+        if state == State.SESSION:
+            return self.icon_cache.get_frame(frame)
+        return self.icon_cache.get_frame(TOTAL_FRAMES + 1 - frame)
+
+    def on_engine_started(self, engine):
+        self.pomodoro_start.set_label(_('Stop'))
+        self.notify(_('Session starts'), self.active_icon)
+        # Sounds are loaded while the session runs
+        if self.play_sounds:
+            self.get_player()
+
+    def on_engine_stopped(self, engine):
+        self.pomodoro_start.set_label(_('Start'))
+        icon = self.active_icon
+        self.indicator.set_icon(icon)
+        self.notify(_('Session stop'), icon)
+
+    def on_frame_changed(self, engine, frame):
+        self.indicator.set_icon(self.get_progress_icon(
+            engine.state, frame, engine.countdown.frames))
+
+    def on_break_end(self, engine, next_session):
+        icon = self.get_progress_icon(State.SESSION, 0, engine.frames)
+        self.notify(_('Break ends'), icon)
         if self.play_sounds:
             self.play(self.break_sound_file)
-        print('**************************')
-        print(icon)
         self.indicator.set_icon(icon)
-        self.pomodoros += 1
-        if self.pomodoros < self.max_pomodoros:
-            self.notification.update('Pomodoro-Indicator',
-                                     _('Session starts'), icon)
-            self.send_notification()
-            interval = int(self.session_length * 60 / TOTAL_FRAMES)
-            self.start_working_process(interval, self.countdown_session)
+        if next_session:
+            self.notify(_('Session starts'), icon)
         else:
-            self.pomodoros = 0
-            self.animate = False
-            self.active = False
-            self.stop_working_process()
-
-    def on_session_end(self, widget):
-        self.active = True
-        self.countdown_break()
-        self.frame = 61
-        if self.pomodoros == self.max_pomodoros - 1:
-            interval = int(self.long_break_length * 60 / TOTAL_FRAMES)
+            self.pomodoro_start.set_label(_('Start'))
+
+    def on_session_end(self, engine, long_break):
+        if long_break:
             message = _('Session ends - long break starts')
         else:
-            interval = int(self.break_length * 60 / TOTAL_FRAMES)
             message = _('Session ends - break starts')
-        icon = os.path.join(
-            comun.ICONDIR, 'pomodoro-indicator-%s-%02d.svg' % (self.theme,
-                                                               self.frame))
-        self.notification.update('Pomodoro-Indicator', message, icon)
-        self.send_notification()
+        icon = self.get_progress_icon(State.BREAK, 0, engine.frames)
+        self.notify(message, icon)
         if self.play_sounds:
             self.play(self.session_sound_file)
-        self.indicator.set_icon(icon)
-        self.start_working_process(interval, self.countdown_break)
-
-    def countdown_session(self):
-        if not self.active:
-            self.animate = False
-            icon = os.path.join(comun.ICONDIR,
-                                'pomodoro-indicator-%s-%02d.svg' % (
-                                    self.theme, self.frame))
-            self.indicator.set_icon(icon)
-            self.indicator.set_label('test', '')
-            self.frame = 0
-            return False
-        else:
-            self.animate = True
-            icon = os.path.join(comun.ICONDIR,
-                                'pomodoro-indicator-%s-%02d.svg' % (
-                                    self.theme, self.frame))
-            self.indicator.set_icon(icon)
-            self.frame += 1
-            print('countdown_session', self.frame)
-            if self.frame == TOTAL_FRAMES:
-                self.frame = 61
-                self.emit('session_end')
-                return False
-            return True
-
-    def countdown_break(self):
-        if not self.active:
-            self.animate = False
-            icon = os.path.join(comun.ICONDIR,
-                                'pomodoro-indicator-%s-%02d.svg' % (
-                                    self.theme, self.frame))
-            self.indicator.set_icon(icon)
-            self.frame = 0
-            return False
-        else:
-            self.animate = True
-            afile = os.path.join(
-                comun.ICONDIR, 'pomodoro-indicator-%s-%02d.svg' % (self.theme,
-                                                                   self.frame))
-            self.indicator.set_icon(afile)
-            self.frame -= 1
-            print('countdown_break', self.frame)
-            if self.frame == 0:
-                self.frame = 0
-                self.emit('break_end')
-                return False
-            return True
+
+    def get_remaining(self):
+        '''
+        Get the exact remaining seconds of the current phase
+        '''
+        return self.engine.get_remaining()
 
     def get_about_dialog(self):
         """Create and populate the about dialog."""
@@ -473,17 +895,35 @@ Lorenzo Carbonell <https://launchpad.net/~lorenzo-carbonell>\n
 
     # ##################### callbacks for the menu #######################
     def on_preferences_item(self, widget, data=None):
+        from .preferences_dialog import PreferencesDialog
         widget.set_sensitive(False)
         preferences_dialog = PreferencesDialog()
         if preferences_dialog.run() == Gtk.ResponseType.ACCEPT:
             preferences_dialog.close_ok()
-            self.read_preferences()
         preferences_dialog.hide()
         preferences_dialog.destroy()
-        self.indicator.set_icon(self.active_icon)
         widget.set_sensitive(True)
 
     def on_quit_item(self, widget, data=None):
+        if self.history is not None:
+            self.history.close()
+        if self.statistics is not None:
+            self.statistics.save()
+        if self.control_server is not None:
+            self.control_server.close()
+        if self.status_writer is not None:
+            self.status_writer.close()
+        if self.team_client is not None:
+            self.team_client.close()
+        self.notifier.close()
+        if self.sleep_monitor is not None:
+            self.sleep_monitor.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        if self.sound_library is not None:
+            self.sound_library.close()
+        if self.player is not None:
+            self.player.close()
         exit(0)
 
     def on_about_item(self, widget, data=None):
@@ -495,27 +935,22 @@ Lorenzo Carbonell <https://launchpad.net/~lorenzo-carbonell>\n
             self.about_dialog.destroy()
             self.about_dialog = None
 
-    def send_notification(self):
-        try:
-            self.notification.show()
-        except GLib.Error as ex:
-            if 'ServiceUnknown' in str(ex):
-                # connection to notification-daemon failed
-                print("Service notification daemon does not exists.")
-                return
-            raise Exception(ex)
+    def notify(self, message, icon):
+        self.notifier.notify(message, icon)
 
 
 def main():
-    if dbus.SessionBus().request_name(
-        'es.atareao.PomodoroIndicator') !=\
-            dbus.bus.REQUEST_NAME_REPLY_PRIMARY_OWNER:
+    bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+    reply = bus.call_sync('org.freedesktop.DBus', '/org/freedesktop/DBus',
+                          'org.freedesktop.DBus', 'RequestName',
+                          GLib.Variant('(su)', (
+                              'es.atareao.PomodoroIndicator',
+                              DBUS_NAME_FLAG_DO_NOT_QUEUE)),
+                          GLib.VariantType.new('(u)'),
+                          Gio.DBusCallFlags.NONE, -1, None)
+    if reply.unpack()[0] != DBUS_REQUEST_NAME_REPLY_PRIMARY_OWNER:
         print("application already running")
         exit(0)
-    GObject.threads_init()
-    Gst.init(None)
-    Gst.init_check(None)
-    Notify.init('pomodoro-indicator')
     Pomodoro_Indicator()
     Gtk.main()
 
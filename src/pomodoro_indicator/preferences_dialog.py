@@ -30,10 +30,10 @@ except Exception as e:
 from gi.repository import Gtk
 import os
 import shutil
-import glob
 from . import comun
 from .comun import _
 from .configurator import Configuration
+from .soundlibrary import SoundLibrary
 
 
 def create_or_remove_autostart(create):
@@ -48,20 +48,27 @@ def create_or_remove_autostart(create):
 
 
 def get_sounds():
+    '''
+    Get [label, filename] of every sound in the library, the label has
+    the duration when it is known
+    '''
     sounds = []
-    personal_dir = os.path.expanduser('~/.config/pomodoro-indicator/sounds')
-    if os.path.exists(personal_dir):
-        for filename in glob.glob(os.path.join(personal_dir, '*.ogg')):
-            sounds.append([os.path.basename(filename), filename])
-    if os.path.exists(comun.SOUNDIR):
-        for filename in glob.glob(os.path.join(comun.SOUNDIR, '*.ogg')):
-            sounds.append([os.path.basename(filename), filename])
+    for filename, entry in SoundLibrary().get_sounds():
+        label = os.path.basename(filename)
+        duration = entry.get('duration') if entry is not None else None
+        if duration:
+            seconds = int(round(duration))
+            label = '%s (%d:%02d)' % (label, seconds // 60, seconds % 60)
+        sounds.append([label, filename])
     return sounds
 
 
 def get_selected_value_in_combo(combo):
     model = combo.get_model()
-    return model.get_value(combo.get_active_iter(), 1)
+    active_iter = combo.get_active_iter()
+    if active_iter is None:
+        return None
+    return model.get_value(active_iter, 1)
 
 
 def select_value_in_combo(combo, value):
@@ -139,6 +146,10 @@ class PreferencesDialog(Gtk.Dialog):
         sounds = Gtk.ListStore(str, str)
         for sound in get_sounds():
             sounds.append(sound)
+        self.sounds = sounds
+        # The list follows the library while it is probed
+        SoundLibrary().add_listener(self.on_sounds_changed)
+        self.connect('destroy', self.on_destroy)
         label5 = Gtk.Label(_('Sound on session end') + ':')
         label5.set_alignment(0, 0.5)
         table1.attach(label5, 0, 1, 5, 6, xpadding=5, ypadding=5)
@@ -185,6 +196,25 @@ class PreferencesDialog(Gtk.Dialog):
     def close_application(self, widget, event):
         self.hide()
 
+    def on_destroy(self, widget):
+        SoundLibrary().remove_listener(self.on_sounds_changed)
+
+    def on_sounds_changed(self, library):
+        sounds = get_sounds()
+        if [list(row) for row in self.sounds] == sounds:
+            return
+        configuration = Configuration()
+        combos = ((self.comboboxsound5, 'session_sound_file'),
+                  (self.comboboxsound6, 'break_sound_file'))
+        # Nothing is selected while the list is empty
+        selected = [get_selected_value_in_combo(combo) or
+                    configuration.get(key) for combo, key in combos]
+        self.sounds.clear()
+        for sound in sounds:
+            self.sounds.append(sound)
+        for (combo, key), value in zip(combos, selected):
+            select_value_in_combo(combo, value)
+
     def messagedialog(self, title, message):
         dialog = Gtk.MessageDialog(None,
                                    Gtk.DialogFlags.MODAL,
@@ -226,10 +256,12 @@ class PreferencesDialog(Gtk.Dialog):
         configuration.set('break_length', self.spinbutton2.get_value())
         configuration.set('long_break_length', self.spinbutton3.get_value())
         configuration.set('play_sounds', self.switch4.get_active())
-        configuration.set('session_sound_file',
-                          get_selected_value_in_combo(self.comboboxsound5))
-        configuration.set('break_sound_file',
-                          get_selected_value_in_combo(self.comboboxsound6))
+        # Keep the sounds set when there are none to choose from
+        for key, combo in (('session_sound_file', self.comboboxsound5),
+                           ('break_sound_file', self.comboboxsound6)):
+            value = get_selected_value_in_combo(combo)
+            if value is not None:
+                configuration.set(key, value)
         create_or_remove_autostart(self.switch7.get_active())
         if self.switch8.get_active():
             configuration.set('theme', 'light')
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# renderer.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import cairo
+import io
+import math
+import os
+from collections import OrderedDict
+from . import comun
+from .engine import MAX_FRAMES
+
+COLORS = {'light': (0xdf / 255.0, 0xdb / 255.0, 0xd2 / 255.0),
+          'dark': (0.0, 0.0, 0.0)}
+# The dial is drawn in the 22x22 coordinates of the shipped SVGs
+BASE_SIZE = 22.0
+MAX_STEPS = MAX_FRAMES
+
+
+def draw_dial(context, fraction, color):
+    context.set_source_rgb(*color)
+    # ring
+    context.set_fill_rule(cairo.FILL_RULE_EVEN_ODD)
+    context.arc(11, 11, 9, 0, 2 * math.pi)
+    context.new_sub_path()
+    context.arc(11, 11, 7, 0, 2 * math.pi)
+    context.fill()
+    # ears
+    context.set_line_width(2)
+    for angle in (-0.75 * math.pi, -0.25 * math.pi):
+        context.move_to(11 + 8 * math.cos(angle), 11 + 8 * math.sin(angle))
+        context.line_to(11 + 11.3 * math.cos(angle),
+                        11 + 11.3 * math.sin(angle))
+        context.stroke()
+    # progress
+    if fraction >= 1:
+        context.arc(11, 11, 6, 0, 2 * math.pi)
+        context.fill()
+    elif fraction > 0:
+        context.move_to(11, 11)
+        context.arc(11, 11, 6, -0.5 * math.pi,
+                    -0.5 * math.pi + 2 * math.pi * fraction)
+        context.close_path()
+        context.fill()
+
+
+class IconRenderer(object):
+    '''
+    Draws the progress dial for any fraction on demand
+
+    Fractions are quantized to steps, the PNG of every step is kept in a
+    bounded LRU cache and published as a file because the indicator host
+    only accepts icon paths.
+    '''
+    def __init__(self, size=22, steps=60,
+                 max_bytes=2 * 1024 * 1024, directory=None):
+        if directory is None:
+            directory = os.path.join(comun.RUNTIME_DIR, 'icons')
+        self.size = size
+        self.steps = max(1, min(MAX_STEPS, int(steps)))
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.cache = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def set_steps(self, steps):
+        self.steps = max(1, min(MAX_STEPS, int(steps)))
+
+    def render(self, fraction, theme):
+        '''
+        Render the dial for fraction and return it as PNG data
+        '''
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, self.size,
+                                     self.size)
+        context = cairo.Context(surface)
+        context.scale(self.size / BASE_SIZE, self.size / BASE_SIZE)
+        draw_dial(context, fraction, COLORS.get(theme, COLORS['light']))
+        surface.flush()
+        data = io.BytesIO()
+        surface.write_to_png(data)
+        return data.getvalue()
+
+    def get_icon(self, fraction, theme):
+        '''
+        Get the path of the icon for fraction
+        '''
+        step = int(round(max(0.0, min(1.0, fraction)) * self.steps))
+        key = (theme, self.size, self.steps, step)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        data = self.render(step / float(self.steps), theme)
+        filename = os.path.join(self.directory, '%s-%s-%s-%04d.png' % key)
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        self.cache[key] = (data, filename)
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes and len(self.cache) > 1:
+            self.evict()
+        return filename
+
+    def evict(self):
+        key, (data, filename) = self.cache.popitem(last=False)
+        self.bytes -= len(data)
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def clear(self):
+        while self.cache:
+            self.evict()
+
+    def get_stats(self):
+        '''
+        Get the memory accounting of the cache
+        '''
+        return {'entries': len(self.cache),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses}
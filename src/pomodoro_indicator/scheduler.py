@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# scheduler.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import heapq
+import math
+import time
+
+# The heap is rebuilt when it holds this many more entries than timers
+COMPACT_SLACK = 64
+
+
+class Scheduler(object):
+    '''
+    Drives many named PomodoroEngines from a single wakeup
+
+    The next deadline of every running engine is kept in a heap, so the
+    owner only waits for get_next_timeout() and calls run(). Entries of
+    timers that were stopped or rescheduled are left in the heap and
+    skipped when they come up.
+    '''
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.engines = {}
+        self.heap = []
+        self.entries = {}
+        self.counter = 0
+
+    def add(self, name, engine):
+        if name in self.engines:
+            raise ValueError('There is already a timer named %s' % name)
+        self.engines[name] = engine
+        self.update(name)
+
+    def remove(self, name):
+        self.entries.pop(name, None)
+        return self.engines.pop(name)
+
+    def get(self, name):
+        return self.engines[name]
+
+    def get_names(self):
+        return sorted(self.engines)
+
+    def get_active(self):
+        '''
+        Get the names of the running timers
+        '''
+        return sorted(self.entries)
+
+    def update(self, name):
+        '''
+        Schedule the next deadline of a timer, call it after starting,
+        stopping or skipping its engine
+        '''
+        deadline = self.engines[name].get_next_deadline()
+        if deadline is None:
+            self.entries.pop(name, None)
+            return
+        self.counter += 1
+        self.entries[name] = self.counter
+        heapq.heappush(self.heap, (deadline, self.counter, name))
+        if len(self.heap) > 2 * len(self.entries) + COMPACT_SLACK:
+            self.compact()
+
+    def compact(self):
+        self.heap = [entry for entry in self.heap
+                     if self.entries.get(entry[2]) == entry[1]]
+        heapq.heapify(self.heap)
+
+    def get_next_deadline(self):
+        heap = self.heap
+        while heap and self.entries.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+        if heap:
+            return heap[0][0]
+        return None
+
+    def get_next_timeout(self, now=None):
+        '''
+        Get the milliseconds to wait until the earliest deadline
+        '''
+        deadline = self.get_next_deadline()
+        if deadline is None:
+            return None
+        if now is None:
+            now = self.clock()
+        return max(0, int(math.ceil((deadline - now) * 1000)))
+
+    def run(self, now=None):
+        '''
+        Tick every timer whose deadline is due at now
+        '''
+        if now is None:
+            now = self.clock()
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            deadline, counter, name = heapq.heappop(heap)
+            if self.entries.get(name) != counter:
+                continue
+            del self.entries[name]
+            self.engines[name].tick(now)
+            # The callbacks of tick may have removed or rescheduled it
+            if name in self.engines and name not in self.entries:
+                self.update(name)
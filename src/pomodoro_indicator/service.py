@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# service.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('Gio', '2.0')
+    gi.require_version('GLib', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import Gio
+from gi.repository import GLib
+
+BUS_NAME = 'es.atareao.pomodoro'
+BUS_PATH = '/es/atareao/pomodoro'
+INTERFACE = 'es.atareao.pomodoro'
+PROPERTIES_INTERFACE = 'org.freedesktop.DBus.Properties'
+INTROSPECTION = '''
+<node>
+  <interface name="%s">
+    <method name="Start"/>
+    <method name="Stop"/>
+    <method name="Restart"/>
+    <method name="Skip"/>
+    <property name="State" type="s" access="read"/>
+    <property name="Remaining" type="d" access="read"/>
+    <property name="Pomodoros" type="u" access="read"/>
+    <signal name="PhaseChanged">
+      <arg name="old_state" type="s"/>
+      <arg name="new_state" type="s"/>
+    </signal>
+  </interface>
+</node>
+''' % INTERFACE
+
+
+def get_state_name(state):
+    return state.name.lower()
+
+
+class DBusService(object):
+    '''
+    Exports a pomodoro on the session bus
+
+    controller must have an engine attribute and start, stop, restart
+    and skip methods. The properties are pushed with PropertiesChanged
+    on every phase and frame change, so clients never need to poll.
+    '''
+    def __init__(self, controller, connection=None):
+        self.controller = controller
+        self.engine = controller.engine
+        if connection is None:
+            connection = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        self.connection = connection
+        node = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION)
+        self.registration_id = connection.register_object(
+            BUS_PATH, node.interfaces[0], self.on_method_call,
+            self.on_get_property, None)
+        self.owner_id = Gio.bus_own_name_on_connection(
+            connection, BUS_NAME, Gio.BusNameOwnerFlags.NONE, None, None)
+        self.handlers = [
+            self.engine.connect('state-changed', self.on_state_changed),
+            self.engine.connect('status-changed', self.on_status_changed)]
+
+    def close(self):
+        for handler_id in self.handlers:
+            self.engine.disconnect(handler_id)
+        self.handlers = []
+        if self.owner_id:
+            Gio.bus_unown_name(self.owner_id)
+            self.owner_id = 0
+        if self.registration_id:
+            self.connection.unregister_object(self.registration_id)
+            self.registration_id = 0
+
+    def get_property(self, name):
+        if name == 'State':
+            return GLib.Variant('s', get_state_name(self.engine.state))
+        elif name == 'Remaining':
+            return GLib.Variant('d', self.engine.get_remaining())
+        elif name == 'Pomodoros':
+            return GLib.Variant('u', self.engine.pomodoros)
+        return None
+
+    def on_get_property(self, connection, sender, object_path,
+                        interface_name, property_name):
+        return self.get_property(property_name)
+
+    def on_method_call(self, connection, sender, object_path,
+                       interface_name, method_name, parameters, invocation):
+        if method_name == 'Start':
+            self.controller.start()
+        elif method_name == 'Stop':
+            self.controller.stop()
+        elif method_name == 'Restart':
+            self.controller.restart()
+        elif method_name == 'Skip':
+            self.controller.skip()
+        else:
+            invocation.return_dbus_error(
+                'org.freedesktop.DBus.Error.UnknownMethod',
+                'Unknown method %s' % method_name)
+            return
+        invocation.return_value(None)
+
+    def emit_properties_changed(self, names):
+        changed = dict((name, self.get_property(name)) for name in names)
+        self.connection.emit_signal(
+            None, BUS_PATH, PROPERTIES_INTERFACE, 'PropertiesChanged',
+            GLib.Variant('(sa{sv}as)', (INTERFACE, changed, [])))
+
+    def on_state_changed(self, engine, old_state, new_state):
+        self.connection.emit_signal(
+            None, BUS_PATH, INTERFACE, 'PhaseChanged',
+            GLib.Variant('(ss)', (get_state_name(old_state),
+                                  get_state_name(new_state))))
+
+    def on_status_changed(self, engine, frame):
+        if frame == 0:
+            self.emit_properties_changed(('State', 'Remaining', 'Pomodoros'))
+        else:
+            self.emit_properties_changed(('Remaining',))
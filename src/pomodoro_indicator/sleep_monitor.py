@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# sleep_monitor.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('Gio', '2.0')
+    gi.require_version('GLib', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import Gio
+import time
+
+LOGIND_NAME = 'org.freedesktop.login1'
+LOGIND_PATH = '/org/freedesktop/login1'
+LOGIND_INTERFACE = 'org.freedesktop.login1.Manager'
+POLICIES = ('continue', 'pause', 'end')
+
+
+def get_sleep_offset():
+    '''
+    Get the seconds the system has been suspended since boot. The
+    monotonic clock stops while suspended and CLOCK_BOOTTIME does not.
+    '''
+    return time.clock_gettime(time.CLOCK_BOOTTIME) - time.monotonic()
+
+
+class SleepMonitor(object):
+    '''
+    Calls callback(slept) after every resume, with the seconds the
+    system was suspended, from logind PrepareForSleep on the system bus
+    '''
+    def __init__(self, callback, connection=None):
+        self.callback = callback
+        if connection is None:
+            connection = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+        self.connection = connection
+        self.offset = get_sleep_offset()
+        self.subscription_id = connection.signal_subscribe(
+            LOGIND_NAME, LOGIND_INTERFACE, 'PrepareForSleep', LOGIND_PATH,
+            None, Gio.DBusSignalFlags.NONE, self.on_prepare_for_sleep)
+
+    def close(self):
+        if self.subscription_id:
+            self.connection.signal_unsubscribe(self.subscription_id)
+            self.subscription_id = 0
+
+    def on_prepare_for_sleep(self, connection, sender, object_path,
+                             interface_name, signal_name, parameters):
+        going_to_sleep = parameters.unpack()[0]
+        if going_to_sleep:
+            self.offset = get_sleep_offset()
+            return
+        # The difference of offsets is exactly the time spent asleep,
+        # whatever the wall clock did meanwhile
+        offset = get_sleep_offset()
+        slept = max(0.0, offset - self.offset)
+        self.offset = offset
+        self.callback(slept)
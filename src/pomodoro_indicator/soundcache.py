@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# soundcache.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('Gst', '1.0')
+    gi.require_version('GLib', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import Gst
+from gi.repository import GLib
+import codecs
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from . import comun
+
+RATE = 48000
+CHANNELS = 2
+FRAME_SIZE = CHANNELS * 2
+CAPS = 'audio/x-raw,format=S16LE,layout=interleaved,rate=%s,channels=%s' % (
+    RATE, CHANNELS)
+CHUNK_SIZE = 4096 * FRAME_SIZE
+DECODE_TIMEOUT = 10 * Gst.SECOND
+DECODE_WORKERS = 1
+
+
+class Sound(object):
+    '''
+    A sound decoded to raw PCM, ready to be pushed into an appsrc
+    '''
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.data = data
+        self.size = data.get_size()
+
+    def get_duration(self):
+        return Gst.util_uint64_scale(self.size // FRAME_SIZE, Gst.SECOND,
+                                     RATE)
+
+    def get_offset(self, nanosecs):
+        frames = Gst.util_uint64_scale(nanosecs, RATE, Gst.SECOND)
+        return min(self.size, frames * FRAME_SIZE)
+
+    def get_timestamp(self, offset):
+        return Gst.util_uint64_scale(offset // FRAME_SIZE, Gst.SECOND, RATE)
+
+    def get_buffer(self, offset):
+        '''
+        Get the buffer starting at offset, sharing the decoded memory
+        '''
+        length = min(CHUNK_SIZE, self.size - offset)
+        buffer = Gst.Buffer.new_wrapped_bytes(
+            GLib.Bytes.new_from_bytes(self.data, offset, length))
+        buffer.pts = self.get_timestamp(offset)
+        buffer.duration = self.get_timestamp(offset + length) - buffer.pts
+        return buffer
+
+
+def decode(filename, pcm_file):
+    '''
+    Decode filename to raw PCM in pcm_file, it runs in a worker thread
+    '''
+    pipeline = Gst.parse_launch(
+        'uridecodebin name=urisrc ! audioconvert ! audioresample !\
+ capsfilter name=caps ! filesink name=sink')
+    pipeline.get_by_name('urisrc').set_property(
+        'uri', Gst.filename_to_uri(filename))
+    pipeline.get_by_name('caps').set_property(
+        'caps', Gst.Caps.from_string(CAPS))
+    pipeline.get_by_name('sink').set_property('location',
+                                              pcm_file + '.tmp')
+    pipeline.set_state(Gst.State.PLAYING)
+    message = pipeline.get_bus().timed_pop_filtered(
+        DECODE_TIMEOUT, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    pipeline.set_state(Gst.State.NULL)
+    if message is None or message.type != Gst.MessageType.EOS:
+        if message is not None:
+            err, debug = message.parse_error()
+            print('Error: %s' % err, debug)
+        if os.path.exists(pcm_file + '.tmp'):
+            os.remove(pcm_file + '.tmp')
+        return False
+    os.replace(pcm_file + '.tmp', pcm_file)
+    return True
+
+
+def load(filename, pcm_file, decoded):
+    '''
+    Read the decoded filename, decoding it first unless it is already
+    decoded, it runs in a worker thread
+    '''
+    if not decoded:
+        directory = os.path.dirname(pcm_file)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        if not decode(filename, pcm_file):
+            return None
+    with open(pcm_file, 'rb') as f:
+        return Sound(filename, GLib.Bytes.new(f.read()))
+
+
+class SoundCache(object):
+    '''
+    Decodes every sound once to raw PCM in the cache directory and keeps
+    it in memory. Entries are invalidated by file mtime and size.
+
+    Sounds are decoded and read by a worker thread, get() never waits
+    for them. callback(filename) is called from the main loop when a
+    sound is ready.
+    '''
+    def __init__(self, directory=comun.SOUND_CACHE_DIR, callback=None):
+        self.directory = directory
+        self.callback = callback
+        self.index_file = os.path.join(directory, 'index.json')
+        self.index = self.read_index()
+        self.sounds = {}
+        self.requested = {}
+        self.executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS)
+
+    def read_index(self):
+        try:
+            with codecs.open(self.index_file, 'r', 'utf-8') as f:
+                return json.loads(f.read())
+        except (IOError, ValueError):
+            return {}
+
+    def save_index(self):
+        with codecs.open(self.index_file, 'w', 'utf-8') as f:
+            f.write(json.dumps(self.index))
+
+    def get_pcm_file(self, filename):
+        name = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name + '.pcm')
+
+    def get(self, filename):
+        '''
+        Get the decoded sound for filename, or None while it is decoded
+        in the background or if it can not be decoded
+        '''
+        try:
+            stat = os.stat(filename)
+        except OSError as e:
+            print(e)
+            return None
+        key = [stat.st_mtime_ns, stat.st_size]
+        sound = self.sounds.get(filename)
+        if sound is not None and self.index.get(filename, {}).get('key') ==\
+                key:
+            return sound
+        if self.requested.get(filename) == key:
+            # Being loaded, or it failed and the file has not changed
+            return None
+        self.requested[filename] = key
+        pcm_file = self.get_pcm_file(filename)
+        entry = self.index.get(filename)
+        decoded = entry is not None and entry.get('key') == key and\
+            os.path.exists(pcm_file)
+        future = self.executor.submit(load, filename, pcm_file, decoded)
+        future.add_done_callback(
+            lambda future: GLib.idle_add(self.on_loaded, filename, key,
+                                         future))
+        return None
+
+    def on_loaded(self, filename, key, future):
+        if self.requested.get(filename) != key:
+            # Released or changed while it was loaded
+            return False
+        try:
+            sound = future.result()
+        except Exception as e:
+            print(e)
+            sound = None
+        if sound is None:
+            return False
+        if self.index.get(filename, {}).get('key') != key:
+            self.index[filename] = {'key': key}
+            self.save_index()
+        self.sounds[filename] = sound
+        if self.callback is not None:
+            self.callback(filename)
+        return False
+
+    def release(self, filename):
+        self.sounds.pop(filename, None)
+        self.requested.pop(filename, None)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def get_stats(self):
+        '''
+        Get the memory used by the decoded sounds
+        '''
+        return {'sounds': len(self.sounds),
+                'bytes': sum(sound.size for sound in self.sounds.values())}
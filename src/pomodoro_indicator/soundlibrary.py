@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# soundlibrary.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('Gst', '1.0')
+    gi.require_version('GstPbutils', '1.0')
+    gi.require_version('Gio', '2.0')
+    gi.require_version('GLib', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import Gst
+from gi.repository import GstPbutils
+from gi.repository import Gio
+from gi.repository import GLib
+import codecs
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from . import comun
+
+VERSION = 1
+MAX_WORKERS = 2
+# Loudness analysis decodes the whole file, one at a time is enough
+ANALYSIS_WORKERS = 1
+ANALYSIS_NICENESS = 10
+DISCOVER_TIMEOUT = 10 * Gst.SECOND
+ANALYSIS_TIMEOUT = 60 * Gst.SECOND
+ANALYSIS_PIPELINE = 'uridecodebin name=src ! audioconvert ! audioresample !\
+ rganalysis ! fakesink sync=false'
+# Milliseconds the index waits for more changes before it is written
+SAVE_DELAY = 1000
+
+
+def get_key(filename):
+    stat = os.stat(filename)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def discover(filename):
+    '''
+    Probe a file, it runs in a worker thread
+    '''
+    discoverer = GstPbutils.Discoverer.new(DISCOVER_TIMEOUT)
+    try:
+        info = discoverer.discover_uri(Gst.filename_to_uri(filename))
+    except GLib.Error as e:
+        return {'playable': False, 'error': str(e)}
+    streams = info.get_audio_streams()
+    if not streams:
+        return {'playable': False}
+    entry = {'playable': True,
+             'duration': info.get_duration() / Gst.SECOND,
+             'codec': None,
+             'gain': None,
+             'peak': None}
+    caps = streams[0].get_caps()
+    if caps is not None:
+        entry['codec'] = GstPbutils.pb_utils_get_codec_description(caps)
+    tags = info.get_tags()
+    if tags is not None:
+        found, gain = tags.get_double(Gst.TAG_TRACK_GAIN)
+        if found:
+            entry['gain'] = gain
+            found, peak = tags.get_double(Gst.TAG_TRACK_PEAK)
+            if found:
+                entry['peak'] = peak
+    return entry
+
+
+def lower_priority():
+    '''
+    Initializer of the analysis threads, on Linux the niceness belongs
+    to the thread, so the sounds being played do not compete with it
+    '''
+    try:
+        os.nice(ANALYSIS_NICENESS)
+    except OSError as e:
+        print(e)
+
+
+def analyse(filename):
+    '''
+    Get the ReplayGain track gain and peak of a file, it runs in a
+    worker thread
+    '''
+    pipeline = Gst.parse_launch(ANALYSIS_PIPELINE)
+    pipeline.get_by_name('src').set_property(
+        'uri', Gst.filename_to_uri(filename))
+    bus = pipeline.get_bus()
+    result = {'gain': None, 'peak': None}
+    pipeline.set_state(Gst.State.PLAYING)
+    try:
+        while True:
+            message = bus.timed_pop_filtered(
+                ANALYSIS_TIMEOUT,
+                Gst.MessageType.TAG | Gst.MessageType.EOS |
+                Gst.MessageType.ERROR)
+            if message is None:
+                print('Timeout analysing {0}'.format(filename))
+                break
+            if message.type == Gst.MessageType.ERROR:
+                print(message.parse_error()[0])
+                break
+            if message.type == Gst.MessageType.EOS:
+                break
+            tags = message.parse_tag()
+            found, gain = tags.get_double(Gst.TAG_TRACK_GAIN)
+            if found:
+                result['gain'] = gain
+            found, peak = tags.get_double(Gst.TAG_TRACK_PEAK)
+            if found:
+                result['peak'] = peak
+    finally:
+        pipeline.set_state(Gst.State.NULL)
+    return result
+
+
+def get_gain_factor(entry):
+    '''
+    Get the volume factor that normalizes the loudness of a sound, it
+    never amplifies a sound beyond its peak
+    '''
+    if entry is None or entry.get('gain') is None:
+        return 1.0
+    factor = 10 ** (entry['gain'] / 20.0)
+    if entry.get('peak'):
+        factor = min(factor, 1.0 / entry['peak'])
+    return factor
+
+
+class SoundLibrary(object):
+    '''
+    Index of the sounds in the personal and shared sound directories
+
+    Every SoundLibrary() is the same object. The index is read from the
+    cache at once, files that are new or have changed (by mtime and
+    size) are probed by a pool of worker threads and the directories are
+    monitored, so get_sounds() never touches the files. Listeners are
+    called as callback(library) after every change.
+
+    Sounds without a ReplayGain tag are analysed once by another pool
+    and the gain is kept in the index, get_gain() only reads it.
+    '''
+    instance = None
+
+    def __new__(cls):
+        if cls.instance is None:
+            cls.instance = object.__new__(cls)
+            cls.instance.initialized = False
+        return cls.instance
+
+    def __init__(self):
+        if self.initialized:
+            return
+        self.initialized = True
+        Gst.init_check(None)
+        self.filename = comun.SOUND_INDEX_FILE
+        self.directories = [comun.PERSONAL_SOUNDS_DIR, comun.SOUNDIR]
+        self.entries = self.read()
+        self.pending = set()
+        self.listeners = []
+        self.monitors = []
+        self.save_id = 0
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self.analyser = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS,
+                                           initializer=lower_priority)
+        self.analysing = set()
+        self.scan()
+        self.watch()
+
+    def read(self):
+        try:
+            with codecs.open(self.filename, 'r', 'utf-8') as f:
+                data = json.loads(f.read())
+            if data.get('version') == VERSION:
+                return data['entries']
+        except (IOError, ValueError, KeyError):
+            pass
+        return {}
+
+    def save(self):
+        self.save_id = 0
+        directory = os.path.dirname(self.filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with codecs.open(self.filename + '.tmp', 'w', 'utf-8') as f:
+            f.write(json.dumps({'version': VERSION,
+                                'entries': self.entries}))
+        os.replace(self.filename + '.tmp', self.filename)
+        return False
+
+    def schedule_save(self):
+        if not self.save_id:
+            self.save_id = GLib.timeout_add(SAVE_DELAY, self.save)
+
+    def close(self):
+        for monitor in self.monitors:
+            monitor.cancel()
+        self.monitors = []
+        self.executor.shutdown(wait=False)
+        self.analyser.shutdown(wait=False)
+        if self.save_id:
+            GLib.source_remove(self.save_id)
+            self.save()
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def changed(self):
+        self.schedule_save()
+        for listener in self.listeners:
+            listener(self)
+
+    def scan(self):
+        '''
+        Check every file of the directories against the index
+        '''
+        found = set()
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.startswith('.'):
+                    found.add(entry.path)
+                    self.update(entry.path)
+        removed = [filename for filename in self.entries
+                   if filename not in found]
+        for filename in removed:
+            del self.entries[filename]
+        if removed:
+            self.changed()
+
+    def update(self, filename):
+        '''
+        Probe filename in the background if it is not up to date
+        '''
+        if os.path.basename(filename).startswith('.'):
+            return
+        try:
+            key = get_key(filename)
+        except OSError:
+            if self.entries.pop(filename, None) is not None:
+                self.changed()
+            return
+        entry = self.entries.get(filename)
+        if entry is not None and entry.get('key') == key:
+            self.analyse(filename)
+            return
+        if filename in self.pending:
+            return
+        self.pending.add(filename)
+        if entry is None:
+            # It is listed until it is probed
+            self.changed()
+        future = self.executor.submit(discover, filename)
+        future.add_done_callback(
+            lambda future: GLib.idle_add(self.on_discovered, filename, key,
+                                         future))
+
+    def on_discovered(self, filename, key, future):
+        self.pending.discard(filename)
+        try:
+            entry = future.result()
+        except Exception as e:
+            print(e)
+            entry = {'playable': False}
+        try:
+            current_key = get_key(filename)
+        except OSError:
+            current_key = None
+        if current_key != key:
+            # It changed while it was probed
+            if current_key is not None:
+                self.update(filename)
+            elif filename not in self.entries:
+                # It was listed while it was probed
+                self.changed()
+            return False
+        entry['key'] = key
+        self.entries[filename] = entry
+        self.changed()
+        self.analyse(filename)
+        return False
+
+    def analyse(self, filename):
+        '''
+        Measure the loudness of filename in the background if it has no
+        gain yet
+        '''
+        entry = self.entries.get(filename)
+        if entry is None or not entry.get('playable') or\
+                entry.get('gain') is not None or entry.get('analysed') or\
+                filename in self.analysing:
+            return
+        self.analysing.add(filename)
+        key = entry['key']
+        future = self.analyser.submit(analyse, filename)
+        future.add_done_callback(
+            lambda future: GLib.idle_add(self.on_analysed, filename, key,
+                                         future))
+
+    def on_analysed(self, filename, key, future):
+        self.analysing.discard(filename)
+        try:
+            result = future.result()
+        except Exception as e:
+            print(e)
+            result = {'gain': None, 'peak': None}
+        entry = self.entries.get(filename)
+        if entry is None or entry.get('key') != key:
+            # It changed while it was analysed, the new probe analyses it
+            return False
+        entry.update(result)
+        # Files that can not be measured are not tried again
+        entry['analysed'] = True
+        self.changed()
+        return False
+
+    def watch(self):
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            monitor = Gio.File.new_for_path(directory).monitor_directory(
+                Gio.FileMonitorFlags.WATCH_MOVES, None)
+            monitor.connect('changed', self.on_directory_changed)
+            self.monitors.append(monitor)
+
+    def on_directory_changed(self, monitor, file, other_file, event_type):
+        if event_type in (Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                          Gio.FileMonitorEvent.CREATED,
+                          Gio.FileMonitorEvent.DELETED,
+                          Gio.FileMonitorEvent.MOVED_IN,
+                          Gio.FileMonitorEvent.MOVED_OUT):
+            self.update(file.get_path())
+        elif event_type == Gio.FileMonitorEvent.RENAMED:
+            self.update(file.get_path())
+            self.update(other_file.get_path())
+
+    def get(self, filename):
+        return self.entries.get(filename)
+
+    def get_gain(self, filename):
+        '''
+        Get the volume factor for filename, 1.0 until it is analysed
+        '''
+        return get_gain_factor(self.entries.get(filename))
+
+    def get_sounds(self):
+        '''
+        Get (filename, entry) of the playable sounds, by name. Files that
+        are still being probed come with None as their entry.
+        '''
+        sounds = [(filename, entry)
+                  for filename, entry in self.entries.items()
+                  if entry.get('playable')]
+        sounds.extend((filename, None) for filename in self.pending
+                      if filename not in self.entries)
+        return sorted(sounds,
+                      key=lambda item: os.path.basename(item[0]).lower())
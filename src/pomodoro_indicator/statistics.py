@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# statistics.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import codecs
+import datetime
+import json
+import os
+from . import comun
+from .engine import State
+from .history import Event
+
+VERSION = 1
+# Records applied between saves, the ones after the last save are
+# applied again from the history log on load
+SAVE_INTERVAL = 64
+PERIODS = ('day', 'week', 'month')
+POMODOROS = 0
+FOCUS = 1
+INTERRUPTIONS = 2
+
+
+def get_keys(timestamp):
+    '''
+    Get the day, week and month keys of a timestamp, in local time
+    '''
+    date = datetime.date.fromtimestamp(timestamp)
+    year, week, weekday = date.isocalendar()
+    return (date.isoformat(),
+            '%04d-W%02d' % (year, week),
+            '%04d-%02d' % (date.year, date.month))
+
+
+class Statistics(object):
+    '''
+    Daily, weekly and monthly rollups of the session history
+
+    Every record updates the three rollups it belongs to, so a query is
+    a dictionary lookup. The rollups are saved with the number of
+    records they include, every SAVE_INTERVAL records and by the owner
+    at exit, and only newer records are applied on load.
+    '''
+    def __init__(self, history, filename=comun.STATISTICS_FILE):
+        self.history = history
+        self.filename = filename
+        self.offset = 0
+        self.saved_offset = 0
+        self.tables = dict((period, {}) for period in PERIODS)
+        self.load()
+        history.add_listener(self.on_record)
+
+    def clear(self):
+        self.offset = 0
+        self.saved_offset = 0
+        self.tables = dict((period, {}) for period in PERIODS)
+
+    def load(self):
+        try:
+            with codecs.open(self.filename, 'r', 'utf-8') as f:
+                data = json.loads(f.read())
+            if data.get('version') == VERSION:
+                self.offset = data['offset']
+                self.tables = data['tables']
+                self.saved_offset = self.offset
+        except (IOError, ValueError, KeyError) as e:
+            print(e)
+            self.clear()
+        count = self.history.get_count()
+        if self.offset > count:
+            # The log is older than the rollups, start over
+            self.clear()
+        if self.offset < count:
+            for record in self.history.read(self.offset, count):
+                self.apply(record)
+            self.save()
+
+    def save(self):
+        directory = os.path.dirname(self.filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with codecs.open(self.filename + '.tmp', 'w', 'utf-8') as f:
+            f.write(json.dumps({'version': VERSION,
+                                'offset': self.offset,
+                                'tables': self.tables}))
+        os.replace(self.filename + '.tmp', self.filename)
+        self.saved_offset = self.offset
+
+    def rebuild(self):
+        '''
+        Compute every rollup again from the history log
+        '''
+        self.clear()
+        for record in self.history.read():
+            self.apply(record)
+        self.save()
+
+    def apply(self, record):
+        self.offset += 1
+        if record.event == Event.SESSION_END:
+            delta = (1, record.duration, 0)
+        elif record.event in (Event.STOP, Event.RESTART) and\
+                record.state == State.SESSION:
+            delta = (0, record.duration, 1)
+        else:
+            return False
+        for period, key in zip(PERIODS, get_keys(record.timestamp)):
+            row = self.tables[period].setdefault(key, [0, 0.0, 0])
+            for index, value in enumerate(delta):
+                row[index] += value
+        return True
+
+    def on_record(self, record):
+        self.apply(record)
+        if self.offset - self.saved_offset >= SAVE_INTERVAL:
+            self.save()
+
+    def get(self, period, timestamp=None):
+        '''
+        Get the pomodoros, focus minutes and interruptions of the day,
+        week or month of timestamp (now by default)
+        '''
+        if timestamp is None:
+            timestamp = datetime.datetime.now().timestamp()
+        key = get_keys(timestamp)[PERIODS.index(period)]
+        row = self.tables[period].get(key, [0, 0.0, 0])
+        return {'pomodoros': row[POMODOROS],
+                'focus_minutes': row[FOCUS] / 60.0,
+                'interruptions': row[INTERRUPTIONS]}
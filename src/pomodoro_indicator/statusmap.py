@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# statusmap.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Status of the running indicator in a memory-mapped file. It only
+# imports the standard library so status bars can use it directly:
+#
+#     reader = StatusReader()
+#     status = reader.read()
+#     print(status.state, status.remaining)
+
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+from . import comun
+
+STATUS_FILE = os.path.join(comun.RUNTIME_DIR, 'status')
+MAGIC = b'POMOSTAT'
+VERSION = 1
+# magic, version, sequence
+HEADER = struct.Struct('<8sIQ')
+SEQUENCE_OFFSET = 12
+SEQUENCE = struct.Struct('<Q')
+# state, pomodoros, number_of_pomodoros, frame, frames, remaining at
+# update, monotonic time of the update, monotonic end of the phase
+PAYLOAD = struct.Struct('<BHHHHddd')
+SIZE = HEADER.size + PAYLOAD.size
+STATES = ('idle', 'session', 'break', 'long_break')
+MAX_RETRIES = 1000
+
+Status = namedtuple('Status', 'sequence state pomodoros number_of_pomodoros\
+ frame frames remaining')
+
+
+class StatusWriter(object):
+    '''
+    Publishes the status of a PomodoroEngine in place
+
+    Updates follow a seqlock: the sequence is odd while the payload is
+    being written and even when it is consistent.
+    '''
+    def __init__(self, filename=STATUS_FILE):
+        self.filename = filename
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory, 0o700)
+        fd = os.open(filename + '.tmp', os.O_RDWR | os.O_CREAT | os.O_TRUNC,
+                     0o600)
+        try:
+            os.ftruncate(fd, SIZE)
+            self.map = mmap.mmap(fd, SIZE)
+        finally:
+            os.close(fd)
+        self.sequence = 0
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.sequence)
+        # Readers never see a file without a header
+        os.replace(filename + '.tmp', filename)
+        self.handlers = []
+        self.engine = None
+
+    def close(self):
+        if self.engine is not None:
+            for handler_id in self.handlers:
+                self.engine.disconnect(handler_id)
+            self.handlers = []
+            self.engine = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
+
+    def write(self, state, pomodoros, number_of_pomodoros, frame, frames,
+              remaining, end):
+        now = time.monotonic()
+        self.sequence += 1
+        SEQUENCE.pack_into(self.map, SEQUENCE_OFFSET, self.sequence)
+        PAYLOAD.pack_into(self.map, HEADER.size, state, pomodoros,
+                          number_of_pomodoros, frame, frames, remaining, now,
+                          end)
+        self.sequence += 1
+        SEQUENCE.pack_into(self.map, SEQUENCE_OFFSET, self.sequence)
+
+    def update(self, engine):
+        countdown = engine.countdown
+        if countdown is None:
+            self.write(engine.state.value, engine.pomodoros,
+                       engine.number_of_pomodoros, 0, 0, 0.0, 0.0)
+        else:
+            self.write(engine.state.value, engine.pomodoros,
+                       engine.number_of_pomodoros, engine.frame,
+                       countdown.frames, engine.get_remaining(),
+                       countdown.get_end())
+
+    def watch(self, engine):
+        '''
+        Update the status on every phase and frame change of engine
+        '''
+        self.engine = engine
+        self.handlers = [
+            engine.connect('status-changed', self.on_status_changed)]
+        self.update(engine)
+
+    def on_status_changed(self, engine, frame):
+        self.update(engine)
+
+
+class StatusReader(object):
+    '''
+    Maps the status file once, every read is a consistent snapshot
+    without any system call
+    '''
+    def __init__(self, filename=STATUS_FILE):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self.map = mmap.mmap(f.fileno(), SIZE, access=mmap.ACCESS_READ)
+        magic, version, sequence = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError('%s is not a status file' % filename)
+
+    def close(self):
+        self.map.close()
+
+    def is_stale(self):
+        '''
+        The indicator has exited or restarted, open the file again
+        '''
+        try:
+            return os.stat(self.filename).st_ino != self.inode
+        except OSError:
+            return True
+
+    def read(self):
+        '''
+        Get the current Status, the remaining seconds are computed from
+        the end of the phase
+        '''
+        for retry in range(MAX_RETRIES):
+            before = SEQUENCE.unpack_from(self.map, SEQUENCE_OFFSET)[0]
+            if not before & 1:
+                payload = PAYLOAD.unpack_from(self.map, HEADER.size)
+                if SEQUENCE.unpack_from(self.map,
+                                        SEQUENCE_OFFSET)[0] == before:
+                    break
+            # Let a writer in the middle of an update finish it
+            time.sleep(0)
+        else:
+            raise RuntimeError('The status is being written too often')
+        (state, pomodoros, number_of_pomodoros, frame, frames, remaining,
+         updated, end) = payload
+        if end:
+            remaining = max(0.0, end - time.monotonic())
+        return Status(before, STATES[state], pomodoros, number_of_pomodoros,
+                      frame, frames, remaining)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# team_client.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import gi
+try:
+    gi.require_version('Gio', '2.0')
+    gi.require_version('GLib', '2.0')
+except Exception as e:
+    print(e)
+    exit(-1)
+from gi.repository import Gio
+from gi.repository import GLib
+import json
+from .team_server import DEFAULT_PORT
+
+CONNECT_TIMEOUT = 10
+RECONNECT_DELAY = 30
+
+
+class TeamClient(object):
+    '''
+    Member of a room of a team server, driven by the GLib main loop
+
+    address is host[:port] or the path of a Unix socket. callback(status)
+    is called with every status of the room. It connects again when the
+    connection is lost.
+    '''
+    def __init__(self, address, room, callback):
+        self.address = address
+        self.room = room
+        self.callback = callback
+        self.cancellable = None
+        self.connection = None
+        self.input = None
+        self.output = []
+        self.writing = False
+        self.reconnect_id = 0
+        self.closed = False
+        self.connect()
+
+    def is_connected(self):
+        return self.connection is not None
+
+    def connect(self):
+        self.reconnect_id = 0
+        self.cancellable = Gio.Cancellable()
+        client = Gio.SocketClient()
+        client.set_timeout(CONNECT_TIMEOUT)
+        if self.address.startswith('/'):
+            client.connect_async(Gio.UnixSocketAddress.new(self.address),
+                                 self.cancellable, self.on_connected)
+        else:
+            client.connect_to_host_async(self.address, DEFAULT_PORT,
+                                         self.cancellable, self.on_connected)
+        return False
+
+    def close(self):
+        self.closed = True
+        if self.reconnect_id:
+            GLib.source_remove(self.reconnect_id)
+            self.reconnect_id = 0
+        self.disconnect()
+
+    def disconnect(self):
+        # Pending reads and writes belong to this connection
+        if self.cancellable is not None:
+            self.cancellable.cancel()
+            self.cancellable = None
+        if self.connection is not None:
+            self.connection.close(None)
+            self.connection = None
+        self.input = None
+        self.output = []
+        self.writing = False
+
+    def reconnect(self):
+        self.disconnect()
+        if not self.closed and not self.reconnect_id:
+            self.reconnect_id = GLib.timeout_add_seconds(RECONNECT_DELAY,
+                                                         self.connect)
+
+    def on_connected(self, client, result):
+        try:
+            if self.address.startswith('/'):
+                self.connection = client.connect_finish(result)
+            else:
+                self.connection = client.connect_to_host_finish(result)
+        except GLib.Error as e:
+            if e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                return
+            print(e)
+            self.reconnect()
+            return
+        self.input = Gio.DataInputStream.new(
+            self.connection.get_input_stream())
+        self.send('join', room=self.room)
+        self.read_line()
+
+    def read_line(self):
+        self.input.read_line_async(GLib.PRIORITY_DEFAULT, self.cancellable,
+                                   self.on_line)
+
+    def on_line(self, stream, result):
+        try:
+            line, length = stream.read_line_finish_utf8(result)
+        except GLib.Error as e:
+            if e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                return
+            print(e)
+            line = None
+        if line is None:
+            self.reconnect()
+            return
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            print(e)
+            message = {}
+        if message.get('event') == 'status':
+            self.callback(message)
+        elif message.get('event') == 'error':
+            print(message.get('error'))
+        self.read_line()
+
+    def send(self, command, **options):
+        '''
+        Queue a command for the room, they are written in order without
+        blocking the main loop
+        '''
+        if self.connection is None:
+            return False
+        options['command'] = command
+        self.output.append(GLib.Bytes.new(
+            (json.dumps(options) + '\n').encode('utf-8')))
+        if not self.writing:
+            self.write_next()
+        return True
+
+    def write_next(self):
+        if not self.output or self.connection is None:
+            self.writing = False
+            return
+        self.writing = True
+        data = self.output.pop(0)
+        self.connection.get_output_stream().write_bytes_async(
+            data, GLib.PRIORITY_DEFAULT, self.cancellable, self.on_written,
+            data)
+
+    def on_written(self, stream, result, data):
+        try:
+            written = stream.write_bytes_finish(result)
+        except GLib.Error as e:
+            if e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                return
+            print(e)
+            self.reconnect()
+            return
+        if written < data.get_size():
+            self.output.insert(0, GLib.Bytes.new_from_bytes(
+                data, written, data.get_size() - written))
+        self.write_next()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# team_server.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Headless server of shared pomodoros. Every room runs a PomodoroEngine
+# and pushes its status to the members on every phase change. The
+# protocol is one JSON object per line:
+#
+#     -> {"command": "join", "room": "team"}
+#     <- {"event": "status", "room": "team", "state": "session", ...}
+#     -> {"command": "start"}    (also stop, restart, skip and configure)
+
+import asyncio
+import json
+import os
+from .engine import LENGTHS
+from .engine import PomodoroEngine
+from .engine import State
+from .engine import get_lengths
+from .engine import is_number
+
+DEFAULT_PORT = 7724
+# A member whose unsent output grows over this is disconnected
+MAX_BUFFER = 64 * 1024
+MAX_LINE = 4096
+BACKLOG = 1024
+# Seconds a member may drift from the room before it is resynchronized
+TOLERANCE = 1.0
+
+
+def get_status(engine, name=None, now=None):
+    '''
+    Get the status of an engine as sent to the members of a room
+    '''
+    status = {'event': 'status',
+              'room': name,
+              'state': engine.state.name.lower(),
+              'pomodoros': engine.pomodoros,
+              'elapsed': 0.0,
+              'remaining': 0.0}
+    for key in LENGTHS:
+        status[key] = getattr(engine, key)
+    if engine.countdown is not None:
+        status['elapsed'] = engine.countdown.get_elapsed(now)
+        status['remaining'] = engine.countdown.get_remaining(now)
+    return status
+
+
+def sync_engine(engine, status, now=None):
+    '''
+    Bring a local engine to the status of a room, it raises ValueError
+    if the status is not valid. Phases that end at the same time on both
+    sides are left to the local engine, so it emits its own events.
+    '''
+    if now is None:
+        now = engine.clock()
+    try:
+        state = State[status['state'].upper()]
+    except (KeyError, AttributeError):
+        raise ValueError('Bad state')
+    lengths = get_lengths(status)
+    elapsed = status.get('elapsed')
+    pomodoros = status.get('pomodoros')
+    if not is_number(elapsed) or elapsed < 0 or\
+            not isinstance(pomodoros, int) or isinstance(pomodoros, bool) or\
+            pomodoros < 0:
+        raise ValueError('Bad status')
+    # The room may announce a phase before the local timeout ends it
+    engine.tick(now)
+    if engine.countdown is not None and\
+            (engine.state != state or engine.pomodoros != pomodoros) and\
+            engine.countdown.get_remaining(now) <= TOLERANCE:
+        engine.tick(engine.countdown.get_end())
+    if state == State.IDLE:
+        engine.stop()
+        return
+    engine.configure(**lengths)
+    start_time = now - elapsed
+    if not engine.is_running():
+        engine.start(start_time)
+    if engine.state != state or engine.pomodoros != pomodoros or\
+            abs(engine.countdown.start_time - start_time) > TOLERANCE:
+        engine.pomodoros = pomodoros
+        engine.set_state(state, start_time)
+
+
+class Room(object):
+    '''
+    A shared pomodoro, its engine is driven by the event loop clock and
+    only wakes up at the end of every phase
+    '''
+    def __init__(self, name, loop):
+        self.name = name
+        self.loop = loop
+        self.members = set()
+        self.handle = None
+        self.engine = PomodoroEngine(frames=1, clock=loop.time)
+        self.engine.connect('status-changed', self.on_status_changed)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def schedule(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        deadline = self.engine.get_next_deadline()
+        if deadline is not None:
+            self.handle = self.loop.call_at(deadline, self.on_deadline)
+
+    def on_deadline(self):
+        self.handle = None
+        self.engine.tick()
+        self.schedule()
+
+    def run(self, command, options):
+        if command == 'start':
+            self.engine.start()
+        elif command == 'stop':
+            self.engine.stop()
+        elif command == 'restart':
+            self.engine.restart()
+        elif command == 'skip':
+            self.engine.skip()
+        elif command == 'configure':
+            self.engine.configure(**get_lengths(options))
+            self.broadcast()
+        else:
+            raise ValueError('Unknown command %s' % command)
+        self.schedule()
+
+    def get_message(self):
+        return (json.dumps(get_status(self.engine, self.name)) +
+                '\n').encode('utf-8')
+
+    def broadcast(self):
+        '''
+        Send the status to every member, it is encoded once and never
+        waits for a member
+        '''
+        data = self.get_message()
+        for member in list(self.members):
+            member.send(data)
+
+    def on_status_changed(self, engine, frame):
+        if frame == 0:
+            self.broadcast()
+
+
+class Member(object):
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.transport = writer.transport
+        self.room = None
+
+    def send(self, data):
+        transport = self.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() + len(data) > MAX_BUFFER:
+            # It does not read, do not let it hold memory
+            transport.abort()
+            return
+        transport.write(data)
+
+    def reply(self, message):
+        self.send((json.dumps(message) + '\n').encode('utf-8'))
+
+    async def serve(self):
+        try:
+            while True:
+                try:
+                    line = await self.reader.readuntil(b'\n')
+                except asyncio.LimitOverrunError:
+                    break
+                except asyncio.IncompleteReadError:
+                    break
+                self.handle(line)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.server.leave(self)
+            self.writer.close()
+
+    def handle(self, line):
+        try:
+            message = json.loads(line.decode('utf-8'))
+            command = message['command']
+        except (ValueError, KeyError, TypeError):
+            self.reply({'event': 'error', 'error': 'Bad request'})
+            return
+        if command == 'join':
+            room = message.get('room')
+            if not isinstance(room, str) or not room:
+                self.reply({'event': 'error', 'error': 'Bad room'})
+                return
+            self.server.join(self, room)
+            self.send(self.room.get_message())
+        elif self.room is None:
+            self.reply({'event': 'error', 'error': 'Join a room first'})
+        elif command == 'status':
+            self.send(self.room.get_message())
+        else:
+            try:
+                self.room.run(command, message)
+            except (ValueError, TypeError) as e:
+                self.reply({'event': 'error', 'error': str(e)})
+
+
+class TeamServer(object):
+    '''
+    Hosts the rooms on a TCP port or a Unix socket from one event loop
+    '''
+    def __init__(self, loop):
+        self.loop = loop
+        self.rooms = {}
+        self.server = None
+
+    async def start(self, host=None, port=DEFAULT_PORT, path=None):
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            self.server = await asyncio.start_unix_server(
+                self.on_connection, path, limit=MAX_LINE, backlog=BACKLOG)
+        else:
+            self.server = await asyncio.start_server(
+                self.on_connection, host, port, limit=MAX_LINE,
+                backlog=BACKLOG)
+        return self.server
+
+    async def close(self):
+        for room in self.rooms.values():
+            room.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def on_connection(self, reader, writer):
+        await Member(self, reader, writer).serve()
+
+    def join(self, member, name):
+        self.leave(member)
+        room = self.rooms.get(name)
+        if room is None:
+            room = Room(name, self.loop)
+            self.rooms[name] = room
+        room.members.add(member)
+        member.room = room
+
+    def leave(self, member):
+        room = member.room
+        if room is None:
+            return
+        room.members.discard(member)
+        member.room = None
+        if not room.members and not room.engine.is_running():
+            room.close()
+            del self.rooms[room.name]
+
+
+def serve(host=None, port=DEFAULT_PORT, path=None):
+    '''
+    Run a team server until it is interrupted
+    '''
+    async def run():
+        server = TeamServer(asyncio.get_running_loop())
+        await server.start(host, port, path)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
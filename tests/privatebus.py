@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# privatebus.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# A dbus-daemon of its own for the tests that talk D-Bus, so they never
+# reach the session or system bus of the user. The tests are skipped
+# when gi or dbus-daemon are not installed.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+try:
+    import gi
+    gi.require_version('Gio', '2.0')
+    gi.require_version('GLib', '2.0')
+    from gi.repository import Gio
+    from gi.repository import GLib
+except (ImportError, ValueError):
+    Gio = None
+    GLib = None
+
+DBUS_DAEMON = shutil.which('dbus-daemon')
+AVAILABLE = Gio is not None and DBUS_DAEMON is not None
+REASON = 'gi or dbus-daemon is not available'
+# A session bus without service directories, so no real service is ever
+# activated by a test
+CONFIG = '''<!DOCTYPE busconfig PUBLIC
+ "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir=%s</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+'''
+
+
+class PrivateBus(object):
+    '''
+    Runs a dbus-daemon until close() and opens connections to it
+    '''
+    def __init__(self):
+        self.directory = tempfile.TemporaryDirectory()
+        config = os.path.join(self.directory.name, 'bus.conf')
+        with open(config, 'w') as f:
+            f.write(CONFIG % self.directory.name)
+        self.process = subprocess.Popen(
+            [DBUS_DAEMON, '--config-file=' + config, '--nofork',
+             '--print-address=1'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True)
+        self.address = self.process.stdout.readline().strip()
+        self.connections = []
+
+    def connect(self):
+        connection = Gio.DBusConnection.new_for_address_sync(
+            self.address,
+            Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT |
+            Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION, None, None)
+        self.connections.append(connection)
+        return connection
+
+    def close(self):
+        for connection in self.connections:
+            connection.close_sync(None)
+        self.connections = []
+        self.process.terminate()
+        self.process.wait()
+        self.process.stdout.close()
+        self.directory.cleanup()
+
+    def own_name(self, connection, name):
+        '''
+        Own name on connection and wait until the bus has given it
+        '''
+        connection.call_sync(
+            'org.freedesktop.DBus', '/org/freedesktop/DBus',
+            'org.freedesktop.DBus', 'RequestName',
+            GLib.Variant('(su)', (name, 0)), None,
+            Gio.DBusCallFlags.NONE, -1, None)
+
+    def has_owner(self, name):
+        connection = self.connections[0]
+        return connection.call_sync(
+            'org.freedesktop.DBus', '/org/freedesktop/DBus',
+            'org.freedesktop.DBus', 'NameHasOwner',
+            GLib.Variant('(s)', (name,)), None,
+            Gio.DBusCallFlags.NONE, -1, None).unpack()[0]
+
+
+def wait(condition, timeout=5.0):
+    '''
+    Run the default main context until condition() is true, it returns
+    False on timeout
+    '''
+    context = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        if not context.iteration(False):
+            time.sleep(0.001)
+    return True
+
+
+def call(connection, name, path, interface, method, parameters=None,
+         timeout=2000):
+    '''
+    Call a method without blocking the main context, where the object
+    being called may live. It returns the result or the GLib.Error.
+    '''
+    result = []
+
+    def on_reply(connection, reply):
+        try:
+            result.append(connection.call_finish(reply))
+        except GLib.Error as e:
+            result.append(e)
+
+    connection.call(name, path, interface, method, parameters, None,
+                    Gio.DBusCallFlags.NONE, timeout, None, on_reply)
+    wait(lambda: result, timeout / 1000.0 + 1)
+    return result[0] if result else None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_checkpoint.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import time
+import unittest
+from conftest import Clock
+from pomodoro_indicator.checkpoint import Checkpoint
+from pomodoro_indicator.engine import PomodoroEngine
+from pomodoro_indicator.engine import State
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'checkpoint')
+        self.clock = Clock()
+        self.engine = PomodoroEngine(clock=self.clock)
+        self.checkpoint = Checkpoint(self.filename)
+        self.checkpoint.watch(self.engine)
+
+    def tearDown(self):
+        self.checkpoint.close()
+        self.directory.cleanup()
+
+    def get_restored(self):
+        '''
+        Get a new engine with the checkpoint, as a new process would
+        '''
+        engine = PomodoroEngine(clock=Clock(50.0))
+        self.events = []
+        for event in ('session-end', 'break-end', 'stopped'):
+            engine.connect(event, lambda engine, *args: self.events.append(
+                args[-1] if args else None))
+        checkpoint = Checkpoint(self.filename)
+        restored = checkpoint.restore(engine)
+        checkpoint.close()
+        return restored, engine
+
+    def test_resume_running_phase(self):
+        self.engine.start()
+        self.clock.now += 60
+        restored, engine = self.get_restored()
+        self.assertTrue(restored)
+        self.assertEqual(engine.state, State.SESSION)
+        # The wall clock end is kept, within the time the test takes
+        self.assertAlmostEqual(engine.get_remaining(), 25 * 60, delta=1)
+
+    def test_phase_ended_while_not_running(self):
+        self.engine.start()
+        # As if the session had started last night
+        self.engine.postpone(-12 * 3600)
+        self.checkpoint.save(self.engine)
+        self.assertLess(self.checkpoint.read()[3], time.time())
+        restored, engine = self.get_restored()
+        self.assertFalse(restored)
+        self.assertEqual(engine.state, State.IDLE)
+        self.assertEqual(self.events, [])
+        # It is not tried again
+        self.assertEqual(self.checkpoint.read()[0], State.IDLE)
+
+    def test_idle(self):
+        restored, engine = self.get_restored()
+        self.assertFalse(restored)
+        self.engine.start()
+        self.engine.stop()
+        restored, engine = self.get_restored()
+        self.assertFalse(restored)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_configurator.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pomodoro_indicator import comun
+from pomodoro_indicator import configurator
+from pomodoro_indicator.configurator import Configuration
+
+
+class Crash(Exception):
+    pass
+
+
+class TestSave(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name,
+                                     comun.APPCONF)
+        patches = [mock.patch.object(comun, 'CONFIG_APP_DIR',
+                                     self.directory.name),
+                   mock.patch.object(comun, 'CONFIG_FILE', self.filename),
+                   mock.patch.object(Configuration, 'instance', None)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.configuration = Configuration()
+        self.configuration.set('session_length', 50)
+        self.configuration.save()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self):
+        with open(self.filename) as f:
+            return json.loads(f.read())
+
+    def get_files(self):
+        return sorted(os.listdir(self.directory.name))
+
+    def count_calls(self, *names):
+        '''
+        Patch the os functions with counting wrappers
+        '''
+        calls = dict((name, 0) for name in names)
+        for name in names:
+            function = getattr(os, name)
+
+            def wrapper(*args, name=name, function=function):
+                calls[name] += 1
+                return function(*args)
+            patch = mock.patch.object(configurator.os, name, wrapper)
+            patch.start()
+            self.addCleanup(patch.stop)
+        return calls
+
+    def test_saved(self):
+        self.assertEqual(self.read()['session_length'], 50)
+        self.assertEqual(self.get_files(), [comun.APPCONF])
+
+    def test_syscalls_per_save(self):
+        calls = self.count_calls('write', 'fsync', 'replace')
+        self.configuration.set('break_length', 10)
+        self.configuration.set('long_break_length', 30)
+        self.configuration.save()
+        # One write, the file and its directory synced, one rename
+        self.assertEqual(calls, {'write': 1, 'fsync': 2, 'replace': 1})
+        self.assertEqual(self.read()['long_break_length'], 30)
+
+    def test_unchanged_is_not_written(self):
+        calls = self.count_calls('write', 'fsync', 'replace')
+        self.configuration.set('session_length', 50)
+        self.configuration.save()
+        self.assertEqual(calls, {'write': 0, 'fsync': 0, 'replace': 0})
+
+    def test_short_writes(self):
+        write = os.write
+        with mock.patch.object(configurator.os, 'write',
+                               lambda fd, data: write(fd, data[:7])):
+            self.configuration.set('break_length', 10)
+            self.configuration.save()
+        self.assertEqual(self.read()['break_length'], 10)
+        self.assertEqual(self.read()['session_length'], 50)
+
+    def test_crash_mid_write(self):
+        write = os.write
+
+        def crash(fd, data):
+            write(fd, data[:len(data) // 2])
+            raise OSError(28, 'No space left on device')
+        with mock.patch.object(configurator.os, 'write', crash):
+            self.configuration.set('break_length', 10)
+            with self.assertRaises(OSError):
+                self.configuration.save()
+        # The old file is intact and the partial one is gone
+        self.assertEqual(self.read()['session_length'], 50)
+        self.assertEqual(self.read()['break_length'],
+                         comun.PARAMS['break_length'])
+        self.assertEqual(self.get_files(), [comun.APPCONF])
+
+    def test_crash_before_rename(self):
+        # The process dies between the write and the rename
+        with mock.patch.object(configurator.os, 'replace',
+                               side_effect=Crash):
+            self.configuration.set('break_length', 10)
+            with self.assertRaises(Crash):
+                self.configuration.save()
+        self.assertEqual(self.read()['session_length'], 50)
+        self.assertEqual(self.read()['break_length'],
+                         comun.PARAMS['break_length'])
+        # A new process reads the old file
+        with mock.patch.object(Configuration, 'instance', None):
+            self.assertEqual(Configuration().get('break_length'),
+                             comun.PARAMS['break_length'])
+
+    def test_defaults_are_not_shared(self):
+        self.configuration.set_defaults()
+        self.configuration.get('timers').append({'name': 'work'})
+        self.assertEqual(comun.PARAMS['timers'], [])
+        # A missing key gets a copy of its default too
+        del self.configuration.params['timers']
+        self.configuration.get('timers').append({'name': 'work'})
+        self.assertEqual(comun.PARAMS['timers'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
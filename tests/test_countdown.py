@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_countdown.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import unittest
+from conftest import Clock
+from pomodoro_indicator.countdown import Countdown
+from pomodoro_indicator.engine import PomodoroEngine
+from pomodoro_indicator.engine import State
+
+
+class TestCountdown(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        # 25.3 minutes are not a whole number of seconds per frame
+        self.countdown = Countdown(25.3 * 60, 60, self.clock)
+        self.countdown.start()
+
+    def test_deadlines(self):
+        start = self.clock.now
+        self.assertEqual(self.countdown.get_deadline(0), start)
+        self.assertAlmostEqual(self.countdown.get_deadline(1), start + 25.3)
+        self.assertAlmostEqual(self.countdown.get_end(), start + 25.3 * 60)
+
+    def test_frame_changes_at_its_deadline(self):
+        deadline = self.countdown.get_deadline(7)
+        self.clock.now = deadline
+        self.assertEqual(self.countdown.get_frame(), 7)
+        self.clock.now = deadline - 1e-9
+        self.assertEqual(self.countdown.get_frame(), 6)
+
+    def test_late_wakeup_does_not_delay_next_frame(self):
+        self.clock.now = self.countdown.get_deadline(1) + 10.0
+        self.assertEqual(self.countdown.get_frame(), 1)
+        self.assertEqual(self.countdown.get_next_deadline(),
+                         self.countdown.get_deadline(2))
+
+    def test_remaining(self):
+        self.clock.now += 100.25
+        self.assertAlmostEqual(self.countdown.get_remaining(),
+                               25.3 * 60 - 100.25)
+        self.clock.now = self.countdown.get_end() + 5
+        self.assertEqual(self.countdown.get_remaining(), 0.0)
+        self.assertTrue(self.countdown.is_finished())
+
+    def test_next_timeout_rounds_up(self):
+        self.clock.now = self.countdown.get_deadline(1) - 0.0001
+        self.assertEqual(self.countdown.get_next_timeout(), 1)
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.engine = PomodoroEngine(session_length=25.3, break_length=4.7,
+                                     long_break_length=19.9,
+                                     number_of_pomodoros=4, frames=4,
+                                     clock=self.clock)
+        self.events = []
+        for event in ('session-end', 'break-end'):
+            self.engine.connect(event, self.on_event, event)
+
+    def on_event(self, engine, argument, event):
+        self.events.append((event, engine.transition_time))
+
+    def run_cycle(self, jitter):
+        '''
+        Wake up at every deadline until the engine is idle, late by up
+        to jitter seconds, as the main loop does
+        '''
+        while self.engine.is_running():
+            self.clock.now = self.engine.get_next_deadline() +\
+                random.uniform(0, jitter)
+            self.engine.tick()
+
+    def test_no_drift_over_thousands_of_cycles(self):
+        random.seed(1)
+        cycles = 2000
+        start = self.clock.now
+        for n in range(cycles):
+            # The next cycle starts right when the previous one ended
+            if self.events:
+                self.clock.now = self.events[-1][1]
+            self.engine.start()
+            self.run_cycle(jitter=0.5)
+        # Four sessions, three breaks and a long break every cycle
+        self.assertEqual(len(self.events), cycles * 8)
+        phases = ([25.3, 4.7] * 3 + [25.3, 19.9]) * cycles
+        expected = start
+        for (event, time), length in zip(self.events, phases):
+            expected += length * 60
+            self.assertAlmostEqual(time, expected, places=6)
+        # No drift: the last phase ends cycles times the cycle length
+        # after the first start
+        self.assertAlmostEqual(self.events[-1][1] - start,
+                               cycles * (4 * 25.3 + 3 * 4.7 + 19.9) * 60,
+                               places=6)
+
+    def test_late_tick_ends_every_phase_due(self):
+        self.engine.start()
+        self.clock.now += (25.3 + 4.7 + 1) * 60
+        self.engine.tick()
+        self.assertEqual([event for event, time in self.events],
+                         ['session-end', 'break-end'])
+        self.assertEqual(self.engine.state, State.SESSION)
+        self.assertAlmostEqual(self.engine.countdown.start_time,
+                               1000.0 + (25.3 + 4.7) * 60)
+
+    def test_remaining(self):
+        self.engine.start()
+        self.clock.now += 60.5
+        self.assertAlmostEqual(self.engine.get_remaining(),
+                               25.3 * 60 - 60.5)
+        self.engine.stop()
+        self.assertEqual(self.engine.get_remaining(), 0)
+
+    def test_status_changed(self):
+        frames = []
+        self.engine.connect('status-changed',
+                            lambda engine, frame: frames.append(
+                                (engine.state, frame)))
+        self.engine.start()
+        self.clock.now = 1000.0 + 25.3 * 60 / 4
+        self.engine.tick()
+        self.clock.now = 1000.0 + (25.3 + 4.7 / 2) * 60
+        self.engine.tick()
+        self.engine.stop()
+        self.engine.stop()
+        self.assertEqual(frames, [(State.SESSION, 0), (State.SESSION, 1),
+                                  (State.BREAK, 0), (State.BREAK, 2),
+                                  (State.IDLE, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
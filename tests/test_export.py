@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_export.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from pomodoro_indicator.engine import State
+from pomodoro_indicator.export import export
+from pomodoro_indicator.history import Event
+from pomodoro_indicator.history import History
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = History(os.path.join(self.directory.name, 'history'))
+        self.history.append(Event.START, State.SESSION, 0, 0,
+                            timestamp=1000.0)
+        self.history.append(Event.SESSION_END, State.SESSION, 1, 1500,
+                            timestamp=2500.0)
+        self.history.append(Event.STOP, State.BREAK, 1, 100,
+                            timestamp=2600.0)
+        self.history.flush()
+
+    def tearDown(self):
+        self.history.close()
+        self.directory.cleanup()
+
+    def test_csv(self):
+        output = io.StringIO()
+        self.assertEqual(export(self.history, output, 'csv'), 3)
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows[0][0], 'timestamp')
+        self.assertEqual([row[2] for row in rows[1:]],
+                         ['start', 'session_end', 'stop'])
+
+    def test_jsonl_range(self):
+        output = io.StringIO()
+        self.assertEqual(
+            export(self.history, output, 'jsonl', 2000.0, 2600.0), 1)
+        record = json.loads(output.getvalue())
+        self.assertEqual(record['event'], 'session_end')
+        self.assertEqual(record['duration'], 1500)
+
+    def test_ics(self):
+        output = io.StringIO()
+        export(self.history, output, 'ics')
+        text = output.getvalue()
+        # The start has no duration
+        self.assertEqual(text.count('BEGIN:VEVENT'), 2)
+        self.assertIn('DTSTART:19700101T001640Z', text)
+        self.assertTrue(text.endswith('END:VCALENDAR\r\n'))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export(self.history, io.StringIO(), 'xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_history.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+from pomodoro_indicator.engine import State
+from pomodoro_indicator.history import Event
+from pomodoro_indicator.history import HEADER
+from pomodoro_indicator.history import History
+from pomodoro_indicator.history import RECORD
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'history')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def append(self, history, count, first=0):
+        for n in range(first, first + count):
+            history.append(Event.SESSION_END, State.SESSION, n % 4, 1500,
+                           timestamp=1000.0 + n)
+        history.flush()
+
+    def test_append_and_find(self):
+        history = History(self.filename)
+        self.append(history, 100)
+        self.assertEqual(history.get_count(), 100)
+        self.assertEqual(history.find(1050.0), 50)
+        records = list(history.read_range(1010.0, 1020.0))
+        self.assertEqual([record.timestamp for record in records],
+                         [1000.0 + n for n in range(10, 20)])
+        history.close()
+
+    def test_torn_record(self):
+        history = History(self.filename)
+        self.append(history, 10)
+        history.close()
+        # A crash in the middle of a record
+        with open(self.filename, 'ab') as f:
+            f.write(RECORD.pack(2000.0, Event.STOP.value, State.SESSION.value,
+                                0, 0)[:7])
+        history = History(self.filename)
+        self.assertEqual(os.path.getsize(self.filename),
+                         HEADER.size + 10 * RECORD.size)
+        self.append(history, 5, first=10)
+        records = list(history.read())
+        self.assertEqual(len(records), 15)
+        self.assertEqual(records[-1].timestamp, 1014.0)
+        self.assertEqual(history.get_record(14).event, Event.SESSION_END)
+        history.close()
+
+    def test_torn_header(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'POMO')
+        history = History(self.filename)
+        self.append(history, 1)
+        self.assertEqual(history.get_count(), 1)
+        history.close()
+
+    def test_not_a_history_file(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'something else entirely')
+        with self.assertRaises(ValueError):
+            History(self.filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_notifications.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import io
+import time
+import unittest
+from unittest import mock
+from privatebus import AVAILABLE
+from privatebus import PrivateBus
+from privatebus import REASON
+from privatebus import wait
+if AVAILABLE:
+    from gi.repository import Gio
+    from gi.repository import GLib
+    from pomodoro_indicator import notifications
+    from pomodoro_indicator.notifications import Notifier
+
+INTROSPECTION = '''
+<node>
+  <interface name="org.freedesktop.Notifications">
+    <method name="Notify">
+      <arg type="s" direction="in"/>
+      <arg type="u" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="s" direction="in"/>
+      <arg type="as" direction="in"/>
+      <arg type="a{sv}" direction="in"/>
+      <arg type="i" direction="in"/>
+      <arg type="u" direction="out"/>
+    </method>
+  </interface>
+</node>
+'''
+FIRST_ID = 100
+
+
+class FakeDaemon(object):
+    '''
+    org.freedesktop.Notifications that answers after latency milliseconds
+    '''
+    def __init__(self, bus, latency=0):
+        self.latency = latency
+        self.calls = []
+        self.pending = []
+        self.connection = bus.connect()
+        node = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION)
+        self.connection.register_object(
+            notifications.NOTIFICATIONS_PATH, node.interfaces[0],
+            self.on_method_call, None, None)
+        bus.own_name(self.connection, notifications.NOTIFICATIONS_NAME)
+
+    def on_method_call(self, connection, sender, object_path,
+                       interface_name, method_name, parameters, invocation):
+        self.calls.append(parameters.unpack())
+        reply = GLib.Variant('(u)', (FIRST_ID + len(self.calls) - 1,))
+        if self.latency:
+            self.pending.append(GLib.timeout_add(
+                self.latency, self.on_reply, invocation, reply))
+        else:
+            invocation.return_value(reply)
+
+    def on_reply(self, invocation, reply):
+        self.pending.pop(0)
+        invocation.return_value(reply)
+        return False
+
+    def close(self):
+        # Answers the test did not wait for
+        for source_id in self.pending:
+            GLib.source_remove(source_id)
+        self.pending = []
+
+
+@unittest.skipUnless(AVAILABLE, REASON)
+class TestNotifications(unittest.TestCase):
+    def setUp(self):
+        self.bus = PrivateBus()
+        self.notifier = Notifier('pomodoro-indicator', 'Pomodoro',
+                                 self.bus.connect())
+        self.output = io.StringIO()
+
+    def tearDown(self):
+        self.notifier.close()
+        self.bus.close()
+
+    def get_daemon(self, latency=0):
+        daemon = FakeDaemon(self.bus, latency)
+        self.addCleanup(daemon.close)
+        return daemon
+
+    def notify(self, message):
+        start = time.monotonic()
+        with contextlib.redirect_stdout(self.output):
+            self.notifier.notify(message)
+        # Never waits for the daemon
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    def wait(self, condition, timeout=5.0):
+        with contextlib.redirect_stdout(self.output):
+            return wait(condition, timeout)
+
+    def test_burst_is_merged(self):
+        daemon = self.get_daemon()
+        self.notify('Break ends')
+        self.notify('Session starts')
+        self.assertTrue(self.wait(lambda: daemon.calls))
+        self.assertEqual(daemon.calls[0][:5], (
+            'pomodoro-indicator', 0, '', 'Pomodoro',
+            'Break ends\nSession starts'))
+        self.assertTrue(self.wait(
+            lambda: self.notifier.replaces_id == FIRST_ID))
+        # The next notification replaces the previous one
+        self.notify('Session ends')
+        self.assertTrue(self.wait(lambda: len(daemon.calls) == 2))
+        self.assertEqual(daemon.calls[1][1], FIRST_ID)
+        self.assertEqual(daemon.calls[1][4], 'Session ends')
+        self.assertEqual(self.output.getvalue(), '')
+
+    def test_slow_daemon(self):
+        daemon = self.get_daemon(1000)
+        self.notify('Session ends')
+        self.assertTrue(self.wait(lambda: daemon.calls))
+        # The main loop keeps running while the call is in flight
+        ticks = []
+        GLib.timeout_add(100, lambda: ticks.append(time.monotonic()))
+        self.notify('Break ends')
+        self.notify('Session starts')
+        self.assertTrue(self.wait(lambda: ticks, 0.5))
+        self.assertEqual(len(daemon.calls), 1)
+        # What came during the call is sent as one notification
+        self.assertTrue(self.wait(lambda: len(daemon.calls) == 2))
+        self.assertEqual(daemon.calls[1][1], FIRST_ID)
+        self.assertEqual(daemon.calls[1][4], 'Break ends\nSession starts')
+
+    def test_hung_daemon(self):
+        daemon = self.get_daemon(5000)
+        with mock.patch.object(notifications, 'CALL_TIMEOUT', 200):
+            self.notify('Session ends')
+            self.assertTrue(self.wait(lambda: 'Session ends' in
+                                      self.output.getvalue(), 2.0))
+        # The daemon is not tried again for a while
+        self.notify('Break ends')
+        self.assertTrue(self.wait(lambda: 'Break ends' in
+                                  self.output.getvalue()))
+        self.assertEqual(len(daemon.calls), 1)
+
+    def test_missing_daemon(self):
+        self.notify('Session ends')
+        self.assertTrue(self.wait(lambda: 'Session ends' in
+                                  self.output.getvalue()))
+        self.assertGreater(self.notifier.disabled_until,
+                           GLib.get_monotonic_time())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_player.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import time
+import unittest
+try:
+    import gi
+    gi.require_version('Gst', '1.0')
+    gi.require_version('GstController', '1.0')
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('GLib', '2.0')
+    from gi.repository import Gst
+    from gi.repository import GLib
+    from pomodoro_indicator.player import Player
+    from pomodoro_indicator.player import Status
+    Gst.init(None)
+    AVAILABLE = True
+except Exception:
+    AVAILABLE = False
+REASON = 'gi or GStreamer is not available'
+# Every buffer takes a while to reach the fake audio device
+SINK = 'identity sleep-time=100000 ! fakesink sync=true'
+# Seconds a call may take without blocking the caller
+MAX_CALL = 0.05
+
+
+def wait(condition, timeout=10.0):
+    '''
+    Run the default main context until condition() is true
+    '''
+    context = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        if not context.iteration(False):
+            time.sleep(0.001)
+    return True
+
+
+def write_sound(filename):
+    '''
+    Write a tone of half a second to filename with audiotestsrc
+    '''
+    pipeline = Gst.parse_launch(
+        'audiotestsrc num-buffers=5 samplesperbuffer=4800 ! '
+        'audio/x-raw,rate=48000,channels=2 ! wavenc ! '
+        'filesink location="%s"' % filename)
+    pipeline.set_state(Gst.State.PLAYING)
+    pipeline.get_bus().timed_pop_filtered(
+        10 * Gst.SECOND, Gst.MessageType.EOS | Gst.MessageType.ERROR)
+    pipeline.set_state(Gst.State.NULL)
+
+
+@unittest.skipUnless(AVAILABLE, REASON)
+class TestPlayer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'alarm.wav')
+        write_sound(self.filename)
+        self.player = Player(SINK, os.path.join(self.directory.name,
+                                                'cache'))
+        self.events = []
+        for signal in ('started', 'paused', 'stopped'):
+            self.player.connect(signal, lambda player, position,
+                                signal=signal: self.events.append(signal))
+
+    def tearDown(self):
+        self.player.cancel_watch()
+        self.player.preload([])
+        self.player.close()
+        self.directory.cleanup()
+
+    def call(self, function, *args):
+        start = time.monotonic()
+        function(*args)
+        self.assertLess(time.monotonic() - start, MAX_CALL)
+
+    def test_play_does_not_block(self):
+        self.call(self.player.set_filename, self.filename)
+        self.call(self.player.play)
+        self.assertEqual(self.player.get_status(), Status.PLAYING)
+        self.assertEqual(self.events, [])
+        self.assertTrue(wait(lambda: 'started' in self.events))
+
+    def test_pause_and_stop_do_not_block(self):
+        self.player.set_filename(self.filename)
+        self.player.play()
+        self.assertTrue(wait(lambda: 'started' in self.events))
+        self.call(self.player.pause)
+        self.assertTrue(wait(lambda: 'paused' in self.events))
+        self.call(self.player.stop)
+        self.assertTrue(wait(lambda: 'stopped' in self.events))
+        self.assertEqual(self.player.get_status(), Status.STOPPED)
+
+    def test_seek_waits_for_preroll(self):
+        self.player.set_filename(self.filename)
+        # The slow sink has not pre-rolled yet
+        self.call(self.player.set_position, 0.2)
+        self.assertTrue(self.player.seek_pending)
+        self.assertTrue(wait(lambda: not self.player.seek_pending))
+        self.assertTrue(wait(self.player.is_prerolled))
+
+    def test_end_of_stream(self):
+        self.player.set_filename(self.filename)
+        self.player.play()
+        self.assertTrue(wait(lambda: 'stopped' in self.events))
+        # Pre-rolled at the start again, ready for the next alarm
+        self.assertTrue(wait(self.player.is_prerolled))
+        self.assertEqual(self.player.get_position(), 0)
+        self.call(self.player.play)
+        self.assertTrue(wait(lambda: self.events.count('started') == 2))
+
+    def test_speed_survives_rewind(self):
+        seeks = []
+        seek = self.player.seek
+        self.player.seek = lambda *args: (seeks.append(args), seek(*args))
+        self.player.set_speed(2.0)
+        self.player.set_filename(self.filename)
+        self.player.play()
+        self.assertEqual(len(seeks), 1)
+        self.assertTrue(wait(lambda: 'stopped' in self.events))
+        # The end of the stream rewound at normal speed
+        self.player.play()
+        self.assertEqual(len(seeks), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
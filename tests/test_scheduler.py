@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_scheduler.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from conftest import Clock
+from pomodoro_indicator import scheduler
+from pomodoro_indicator.engine import PomodoroEngine
+from pomodoro_indicator.engine import State
+from pomodoro_indicator.scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.scheduler = Scheduler(self.clock)
+
+    def add(self, name, session_length, start=True):
+        engine = PomodoroEngine(session_length=session_length,
+                                break_length=1, long_break_length=1,
+                                frames=1, clock=self.clock)
+        if start:
+            engine.start()
+        self.scheduler.add(name, engine)
+        return engine
+
+    def test_earliest_deadline(self):
+        self.add('idle', 1, start=False)
+        self.assertIsNone(self.scheduler.get_next_deadline())
+        self.add('long', 10)
+        self.add('short', 2)
+        self.assertEqual(self.scheduler.get_next_deadline(), 1120.0)
+        self.assertEqual(self.scheduler.get_next_timeout(), 120000)
+        self.assertEqual(self.scheduler.get_active(), ['long', 'short'])
+        with self.assertRaises(ValueError):
+            self.add('short', 3)
+
+    def test_run_ticks_due_timers(self):
+        short = self.add('short', 2)
+        long = self.add('long', 10)
+        self.clock.now = 1120.0
+        self.scheduler.run()
+        self.assertEqual(short.state, State.BREAK)
+        self.assertEqual(long.state, State.SESSION)
+        # The break of short is next
+        self.assertEqual(self.scheduler.get_next_deadline(), 1180.0)
+        # A late wakeup catches up with every phase that is due
+        self.clock.now = 1700.0
+        self.scheduler.run()
+        self.assertEqual(short.state, State.LONG_BREAK)
+        self.assertEqual(short.pomodoros, 3)
+        self.assertEqual(self.scheduler.get_next_deadline(), 1720.0)
+        self.assertEqual(long.state, State.SESSION)
+        self.assertEqual(long.pomodoros, 1)
+
+    def test_stopped_and_removed_timers(self):
+        short = self.add('short', 2)
+        self.add('long', 10)
+        self.add('other', 3)
+        short.stop()
+        self.scheduler.update('short')
+        self.scheduler.remove('other')
+        self.assertEqual(self.scheduler.get_active(), ['long'])
+        self.assertEqual(self.scheduler.get_next_deadline(), 1600.0)
+        self.clock.now = 1600.0
+        self.scheduler.run()
+        self.assertEqual(short.state, State.IDLE)
+
+    def test_heap_is_compacted(self):
+        engines = [self.add(str(n), 25) for n in range(100)]
+        for restart in range(50):
+            for n, engine in enumerate(engines):
+                engine.restart()
+                self.scheduler.update(str(n))
+        self.assertLessEqual(len(self.scheduler.heap),
+                             2 * len(engines) + scheduler.COMPACT_SLACK)
+        self.assertEqual(len(self.scheduler.get_active()), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_service.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from conftest import Clock
+from privatebus import AVAILABLE
+from privatebus import PrivateBus
+from privatebus import REASON
+from privatebus import call
+from privatebus import wait
+from pomodoro_indicator.engine import PomodoroEngine
+from pomodoro_indicator.engine import State
+if AVAILABLE:
+    from gi.repository import Gio
+    from gi.repository import GLib
+    from pomodoro_indicator import service
+
+
+class Controller(object):
+    def __init__(self, clock):
+        self.engine = PomodoroEngine(clock=clock)
+
+    def start(self):
+        self.engine.start()
+
+    def stop(self):
+        self.engine.stop()
+
+    def restart(self):
+        self.engine.restart()
+
+    def skip(self):
+        self.engine.skip()
+
+
+@unittest.skipUnless(AVAILABLE, REASON)
+class TestService(unittest.TestCase):
+    def setUp(self):
+        self.bus = PrivateBus()
+        self.client = self.bus.connect()
+        self.clock = Clock()
+        self.controller = Controller(self.clock)
+        self.service = service.DBusService(self.controller,
+                                           self.bus.connect())
+        self.assertTrue(wait(lambda: self.bus.has_owner(service.BUS_NAME)))
+
+    def tearDown(self):
+        self.service.close()
+        self.bus.close()
+
+    def call(self, method, parameters=None, interface=None):
+        return call(self.client, service.BUS_NAME, service.BUS_PATH,
+                    interface or service.INTERFACE, method, parameters)
+
+    def get_property(self, name):
+        return self.call('Get', GLib.Variant('(ss)', (
+            service.INTERFACE, name)),
+            service.PROPERTIES_INTERFACE).unpack()[0]
+
+    def test_methods_and_properties(self):
+        self.assertEqual(self.get_property('State'), 'idle')
+        self.call('Start')
+        self.assertEqual(self.controller.engine.state, State.SESSION)
+        self.assertEqual(self.get_property('State'), 'session')
+        self.assertEqual(self.get_property('Remaining'), 1500.0)
+        self.clock.now += 60
+        self.assertEqual(self.get_property('Remaining'), 1440.0)
+        self.call('Skip')
+        self.assertEqual(self.get_property('State'), 'break')
+        self.call('Skip')
+        self.assertEqual(self.get_property('Pomodoros'), 1)
+        self.call('Restart')
+        self.assertEqual(self.get_property('Pomodoros'), 0)
+        self.call('Stop')
+        self.assertEqual(self.get_property('State'), 'idle')
+
+    def test_unknown_method(self):
+        self.assertIsInstance(self.call('Pause'), GLib.Error)
+        self.assertEqual(self.controller.engine.state, State.IDLE)
+
+    def test_signals(self):
+        phases = []
+        changes = []
+        self.client.signal_subscribe(
+            None, service.INTERFACE, 'PhaseChanged', service.BUS_PATH,
+            None, Gio.DBusSignalFlags.NONE,
+            lambda *args: phases.append(args[5].unpack()))
+        self.client.signal_subscribe(
+            None, service.PROPERTIES_INTERFACE, 'PropertiesChanged',
+            service.BUS_PATH, None, Gio.DBusSignalFlags.NONE,
+            lambda *args: changes.append(args[5].unpack()[1]))
+        self.call('Start')
+        self.assertTrue(wait(lambda: phases and changes))
+        self.assertEqual(phases, [('idle', 'session')])
+        self.assertEqual(changes[-1]['State'], 'session')
+        self.assertEqual(changes[-1]['Remaining'], 1500.0)
+        # Frames only push the remaining time
+        engine = self.controller.engine
+        self.clock.now = engine.countdown.get_deadline(1)
+        engine.tick()
+        self.assertTrue(wait(lambda: len(changes) == 2))
+        self.assertEqual(list(changes[-1]), ['Remaining'])
+        self.call('Stop')
+        self.assertTrue(wait(lambda: len(phases) == 2))
+        self.assertEqual(phases[-1], ('session', 'idle'))
+        self.assertTrue(wait(lambda: changes[-1]['State'] == 'idle'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_sleep_monitor.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from unittest import mock
+from conftest import Clock
+from privatebus import AVAILABLE
+from privatebus import PrivateBus
+from privatebus import REASON
+from privatebus import wait
+from pomodoro_indicator.engine import PomodoroEngine
+from pomodoro_indicator.engine import State
+if AVAILABLE:
+    from gi.repository import GLib
+    from pomodoro_indicator import sleep_monitor
+    from pomodoro_indicator.sleep_monitor import SleepMonitor
+
+
+class FakeLogind(object):
+    '''
+    Owns org.freedesktop.login1 and emits PrepareForSleep on demand
+    '''
+    def __init__(self, bus, name=None):
+        self.connection = bus.connect()
+        if name is not None:
+            bus.own_name(self.connection, name)
+
+    def prepare_for_sleep(self, going_to_sleep):
+        self.connection.emit_signal(
+            None, sleep_monitor.LOGIND_PATH, sleep_monitor.LOGIND_INTERFACE,
+            'PrepareForSleep', GLib.Variant('(b)', (going_to_sleep,)))
+        self.connection.flush_sync(None)
+
+
+@unittest.skipUnless(AVAILABLE, REASON)
+class TestSleepMonitor(unittest.TestCase):
+    def setUp(self):
+        self.bus = PrivateBus()
+        # CLOCK_BOOTTIME minus the monotonic clock
+        self.offset = 10.0
+        self.readings = 0
+        patcher = mock.patch.object(sleep_monitor, 'get_sleep_offset',
+                                    self.get_sleep_offset)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        connection = self.bus.connect()
+        self.logind = FakeLogind(self.bus, sleep_monitor.LOGIND_NAME)
+        self.resumes = []
+        self.monitor = SleepMonitor(self.resumes.append, connection)
+        # A round trip on the connection of the monitor, so it knows the
+        # owner of the logind name before any signal
+        self.assertTrue(self.bus.has_owner(sleep_monitor.LOGIND_NAME))
+
+    def tearDown(self):
+        self.monitor.close()
+        self.bus.close()
+
+    def get_sleep_offset(self):
+        self.readings += 1
+        return self.offset
+
+    def suspend(self, seconds):
+        readings = self.readings
+        self.logind.prepare_for_sleep(True)
+        self.assertTrue(wait(lambda: self.readings > readings))
+        self.offset += seconds
+        self.logind.prepare_for_sleep(False)
+
+    def test_resume_reports_time_asleep(self):
+        self.offset = 25.0
+        self.suspend(300)
+        self.assertTrue(wait(lambda: self.resumes))
+        self.assertEqual(self.resumes, [300.0])
+        self.suspend(60)
+        self.assertTrue(wait(lambda: len(self.resumes) == 2))
+        self.assertEqual(self.resumes[1], 60.0)
+
+    def test_other_senders_are_ignored(self):
+        impostor = FakeLogind(self.bus)
+        impostor.prepare_for_sleep(False)
+        self.suspend(120)
+        self.assertTrue(wait(lambda: self.resumes))
+        # Let any late signal arrive
+        wait(lambda: False, 0.2)
+        self.assertEqual(self.resumes, [120.0])
+
+    def test_one_tick_after_resume(self):
+        # The monotonic clock of the engine stops while suspended
+        clock = Clock()
+        engine = PomodoroEngine(session_length=25, clock=clock)
+        engine.start()
+        clock.now += 600
+        engine.tick()
+        frames = []
+        engine.connect('frame-changed', lambda engine, frame:
+                       frames.append(frame))
+        self.monitor.callback = engine.resume
+        self.suspend(300)
+        self.assertTrue(wait(lambda: frames))
+        # Straight to the frame of the time awake plus asleep
+        self.assertEqual(engine.state, State.SESSION)
+        self.assertEqual(engine.get_remaining(), 600.0)
+        self.assertEqual(frames, [engine.countdown.get_frame()])
+
+
+class TestResume(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.engine = PomodoroEngine(session_length=25, break_length=5,
+                                     clock=self.clock)
+        self.events = []
+        for event in ('session-end', 'break-end', 'stopped'):
+            self.engine.connect(event, lambda engine, *args, event=event:
+                                self.events.append(event))
+        self.engine.start()
+        self.clock.now += 600
+        self.engine.tick()
+
+    def test_continue(self):
+        self.engine.resume(300)
+        self.assertEqual(self.engine.state, State.SESSION)
+        self.assertEqual(self.engine.get_remaining(), 600.0)
+        self.assertEqual(self.events, [])
+
+    def test_long_sleep_is_not_replayed(self):
+        # Eight hours would have been four whole pomodoros and breaks
+        self.engine.resume(8 * 3600)
+        self.assertEqual(self.engine.state, State.IDLE)
+        self.assertEqual(self.engine.pomodoros, 0)
+        self.assertEqual(self.events, [])
+        self.assertIsNone(self.engine.get_next_deadline())
+
+    def test_sleep_past_the_phase_end(self):
+        self.engine.resume(900)
+        self.assertEqual(self.engine.state, State.IDLE)
+        self.assertEqual(self.events, [])
+
+    def test_pause(self):
+        self.engine.resume(8 * 3600, 'pause')
+        self.assertEqual(self.engine.state, State.SESSION)
+        self.assertEqual(self.engine.get_remaining(), 900.0)
+
+    def test_end(self):
+        self.engine.resume(8 * 3600, 'end')
+        self.assertEqual(self.engine.state, State.BREAK)
+        self.assertEqual(self.engine.get_remaining(), 300.0)
+        self.assertEqual(self.events, ['session-end'])
+
+    def test_idle(self):
+        self.engine.stop()
+        self.engine.resume(8 * 3600)
+        self.assertEqual(self.engine.state, State.IDLE)
+
+
+if __name__ == '__main__':
+    unittest.main()
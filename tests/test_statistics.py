@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_statistics.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import os
+import tempfile
+import unittest
+from pomodoro_indicator import statistics
+from pomodoro_indicator.engine import State
+from pomodoro_indicator.history import Event
+from pomodoro_indicator.history import History
+from pomodoro_indicator.statistics import Statistics
+
+
+class TestStatistics(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = History(os.path.join(self.directory.name, 'history'))
+        self.filename = os.path.join(self.directory.name, 'statistics')
+        self.now = datetime.datetime(2026, 3, 4, 12).timestamp()
+
+    def tearDown(self):
+        self.history.close()
+        self.directory.cleanup()
+
+    def append(self, count):
+        for n in range(count):
+            self.history.append(Event.SESSION_END, State.SESSION, 0, 1500,
+                                timestamp=self.now + n)
+        self.history.append(Event.STOP, State.SESSION, 0, 600,
+                            timestamp=self.now + count)
+        self.history.flush()
+
+    def test_rollups(self):
+        stats = Statistics(self.history, self.filename)
+        self.append(3)
+        for period in statistics.PERIODS:
+            self.assertEqual(stats.get(period, self.now),
+                             {'pomodoros': 3, 'focus_minutes': 85.0,
+                              'interruptions': 1})
+        self.assertEqual(stats.get('day', self.now + 86400)['pomodoros'], 0)
+
+    def test_saves_in_batches(self):
+        stats = Statistics(self.history, self.filename)
+        saves = []
+        save = stats.save
+        stats.save = lambda: saves.append(save())
+        self.append(statistics.SAVE_INTERVAL * 3)
+        self.assertEqual(len(saves), 3)
+
+    def test_unsaved_records_are_applied_on_load(self):
+        stats = Statistics(self.history, self.filename)
+        self.append(statistics.SAVE_INTERVAL + 10)
+        # As if the process had ended without saving
+        loaded = Statistics(self.history, self.filename)
+        self.assertEqual(loaded.offset, self.history.get_count())
+        self.assertEqual(loaded.get('month', self.now),
+                         stats.get('month', self.now))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_statusmap.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import threading
+import unittest
+from pomodoro_indicator.engine import PomodoroEngine
+from pomodoro_indicator.engine import State
+from pomodoro_indicator.statusmap import StatusReader
+from pomodoro_indicator.statusmap import StatusWriter
+
+
+class TestStatusMap(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'status')
+        self.writer = StatusWriter(self.filename)
+        self.reader = StatusReader(self.filename)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        self.directory.cleanup()
+
+    def test_watch(self):
+        engine = PomodoroEngine()
+        self.writer.watch(engine)
+        self.assertEqual(self.reader.read().state, 'idle')
+        engine.start()
+        status = self.reader.read()
+        self.assertEqual(status.state, 'session')
+        self.assertEqual(status.number_of_pomodoros, 4)
+        self.assertLessEqual(status.remaining, 1500)
+        self.assertGreater(status.remaining, 1490)
+        self.assertEqual(status.sequence % 2, 0)
+        engine.set_state(State.LONG_BREAK)
+        self.assertEqual(self.reader.read().state, 'long_break')
+        engine.stop()
+        status = self.reader.read()
+        self.assertEqual(status.state, 'idle')
+        self.assertEqual(status.remaining, 0.0)
+
+    def test_consistent_snapshots(self):
+        done = threading.Event()
+
+        def write():
+            n = 0
+            while not done.is_set():
+                n = (n + 1) % 65536
+                self.writer.write(n % 4, n, n, n, n, float(n), 0.0)
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        try:
+            for read in range(20000):
+                status = self.reader.read()
+                self.assertEqual(status.sequence % 2, 0)
+                self.assertEqual(len(set(status[2:])), 1, status)
+                self.assertEqual(status.state,
+                                 ('idle', 'session', 'break',
+                                  'long_break')[status.pomodoros % 4])
+        finally:
+            done.set()
+            thread.join()
+
+    def test_stale(self):
+        self.assertFalse(self.reader.is_stale())
+        # A new indicator replaces the file
+        writer = StatusWriter(self.filename)
+        self.assertTrue(self.reader.is_stale())
+        writer.close()
+        self.assertTrue(self.reader.is_stale())
+
+    def test_not_a_status_file(self):
+        filename = os.path.join(self.directory.name, 'other')
+        with open(filename, 'wb') as f:
+            f.write(bytes(64))
+        with self.assertRaises(ValueError):
+            StatusReader(filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
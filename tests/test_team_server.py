@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# test_team_server.py
+#
+# This file is part of Pomodoro-Indicator
+#
+# Copyright (C) 2014 - 2017
+# Lorenzo Carbonell Cerezo <lorenzo.carbonell.cerezo@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from conftest import Clock
+from pomodoro_indicator.engine import PomodoroEngine
+from pomodoro_indicator.engine import State
+from pomodoro_indicator.team_server import TeamServer
+from pomodoro_indicator.team_server import get_lengths
+from pomodoro_indicator.team_server import get_status
+from pomodoro_indicator.team_server import sync_engine
+
+
+class TestSyncEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.engine = PomodoroEngine(session_length=1, break_length=1,
+                                     long_break_length=1,
+                                     number_of_pomodoros=1,
+                                     clock=self.clock)
+        self.events = []
+        for event in ('stopped', 'session-end', 'break-end'):
+            self.engine.connect(event, self.on_event, event)
+        self.room = PomodoroEngine(session_length=1, break_length=1,
+                                   long_break_length=1,
+                                   number_of_pomodoros=1, frames=1,
+                                   clock=self.clock)
+
+    def on_event(self, engine, *args):
+        self.events.append(args[-1])
+
+    def test_room_ahead_of_local_timeout(self):
+        self.room.start()
+        sync_engine(self.engine, get_status(self.room))
+        # The room ends the session before the local timeout fires
+        self.clock.now += 60.0005
+        self.room.tick()
+        sync_engine(self.engine, get_status(self.room))
+        self.assertEqual(self.engine.state, State.LONG_BREAK)
+        self.assertEqual(self.events, ['session-end'])
+
+    def test_room_ends_before_local_timeout(self):
+        self.room.start()
+        sync_engine(self.engine, get_status(self.room))
+        self.clock.now += 120.0005
+        self.room.tick()
+        self.assertEqual(self.room.state, State.IDLE)
+        sync_engine(self.engine, get_status(self.room))
+        self.assertEqual(self.engine.state, State.IDLE)
+        self.assertEqual(self.events, ['session-end', 'break-end'])
+
+    def test_received_late(self):
+        # The local end is later than the room by the network latency
+        self.room.start()
+        self.clock.now += 0.2
+        sync_engine(self.engine, get_status(self.room, now=1000.0))
+        self.clock.now = 1060.0
+        self.room.tick()
+        sync_engine(self.engine, get_status(self.room))
+        self.assertEqual(self.engine.state, State.LONG_BREAK)
+        self.assertEqual(self.events, ['session-end'])
+
+    def test_stopped_by_a_member(self):
+        self.room.start()
+        sync_engine(self.engine, get_status(self.room))
+        self.clock.now += 10
+        self.room.stop()
+        sync_engine(self.engine, get_status(self.room))
+        self.assertEqual(self.engine.state, State.IDLE)
+        self.assertEqual(self.events, ['stopped'])
+
+    def test_bad_status(self):
+        self.room.start()
+        for key, value in (('session_length', 0),
+                           ('number_of_pomodoros', 10 ** 9),
+                           ('elapsed', float('nan')),
+                           ('state', 'later')):
+            status = get_status(self.room)
+            status[key] = value
+            with self.assertRaises(ValueError):
+                sync_engine(self.engine, status)
+        self.assertFalse(self.engine.is_running())
+
+
+class TestLengths(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(get_lengths({'session_length': 25,
+                                      'break_length': 4.5,
+                                      'number_of_pomodoros': 4}),
+                         {'session_length': 25, 'break_length': 4.5,
+                          'number_of_pomodoros': 4})
+        self.assertEqual(get_lengths({'room': 'team'}), {})
+
+    def test_invalid(self):
+        for key, value in (('session_length', 0),
+                           ('session_length', -5),
+                           ('break_length', float('inf')),
+                           ('break_length', float('nan')),
+                           ('long_break_length', True),
+                           ('long_break_length', '20'),
+                           ('number_of_pomodoros', 10 ** 9),
+                           ('number_of_pomodoros', 2.5)):
+            with self.assertRaises(ValueError):
+                get_lengths({key: value})
+
+
+class TestTeamServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'team.sock')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_session(self, *commands):
+        '''
+        Join a room, send commands and get every message received
+        '''
+        async def run():
+            server = TeamServer(asyncio.get_running_loop())
+            await server.start(path=self.path)
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            messages = []
+            for command in ({'command': 'join', 'room': 'team'},) + commands:
+                writer.write((json.dumps(command) + '\n').encode('utf-8'))
+                line = await asyncio.wait_for(reader.readline(), 5)
+                messages.append(json.loads(line))
+            writer.close()
+            await server.close()
+            return messages
+        return asyncio.run(run())
+
+    def test_configure(self):
+        messages = self.run_session({'command': 'configure',
+                                     'session_length': 50})
+        self.assertEqual(messages[-1]['event'], 'status')
+        self.assertEqual(messages[-1]['session_length'], 50)
+
+    def test_configure_rejects_bad_lengths(self):
+        messages = self.run_session(
+            {'command': 'configure', 'session_length': 0},
+            {'command': 'configure', 'break_length': -1},
+            {'command': 'configure', 'number_of_pomodoros': 10 ** 9},
+            {'command': 'status'})
+        for message in messages[1:-1]:
+            self.assertEqual(message['event'], 'error')
+        self.assertEqual(messages[-1]['session_length'], 25)
+        self.assertEqual(messages[-1]['number_of_pomodoros'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()